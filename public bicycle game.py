@@ -1,10 +1,35 @@
+import time
+
+# 启动计时从脚本开始执行算起，到第一帧显示为止
+STARTUP_BEGIN = time.perf_counter()
+
+import os
 import pygame
-import sys
 import random
+import sys
 from pygame.locals import *
 
-# 初始化pygame
-pygame.init()
+from sbbike.analytics import DayStats
+from sbbike.dashboard import Dashboard
+from sbbike.decisions import DecisionLog
+from sbbike.engine import strategies_to_mask
+from sbbike.fonts import LazyFont
+from sbbike.heatmap import DEMAND_STOPS, SURPLUS_STOPS, Heatmap, color_lut
+from sbbike.model import GameState
+from sbbike.params import STRATEGY_NAMES
+from sbbike.profiler import Profiler
+from sbbike.projection import Projection
+from sbbike.spatial import GridIndex
+from sbbike.zones import ZoneStore
+from sbbike.render import Layer, TextCache, icon_sprite
+
+# 性能剖析：F3 开关，设置 SBBIKE_PROFILE=1 时启动即开启；退出时把记录写成 Chrome trace
+profiler = Profiler(enabled=os.environ.get("SBBIKE_PROFILE") == "1", origin=STARTUP_BEGIN)
+TRACE_PATH = os.environ.get("SBBIKE_TRACE", "sbbike_trace.json")
+
+# 只初始化用到的显示和字体模块（不初始化音频等）
+pygame.display.init()
+pygame.font.init()
 
 # 屏幕设置
 WIDTH, HEIGHT = 1000, 700
@@ -25,22 +50,18 @@ WARNING = (224, 167, 124)      # 警告橙色
 AREA_COLORS = [(206, 178, 164), (172, 186, 196), (196, 172, 186)]  # 区域颜色
 
 # 字体 - 使用多种字体区分层级
-try:
-    # 标题使用黑体
-    font_large = pygame.font.SysFont("SimHei", 36, bold=True)
-    # 副标题使用楷体
-    font_subtitle = pygame.font.SysFont("KaiTi", 24)
-    # 正文使用宋体
-    font_medium = pygame.font.SysFont("SimSun", 18)  # 减小字号
-    font_small = pygame.font.SysFont("SimSun", 14)   # 减小字号
-    font_tiny = pygame.font.SysFont("SimSun", 12)    # 减小字号
-except:
-    # 如果字体不可用，使用默认字体
-    font_large = pygame.font.SysFont(None, 40, bold=True)
-    font_subtitle = pygame.font.SysFont(None, 24)
-    font_medium = pygame.font.SysFont(None, 18)
-    font_small = pygame.font.SysFont(None, 14)
-    font_tiny = pygame.font.SysFont(None, 12)
+# 字体文件路径缓存在磁盘上，字体对象在第一次绘制文字时才加载；找不到字体时使用默认字体
+# 标题使用黑体
+font_large = LazyFont("SimHei", 36, bold=True)
+# 副标题使用楷体
+font_subtitle = LazyFont("KaiTi", 24)
+# 正文使用宋体
+font_medium = LazyFont("SimSun", 18)  # 减小字号
+font_small = LazyFont("SimSun", 14)   # 减小字号
+font_tiny = LazyFont("SimSun", 12)    # 减小字号
+
+# 文字渲染缓存
+text_cache = TextCache()
 
 # 自行车图标（简化的SVG）
 BIKE_ICON = [
@@ -53,155 +74,6 @@ BIKE_ICON = [
     "__|_|_|__"
 ]
 
-# 游戏状态
-class GameState:
-    def __init__(self):
-        self.current_time = 0  # 0=早高峰, 1=日间, 2=晚高峰, 3=夜间
-        self.time_names = ["早高峰 (7:00-9:00)", "日间 (10:00-16:00)", "晚高峰 (17:00-19:00)", "夜间 (20:00-22:00)"]
-        self.day = 1
-        self.total_revenue = 0
-        self.total_cost = 0
-        self.total_penalty = 0
-        self.game_phase = "cover"  # cover, playing, day_summary
-        self.day_history = []
-        
-        # 区域数据
-        self.areas = {
-            "商业区": {"demand": 4.5, "bikes": 35, "price": 2.5, "optimal": 30},
-            "住宅区": {"demand": 3.0, "bikes": 20, "price": 1.8, "optimal": 25},
-            "大学区": {"demand": 4.0, "bikes": 25, "price": 2.0, "optimal": 35}
-        }
-        
-        self.strategies = {
-            "高峰溢价": False,
-            "需求激励": False,
-            "夜间折扣": False
-        }
-        
-        self.weather = "sunny"  # sunny, rain, heat
-        self.last_results = (0, 0, 0, 0)  # 存储上一步结果
-        
-    def calculate_demand(self, area):
-        """计算当前时段的需求"""
-        base = self.areas[area]["demand"]
-        price = self.areas[area]["price"]
-        time_factor = [1.8, 1.0, 1.5, 0.7][self.current_time]
-        
-        # 价格弹性
-        elasticity = -0.3 if self.current_time in [0, 2] else -0.4
-        price_effect = 1 + elasticity * (price - 2.0) / 0.5
-        
-        # 天气影响
-        weather_factor = 1.0
-        if self.weather == "rain":
-            weather_factor = 0.6
-        elif self.weather == "heat":
-            weather_factor = 1.3 if self.current_time == 3 else 1.1
-        
-        # 策略影响
-        strategy_factor = 1.0
-        if self.strategies["高峰溢价"] and self.current_time in [0, 2]:
-            strategy_factor = 1.3
-        elif self.strategies["夜间折扣"] and self.current_time == 3:
-            strategy_factor = 0.8
-        
-        demand = base * time_factor * price_effect * weather_factor * strategy_factor
-        return max(0.5, min(5.0, demand))
-    
-    def calculate_revenue(self):
-        """计算收入"""
-        revenue = 0
-        for area in self.areas:
-            demand = self.calculate_demand(area)
-            usage = min(demand * 8, self.areas[area]["bikes"])
-            revenue += usage * self.areas[area]["price"]
-        return revenue
-    
-    def calculate_costs(self):
-        """计算成本"""
-        # 调度成本
-        relocation_cost = 0
-        for area in self.areas:
-            imbalance = abs(self.areas[area]["bikes"] - self.areas[area]["optimal"])
-            relocation_cost += imbalance * 0.8
-        
-        # 维护成本
-        maintenance = sum([data["bikes"] * 0.2 for data in self.areas.values()])
-        
-        # 策略成本
-        strategy_cost = 0
-        if self.strategies["高峰溢价"]:
-            strategy_cost += 100
-        if self.strategies["需求激励"]:
-            strategy_cost += 70
-        if self.strategies["夜间折扣"]:
-            strategy_cost += 50
-        
-        return relocation_cost + maintenance + strategy_cost
-    
-    def calculate_penalty(self):
-        """计算罚款"""
-        penalty = 0
-        # 车辆分布不均衡罚款
-        for area in self.areas:
-            imbalance = abs(self.areas[area]["bikes"] - self.areas[area]["optimal"])
-            if imbalance > 15:
-                penalty += imbalance * 0.5
-        
-        # 需求未满足罚款
-        for area in self.areas:
-            demand = self.calculate_demand(area)
-            if self.areas[area]["bikes"] < demand * 0.7:
-                penalty += (demand * 0.7 - self.areas[area]["bikes"]) * 1.0
-        
-        return penalty
-    
-    def advance_time(self):
-        """推进到下一个时段"""
-        # 保存当前时段结果
-        revenue = self.calculate_revenue()
-        cost = self.calculate_costs()
-        penalty = self.calculate_penalty()
-        net = revenue - cost - penalty
-        
-        self.total_revenue += revenue
-        self.total_cost += cost
-        self.total_penalty += penalty
-        
-        # 更新到下一个时段
-        self.current_time = (self.current_time + 1) % 4
-        
-        # 如果一天结束
-        if self.current_time == 0:
-            # 保存当天结果
-            day_result = {
-                "day": self.day,
-                "revenue": self.total_revenue - sum(d.get('revenue', 0) for d in self.day_history),
-                "cost": self.total_cost - sum(d.get('cost', 0) for d in self.day_history),
-                "penalty": self.total_penalty - sum(d.get('penalty', 0) for d in self.day_history),
-                "net": net,
-                "weather": self.weather
-            }
-            self.day_history.append(day_result)
-            
-            self.day += 1
-            # 每天开始时随机天气
-            self.weather = random.choices(["sunny", "rain", "heat"], weights=[0.7, 0.2, 0.1])[0]
-            
-            # 重置策略
-            for key in self.strategies:
-                self.strategies[key] = False
-            
-            # 动态调整理想单车数量
-            for area in self.areas:
-                self.areas[area]["optimal"] = max(20, min(50, self.areas[area]["optimal"] + random.randint(-3, 3)))
-            
-            # 进入每日总结
-            self.game_phase = "day_summary"
-        
-        self.last_results = (revenue, cost, penalty, net)
-        return revenue, cost, penalty, net
-
 # 按钮类
 class Button:
     def __init__(self, x, y, width, height, text, color=BUTTON_COLOR, hover_color=BUTTON_HOVER):
@@ -210,18 +82,27 @@ class Button:
         self.hover_color = hover_color
         self.text = text
         self.is_hovered = False
+        self.dirty = True
+        
+    @property
+    def bounds(self):
+        """绘制时覆盖的区域"""
+        return self.rect
         
     def draw(self, surface):
         color = self.hover_color if self.is_hovered else self.color
         pygame.draw.rect(surface, color, self.rect, border_radius=8)
         pygame.draw.rect(surface, (220, 220, 220), self.rect, 1, border_radius=8)
         
-        text_surf = font_medium.render(self.text, True, (255, 255, 255))
+        text_surf = text_cache.render(font_medium, self.text, (255, 255, 255))
         text_rect = text_surf.get_rect(center=self.rect.center)
         surface.blit(text_surf, text_rect)
         
     def check_hover(self, pos):
-        self.is_hovered = self.rect.collidepoint(pos)
+        hovered = self.rect.collidepoint(pos)
+        if hovered != self.is_hovered:
+            self.is_hovered = hovered
+            self.dirty = True
         
     def is_clicked(self, pos, event):
         if event.type == MOUSEBUTTONDOWN and event.button == 1:
@@ -238,6 +119,24 @@ class Slider:
         self.value = initial_val
         self.label = label
         self.dragging = False
+        self.dirty = True
+        self.zone = None  # 对应的区域序号
+        
+    def bind(self, zone, label, min_val, max_val, value):
+        """把滑块绑定到另一个区域"""
+        self.zone = zone
+        self.label = label
+        self.min_val = min_val
+        self.max_val = max_val
+        self.value = value
+        self.knob_rect.centerx = self.rect.x + (value - min_val) / (max_val - min_val) * self.rect.width
+        self.dragging = False
+        self.dirty = True
+        
+    @property
+    def bounds(self):
+        """绘制时覆盖的区域（标签、滑轨和旋钮）"""
+        return pygame.Rect(self.rect.x - 11, self.rect.y - 21, self.rect.width + 22, 37)
         
     def draw(self, surface):
         # 绘制滑轨
@@ -253,7 +152,7 @@ class Slider:
         pygame.draw.circle(surface, (50, 50, 50), self.knob_rect.center, 10, 1)
         
         # 绘制标签和值
-        label_surf = font_small.render(f"{self.label}: ¥{self.value:.1f}", True, TEXT_COLOR)
+        label_surf = text_cache.render(font_small, f"{self.label}: ¥{self.value:.1f}", TEXT_COLOR)
         surface.blit(label_surf, (self.rect.x, self.rect.y - 20))  # 缩小行间距
 
     def update(self, pos, events):
@@ -265,6 +164,7 @@ class Slider:
                 self.dragging = False
         
         if self.dragging:
+            old = (self.knob_rect.centerx, self.value)
             # 更新旋钮位置
             self.knob_rect.centerx = max(self.rect.left, min(pos[0], self.rect.right))
             
@@ -272,9 +172,92 @@ class Slider:
             ratio = (self.knob_rect.centerx - self.rect.left) / self.rect.width
             self.value = self.min_val + ratio * (self.max_val - self.min_val)
             self.value = round(self.value * 2) / 2  # 四舍五入到0.5
+            if (self.knob_rect.centerx, self.value) != old:
+                self.dirty = True
             
         return self.value
 
+# 性能剖析浮层
+class ProfilerHUD:
+    # (阶段名, 显示名)；"model" 为各模型方法最外层调用的耗时之和
+    PHASES = [("events", "事件"), ("slider_update", "滑块"), ("projection", "预计"), ("model", "模型"),
+              ("draw", "绘制"), ("flip", "翻转"), ("tick", "等待")]
+    
+    def __init__(self, x, y, width, height):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.dirty = True
+        
+    @property
+    def bounds(self):
+        return self.rect
+        
+    def draw(self, surface):
+        panel = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        panel.fill((40, 40, 40, 180))
+        p50, p99, frames = profiler.frame_stats()
+        phases = [f"{label} {profiler.last_frame.get(key, 0.0):.2f}" for key, label in self.PHASES]
+        lines = [
+            f"帧耗时 p50 {p50:.2f} ms  p99 {p99:.2f} ms  ({frames} 帧)",
+            "  ".join(phases[:4]) + " ms",
+            "  ".join(phases[4:]) + " ms",
+        ]
+        # 数字每帧都在变，不经过文字缓存
+        for i, line in enumerate(lines):
+            panel.blit(font_tiny.render(line, True, (255, 255, 255)), (8, 4 + i * 16))
+        surface.blit(panel, self.rect)
+
+# 预计结果曲线：拖动滑块时显示该区域价格取遍滑块范围时的本时段收入、成本、罚款和净收益
+class ProjectionChart:
+    # (曲线名, 颜色)
+    SERIES = [("revenue", ACCENT), ("cost", (160, 160, 160)), ("penalty", WARNING), ("net", SUCCESS)]
+    
+    def __init__(self, x, y, width, height):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.slider = None  # 正在拖动的滑块
+        self.dirty = True
+        
+    @property
+    def bounds(self):
+        return self.rect
+        
+    def follow(self, slider):
+        """切换显示的滑块；滑块的值变化时也要重绘"""
+        if slider is not self.slider or (slider is not None and slider.dirty):
+            self.slider = slider
+            self.dirty = True
+        
+    def draw(self, surface):
+        slider = self.slider
+        if slider is None:
+            return
+        curve = projection.curve(slider.zone)
+        
+        header = 18
+        plot = pygame.Rect(self.rect.x, self.rect.y + header, self.rect.width, self.rect.height - header)
+        pygame.draw.rect(surface, (243, 240, 240), plot, border_radius=4)
+        
+        values = [getattr(curve, name) for name, _ in self.SERIES]
+        low = min(0.0, min(float(v.min()) for v in values))
+        high = max(float(v.max()) for v in values)
+        span = (high - low) or 1.0
+        xs = plot.x + 4 + (curve.prices - curve.prices[0]) / (curve.prices[-1] - curve.prices[0]) * (plot.width - 8)
+        
+        def to_y(v):
+            return plot.bottom - 4 - (v - low) / span * (plot.height - 8)
+        
+        # 零线
+        zero = int(to_y(0.0))
+        pygame.draw.line(surface, (210, 210, 210), (plot.x + 2, zero), (plot.right - 2, zero))
+        for (name, color), v in zip(self.SERIES, values):
+            pygame.draw.lines(surface, color, False, list(zip(xs.tolist(), to_y(v).tolist())), 2 if name == "net" else 1)
+        
+        # 当前价格标记和该处的预计净收益
+        marker = plot.x + 4 + (slider.value - slider.min_val) / (slider.max_val - slider.min_val) * (plot.width - 8)
+        pygame.draw.line(surface, TEXT_COLOR, (marker, plot.y + 2), (marker, plot.bottom - 2))
+        net = projection.totals()[3]
+        label = font_tiny.render(f"预计净收益 ¥{net:.1f}", True, SUCCESS if net >= 0 else WARNING)
+        surface.blit(label, (self.rect.x, self.rect.y))
+
 # 策略复选框类
 class Checkbox:
     def __init__(self, x, y, text, checked=False):
@@ -282,6 +265,13 @@ class Checkbox:
         self.checked = checked
         self.text = text
         self.is_hovered = False
+        self.dirty = True
+        
+    @property
+    def bounds(self):
+        """绘制时覆盖的区域（复选框和文字）"""
+        text_surf = text_cache.render(font_small, self.text, TEXT_COLOR)
+        return pygame.Rect(self.rect.x, self.rect.y, 30 + text_surf.get_width(), max(20, text_surf.get_height()))
         
     def draw(self, surface):
         # 绘制复选框
@@ -297,28 +287,215 @@ class Checkbox:
                             (self.rect.x+16, self.rect.y+5), 2)
         
         # 绘制文本
-        text_surf = font_small.render(self.text, True, TEXT_COLOR)
+        text_surf = text_cache.render(font_small, self.text, TEXT_COLOR)
         surface.blit(text_surf, (self.rect.x + 30, self.rect.y))
         
     def check_hover(self, pos):
-        self.is_hovered = self.rect.collidepoint(pos)
+        hovered = self.rect.collidepoint(pos)
+        if hovered != self.is_hovered:
+            self.is_hovered = hovered
+            self.dirty = True
         
     def toggle(self, pos, event):
         if event.type == MOUSEBUTTONDOWN and event.button == 1:
             if self.rect.collidepoint(pos):
                 self.checked = not self.checked
+                self.dirty = True
                 return True
         return False
 
+# 区域列表：可滚动，只绘制可见的区域卡片
+class AreaList:
+    def __init__(self, x, y, width, height, card_height=140, margin=20):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.card_height = card_height
+        self.pitch = card_height + margin
+        self.scroll = 0
+        self.dirty = True
+        
+    @property
+    def bounds(self):
+        return self.rect
+        
+    @property
+    def max_scroll(self):
+        return max(0, len(game.zones) * self.pitch - (self.pitch - self.card_height) - self.rect.height)
+        
+    def first_visible(self):
+        return self.scroll // self.pitch
+        
+    def visible(self):
+        last = (self.scroll + self.rect.height) // self.pitch
+        return range(self.first_visible(), min(len(game.zones), last + 1))
+        
+    def scroll_to(self, i):
+        """滚动到第 i 个区域的卡片，尽量放在最上方，并保证整张卡片在视野内"""
+        top = i * self.pitch
+        # 卡片完整可见的滚动位置为 [top + card_height - 视野高度, top]
+        scroll = max(0, min(self.max_scroll, top))
+        scroll = max(top + self.card_height - self.rect.height, min(top, scroll))
+        if scroll != self.scroll:
+            self.scroll = scroll
+            self.dirty = True
+        
+    def handle(self, pos, event):
+        """处理鼠标滚轮，滚动位置变化时返回 True"""
+        if event.type == MOUSEWHEEL and self.rect.collidepoint(pos):
+            scroll = max(0, min(self.max_scroll, self.scroll - event.y * self.pitch // 2))
+            if scroll != self.scroll:
+                self.scroll = scroll
+                self.dirty = True
+                return True
+        return False
+        
+    def draw(self, surface):
+        surface.set_clip(self.rect)
+        demands = game.demands()
+        zones = game.zones
+        for i in self.visible():
+            x = self.rect.x
+            y = self.rect.y + i * self.pitch - self.scroll
+            
+            # 绘制区域卡片
+            pygame.draw.rect(surface, AREA_COLORS[i % len(AREA_COLORS)], (x, y, self.rect.width, self.card_height), border_radius=8)
+            
+            # 区域标题
+            area_title = text_cache.render(font_medium, zones.names[i], (255, 255, 255))
+            surface.blit(area_title, (x + 18, y + 15))
+            
+            # 需求显示
+            demand = float(demands[i])
+            demand_text = text_cache.render(font_small, f"需求: {'★' * int(demand)}{'☆' * (5 - int(demand))} ({demand:.1f}/5.0)", (255, 255, 255))
+            surface.blit(demand_text, (x + 18, y + 45))
+            
+            # 单车数量
+            bikes_text = text_cache.render(font_small, f"可用单车: {zones.bikes[i]} 辆", (255, 255, 255))
+            surface.blit(bikes_text, (x + 18, y + 70))
+            
+            # 理想单车数量
+            optimal_text = text_cache.render(font_small, f"理想数量: {zones.optimal[i]} 辆", (255, 255, 255))
+            surface.blit(optimal_text, (x + 18, y + 95))
+        
+        # 滚动条
+        total = len(game.zones) * self.pitch
+        if total > self.rect.height:
+            bar_height = max(20, self.rect.height * self.rect.height // total)
+            bar_y = self.rect.y + (self.rect.height - bar_height) * self.scroll // max(1, self.max_scroll)
+            pygame.draw.rect(surface, ACCENT_LIGHT, (self.rect.right - 6, bar_y, 4, bar_height), border_radius=2)
+        surface.set_clip(None)
+
+# 城市热力图：按区域位置显示单车盈缺（单车数 - 理想数量）或需求，滚轮缩放，拖动平移，点击选中区域
+class CityMap:
+    # (名称, 颜色查找表的节点, 颜色对应的数值范围)
+    LAYERS = [("盈缺", SURPLUS_STOPS, (-20.0, 20.0)), ("需求", DEMAND_STOPS, (0.5, 5.0))]
+    # 按下后移动不超过这么多像素时算作点击
+    CLICK_SLOP = 3
+    # 悬停提示只显示这么多像素以内的区域
+    HOVER_RADIUS = 24
+    
+    def __init__(self, x, y, width, height):
+        self.rect = pygame.Rect(x, y, width, height)
+        self.heatmap = Heatmap(game.zones.x, game.zones.y, self.rect.size, PANEL_BG)
+        self.index = GridIndex.from_zones(game.zones)
+        self.luts = [color_lut(stops) for _, stops, _ in self.LAYERS]
+        # 图例色条：查找表拉成 (长, 高, 3) 直接生成表面
+        self.legends = [pygame.transform.scale(pygame.surfarray.make_surface(lut[:, None, :].repeat(8, axis=1).astype("uint8")), (120, 8))
+                        for lut in self.luts]
+        self.layer = 0
+        self.press = None  # 按下左键时的位置
+        self.last = None   # 拖动中上一次的鼠标位置
+        self.hover = None
+        self.selected = None
+        self.dirty = True
+        
+    @property
+    def bounds(self):
+        return self.rect
+        
+    def values(self):
+        zones = game.zones
+        if self.layer == 0:
+            return zones.bikes - zones.optimal
+        return game.demands()
+        
+    def zone_at(self, pos, radius=None):
+        """屏幕位置 pos 处最近的区域；给出 radius 时超出该像素距离返回 None"""
+        wx, wy = self.heatmap.to_world(pos[0] - self.rect.x, pos[1] - self.rect.y)
+        near, dist = self.index.query([wx], [wy])
+        if radius is not None and dist[0, 0] * self.heatmap.scale > radius:
+            return None
+        return int(near[0, 0])
+        
+    def handle(self, pos, event):
+        """处理缩放、平移和点击，选中新的区域时返回 True"""
+        inside = self.rect.collidepoint(pos)
+        if event.type == MOUSEWHEEL and inside:
+            self.heatmap.zoom(1.25 ** event.y, (pos[0] - self.rect.x, pos[1] - self.rect.y))
+            self.dirty = True
+        elif event.type == MOUSEBUTTONDOWN and event.button == 1 and inside:
+            self.press = self.last = pos
+        elif event.type == MOUSEMOTION:
+            if self.press is not None:
+                self.heatmap.pan(pos[0] - self.last[0], pos[1] - self.last[1])
+                self.last = pos
+                self.dirty = True
+            hover = self.zone_at(pos, self.HOVER_RADIUS) if inside else None
+            if hover != self.hover:
+                self.hover = hover
+                self.dirty = True
+        elif event.type == MOUSEBUTTONUP and event.button == 1 and self.press is not None:
+            press, self.press = self.press, None
+            if abs(pos[0] - press[0]) <= self.CLICK_SLOP and abs(pos[1] - press[1]) <= self.CLICK_SLOP:
+                self.selected = self.zone_at(pos)
+                self.dirty = True
+                return True
+        return False
+        
+    def draw(self, surface):
+        name, _, (low, high) = self.LAYERS[self.layer]
+        # 整个颜色场一次贴图
+        surface.blit(self.heatmap.render(self.values(), low, high, self.luts[self.layer]), self.rect.topleft,
+                     pygame.Rect((0, 0), self.rect.size))
+        surface.set_clip(self.rect)
+        
+        # 滑块对应的区域画圈
+        zones = game.zones
+        for slider in visible_sliders():
+            i = slider.zone
+            sx, sy = self.heatmap.to_screen(zones.x[i], zones.y[i])
+            width = 2 if i == self.selected else 1
+            pygame.draw.circle(surface, TEXT_COLOR, (self.rect.x + int(sx), self.rect.y + int(sy)), 6, width)
+        
+        # 图例
+        legend = self.legends[self.layer]
+        x, y = self.rect.x + 10, self.rect.bottom - 22
+        surface.blit(legend, (x, y + 4))
+        label = text_cache.render(font_tiny, f"{name}  {low:g} ~ {high:g}", TEXT_COLOR)
+        surface.blit(label, (x + 128, y))
+        
+        # 悬停区域的信息（数字随时在变，不经过文字缓存）
+        if self.hover is not None:
+            i = self.hover
+            info = f"{zones.names[i]}  单车 {zones.bikes[i]} / 理想 {zones.optimal[i]}  需求 {float(game.demands()[i]):.1f}"
+            text = font_tiny.render(info, True, TEXT_COLOR)
+            surface.blit(text, (self.rect.x + 10, self.rect.y + 6))
+        surface.set_clip(None)
+        
 # 绘制自行车图标
 def draw_bike(surface, x, y, size=1.0, color=ACCENT):
-    for i, line in enumerate(BIKE_ICON):
-        for j, char in enumerate(line):
-            if char != ' ':
-                pygame.draw.circle(surface, color, (x + j*int(size*4), y + i*int(size*4)), int(size*2))
+    sprite, radius = icon_sprite(tuple(BIKE_ICON), size, color)
+    surface.blit(sprite, (x - radius, y - radius))
+
+# 创建游戏状态（设置 SBBIKE_ZONES 时随机生成对应数量的站点）
+zone_count = int(os.environ.get("SBBIKE_ZONES", 0))
+city_seed = int(os.environ.get("SBBIKE_CITY_SEED", 0))
+# 随机种子（SBBIKE_SEED 未设置时随机选取），记录在决策日志中以便重放
+seed = int(os.environ["SBBIKE_SEED"]) if os.environ.get("SBBIKE_SEED") else random.SystemRandom().getrandbits(63)
+game = GameState(seed, zones=ZoneStore.generate(zone_count, city_seed) if zone_count else None)
+profiler.instrument(game)
 
-# 创建游戏状态
-game = GameState()
+# 决策日志：设置 SBBIKE_LOG 时记录玩家的每个操作，可用 sbbike14.py replay 无界面重放
+decision_log = DecisionLog(os.environ["SBBIKE_LOG"], seed, zone_count, city_seed) if os.environ.get("SBBIKE_LOG") else None
 
 # 封面按钮
 start_btn = Button(WIDTH//2 - 100, HEIGHT//2 + 150, 200, 50, "开始游戏")
@@ -329,14 +506,72 @@ execute_btn = Button(560, HEIGHT - 100, 180, 45, "执行决策")  # 向左移动
 next_btn = Button(780, HEIGHT - 100, 180, 45, "下一时段")    # 向左移动50像素
 continue_btn = Button(WIDTH//2 - 100, HEIGHT - 170, 200, 45, "继续")
 back_btn = Button(WIDTH//2 - 100, HEIGHT -110, 200, 45, "返回封面")
+analytics_btn = Button(WIDTH//2 + 130, HEIGHT - 170, 160, 45, "数据分析")
+analytics_back_btn = Button(WIDTH//2 - 100, HEIGHT - 75, 200, 45, "返回")
 
-# 滑块
+# 数据分析：每日结果的流式统计，进入分析页面时只追加新增的天
+day_stats = DayStats()
+dashboard = Dashboard(font_medium, font_tiny, {
+    "background": BACKGROUND, "panel": PANEL_BG, "plot": (243, 240, 240), "grid": (210, 210, 210),
+    "text": TEXT_COLOR, "muted": (150, 150, 150), "accent": ACCENT, "success": SUCCESS, "warning": WARNING,
+})
+
+# 区域列表
+AREA_HEIGHT = 140
+AREA_MARGIN = 20
+area_list = AreaList(60, 150, 460, 480, AREA_HEIGHT, AREA_MARGIN)
+
+# 城市热力图与区域列表占同一块面板，用面板标题右侧的按钮切换
+show_map = False
+view_btn = Button(430, 104, 90, 32, "地图")
+layer_btn = Button(330, 104, 90, 32, "需求")
+
+# 滑块：三个滑块对应区域列表中最上方可见的三个区域
+# 拖动滑块只修改待执行的价格，点击"执行决策"后才写入游戏状态
+pending_prices = game.zones.price.copy()
 sliders = [
-    Slider(580, 150, 300, 1.0, 4.0, 2.5, "商业区价格"),
-    Slider(580, 200, 300, 0.5, 3.0, 1.8, "住宅区价格"),
-    Slider(580, 250, 300, 1.0, 3.5, 2.0, "大学区价格")
+    Slider(580, 150, 300, 1.0, 4.0, 2.5, ""),
+    Slider(580, 200, 300, 1.0, 4.0, 2.5, ""),
+    Slider(580, 250, 300, 1.0, 4.0, 2.5, "")
 ]
 
+
+def bind_sliders(first=None):
+    """滑块依次对应从 first（默认为区域列表最上方可见的区域）开始的区域"""
+    if first is None:
+        first = area_list.first_visible()
+    zones = game.zones
+    for k, slider in enumerate(sliders):
+        i = first + k
+        if i < len(zones):
+            slider.bind(i, f"{zones.names[i]}价格", zones.price_min[i], zones.price_max[i], pending_prices[i])
+        else:
+            slider.zone = None
+    if show_map:
+        city_map.dirty = True
+
+
+def visible_sliders():
+    return [slider for slider in sliders if slider.zone is not None]
+
+
+def select_zone(i):
+    """在地图上选中第 i 个区域：列表滚动到它的卡片，滑块从它开始对应
+
+    列表已滚到底时选中区域可能不是最上方可见的卡片，这时滑块对应最后几个区域，其中包含它。
+    """
+    city_map.selected = i
+    area_list.scroll_to(i)
+    bind_sliders(max(0, min(i, len(game.zones) - len(sliders))))
+
+
+city_map = CityMap(60, 150, 460, 480)
+bind_sliders()
+
+# 预计结果：跟踪待执行的价格和勾选的策略，拖动滑块时在结果面板右侧画出曲线
+projection = Projection(game)
+projection_chart = ProjectionChart(775, 455, 170, 115)
+
 # 策略复选框
 # 向下调整复选框位置
 checkboxes = [
@@ -345,178 +580,142 @@ checkboxes = [
     Checkbox(580, 383, "夜间折扣 (-20%价格)")
 ]
 
-# 主游戏循环
-clock = pygame.time.Clock()
-running = True
+# 静态图层：背景、面板和固定文字，只在布局变化时重绘
+def draw_cover_static(surface):
+    surface.fill(BACKGROUND)
+    
+    # 绘制标题
+    title = text_cache.render(font_large, "共享单车动态定价模拟", ACCENT)
+    subtitle = text_cache.render(font_subtitle, "经济学实验游戏", TEXT_COLOR)
+    surface.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//3 - 50))
+    surface.blit(subtitle, (WIDTH//2 - subtitle.get_width()//2, HEIGHT//3 + 20))
+    
+    # 绘制游戏简介
+    desc = [
+        "游戏简介:",
+        "作为共享单车区域运营经理，你需要制定动态定价策略",
+        "根据时段、区域和天气调整价格，最大化收益",
+        "体验经济学中的需求弹性、价格歧视和成本管理"
+    ]
+    
+    for i, line in enumerate(desc):
+        text = text_cache.render(font_medium, line, TEXT_COLOR)
+        surface.blit(text, (WIDTH//2 - text.get_width()//2, HEIGHT//2 - 20 + i*30))
+    
+    # 操作提示
+    help_text = text_cache.render(font_tiny, "点击'开始游戏'按钮开始", (150, 150, 150))
+    surface.blit(help_text, (WIDTH//2 - help_text.get_width()//2, HEIGHT - 70))
+
 
-while running:
-    mouse_pos = pygame.mouse.get_pos()
-    events = pygame.event.get()
+def draw_playing_static(surface):
+    surface.fill(BACKGROUND)
     
-    for event in events:
-        if event.type == QUIT:
-            running = False
-        
-        # 处理封面按钮
-        if game.game_phase == "cover":
-            if start_btn.is_clicked(mouse_pos, event):
-                game.game_phase = "playing"
-        
-        # 处理游戏内按钮
-        elif game.game_phase == "playing":
-            if execute_btn.is_clicked(mouse_pos, event):
-                # 更新区域价格
-                game.areas["商业区"]["price"] = sliders[0].value
-                game.areas["住宅区"]["price"] = sliders[1].value
-                game.areas["大学区"]["price"] = sliders[2].value
-                
-                # 更新策略
-                game.strategies["高峰溢价"] = checkboxes[0].checked
-                game.strategies["需求激励"] = checkboxes[1].checked
-                game.strategies["夜间折扣"] = checkboxes[2].checked
-                
-                # 计算并显示结果
-                game.last_results = (game.calculate_revenue(), game.calculate_costs(), 
-                                   game.calculate_penalty(), 
-                                   game.calculate_revenue() - game.calculate_costs() - game.calculate_penalty())
-            
-            if next_btn.is_clicked(mouse_pos, event):
-                # 推进到下一个时段
-                game.advance_time()
-                
-                # 更新滑块值
-                sliders[0].value = game.areas["商业区"]["price"]
-                sliders[1].value = game.areas["住宅区"]["price"]
-                sliders[2].value = game.areas["大学区"]["price"]
-                
-                # 重置复选框
-                for cb in checkboxes:
-                    cb.checked = False
-            
-            # 处理复选框点击
-            for cb in checkboxes:
-                cb.toggle(mouse_pos, event)
-        
-        # 处理总结页面按钮
-        elif game.game_phase == "day_summary":
-            if continue_btn.is_clicked(mouse_pos, event):
-                game.game_phase = "playing"
-            if back_btn.is_clicked(mouse_pos, event):
-                game.game_phase = "cover"
+    # 绘制标题栏
+    pygame.draw.rect(surface, ACCENT, (0, 0, WIDTH, 70))
     
-    # 更新滑块值
-    if game.game_phase == "playing":
-        for slider in sliders:
-            slider.update(mouse_pos, events)
+    # 绘制区域信息面板
+    pygame.draw.rect(surface, PANEL_BG, (40, 90, 500, 550), border_radius=8)
+    area_title = text_cache.render(font_medium, "区域信息", ACCENT)
+    surface.blit(area_title, (60, 110))
     
-    # 更新悬停状态
-    if game.game_phase == "cover":
-        start_btn.check_hover(mouse_pos)
-    elif game.game_phase == "playing":
-        execute_btn.check_hover(mouse_pos)
-        next_btn.check_hover(mouse_pos)
-        for cb in checkboxes:
-            cb.check_hover(mouse_pos)
-    elif game.game_phase == "day_summary":
-        continue_btn.check_hover(mouse_pos)
-        back_btn.check_hover(mouse_pos)
+    # 绘制价格调整面板
+    pygame.draw.rect(surface, PANEL_BG, (560, 90, 400, 180), border_radius=8)
+    price_title = text_cache.render(font_medium, "价格调整", ACCENT)
+    surface.blit(price_title, (580, 105))
+    
+    # 绘制策略面板（增加高度）
+    pygame.draw.rect(surface, PANEL_BG, (560, 290, 400, 120), border_radius=8)  # 增加高度20像素
+    strategy_title = text_cache.render(font_medium, "时段策略", ACCENT)
+    surface.blit(strategy_title, (580, 300))
+    
+    # 绘制结果面板（下移20像素）
+    pygame.draw.rect(surface, PANEL_BG, (560, 430, 400, 150), border_radius=8)  # 下移20像素
+    result_title = text_cache.render(font_medium, "运营结果", ACCENT)
+    surface.blit(result_title, (580, 440))
+    
+    # 操作提示
+    help_text = text_cache.render(font_tiny, "操作流程: 1. 调整价格滑块 2. 选择时段策略 3. 点击'执行决策' 4. 点击'下一时段'", (150, 150, 150))
+    text_width = help_text.get_width()
+    x = (WIDTH - text_width) // 2
+    surface.blit(help_text, (x, HEIGHT - 40))
+
+
+def draw_summary_static(surface):
+    surface.fill(BACKGROUND)
+    
+    # 绘制总结卡片
+    pygame.draw.rect(surface, PANEL_BG, (WIDTH // 2 - 350, 100, 700, 400), border_radius=10)
     
-    # 绘制界面
-    screen.fill(BACKGROUND)
+    # 绘制经济学分析面板
+    pygame.draw.rect(surface, (240, 248, 255), (WIDTH // 2 - 350, 380, 700, 120), border_radius=8)
+    analysis_title = text_cache.render(font_small, "经济学分析:", ACCENT)
+    surface.blit(analysis_title, (WIDTH // 2 - 330, 390))
+    
+    # 操作提示
+    help_text = text_cache.render(font_tiny, "点击'继续'进入下一天，或点击'返回封面'重新开始", (150, 150, 150))
+    surface.blit(help_text, (WIDTH // 2 - help_text.get_width() // 2, HEIGHT - 40))
+
+
+def draw_analytics_static(surface):
+    surface.fill(BACKGROUND)
+    title = text_cache.render(font_large, "数据分析", ACCENT)
+    surface.blit(title, (WIDTH // 2 - title.get_width() // 2, 30))
+    # 统计和折线图只在有新的一天时重画（图层键包含天数）
+    dashboard.draw(surface, (40, 90, WIDTH - 80, 520), day_stats)
+
+
+# 剖析浮层放在左下角，三个页面这里都没有会变化的内容
+hud = ProfilerHUD(10, HEIGHT - 56, 320, 52)
+
+layers = {
+    "cover": Layer((WIDTH, HEIGHT), draw_cover_static),
+    "playing": Layer((WIDTH, HEIGHT), draw_playing_static),
+    "day_summary": Layer((WIDTH, HEIGHT), draw_summary_static),
+    "analytics": Layer((WIDTH, HEIGHT), draw_analytics_static),
+}
+
+
+def page_layer():
+    """当前页面的静态图层"""
+    if game.game_phase == "analytics":
+        return layers["analytics"].get((WIDTH, HEIGHT, day_stats.count))
+    return layers[game.game_phase].get((WIDTH, HEIGHT))
+
+def draw_frame():
+    """完整绘制当前页面：先贴静态图层，再画会变化的部分"""
+    screen.blit(page_layer(), (0, 0))
     
     # 封面页面
     if game.game_phase == "cover":
-        # 绘制标题
-        title = font_large.render("共享单车动态定价模拟", True, ACCENT)
-        subtitle = font_subtitle.render("经济学实验游戏", True, TEXT_COLOR)
-        screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//3 - 50))
-        screen.blit(subtitle, (WIDTH//2 - subtitle.get_width()//2, HEIGHT//3 + 20))
-        
-        # 绘制游戏简介
-        desc = [
-            "游戏简介:",
-            "作为共享单车区域运营经理，你需要制定动态定价策略",
-            "根据时段、区域和天气调整价格，最大化收益",
-            "体验经济学中的需求弹性、价格歧视和成本管理"
-        ]
-        
-        for i, line in enumerate(desc):
-            text = font_medium.render(line, True, TEXT_COLOR)
-            screen.blit(text, (WIDTH//2 - text.get_width()//2, HEIGHT//2 - 20 + i*30))
-        
         # 绘制按钮
         start_btn.draw(screen)
-        
-        # 操作提示
-        help_text = font_tiny.render("点击'开始游戏'按钮开始", True, (150, 150, 150))
-        screen.blit(help_text, (WIDTH//2 - help_text.get_width()//2, HEIGHT - 70))
     
     # 游戏主页面
     elif game.game_phase == "playing":
-        # 绘制标题栏
-        pygame.draw.rect(screen, ACCENT, (0, 0, WIDTH, 70))
-        title = font_large.render(f"第 {game.day} 天: {game.time_names[game.current_time]}", True, (255, 255, 255))
+        # 绘制标题
+        title = text_cache.render(font_large, f"第 {game.day} 天: {game.time_names[game.current_time]}", (255, 255, 255))
         screen.blit(title, (20, 20))
         
         # 天气显示（使用文字代替图标）
-        weather_text = font_subtitle.render(f"天气: {'晴天' if game.weather=='sunny' else '雨天' if game.weather=='rain' else '高温'}", True, (255, 255, 255))
+        weather_text = text_cache.render(font_subtitle, f"天气: {'晴天' if game.weather=='sunny' else '雨天' if game.weather=='rain' else '高温'}", (255, 255, 255))
         screen.blit(weather_text, (WIDTH - 160, 22))
         
-        # 绘制区域信息面板
-        pygame.draw.rect(screen, PANEL_BG, (40, 90, 500, 550), border_radius=8)
-        area_title = font_medium.render("区域信息", True, ACCENT)
-        screen.blit(area_title, (60, 110))
-        
         # 绘制区域信息
-        area_height = 140
-        area_margin = 20
-        
-        for i, (area, data) in enumerate(game.areas.items()):
-            y = 150 + i * (area_height + area_margin)
-            
-            # 绘制区域卡片
-            pygame.draw.rect(screen, AREA_COLORS[i], (60, y, 460, area_height), border_radius=8)
-            
-            # 区域标题
-            area_title = font_medium.render(area, True, (255, 255, 255))
-            screen.blit(area_title, (78, y + 15))
-            
-            # 需求显示
-            demand = game.calculate_demand(area)
-            demand_text = font_small.render(f"需求: {'★' * int(demand)}{'☆' * (5 - int(demand))} ({demand:.1f}/5.0)", True, (255, 255, 255))
-            screen.blit(demand_text, (78, y + 45))
-            
-            # 单车数量
-            bikes_text = font_small.render(f"可用单车: {data['bikes']} 辆", True, (255, 255, 255))
-            screen.blit(bikes_text, (78, y + 70))
-            
-            # 理想单车数量
-            optimal_text = font_small.render(f"理想数量: {data['optimal']} 辆", True, (255, 255, 255))
-            screen.blit(optimal_text, (78, y + 95))
-        
-        # 绘制价格调整面板
-        pygame.draw.rect(screen, PANEL_BG, (560, 90, 400, 180), border_radius=8)
-        price_title = font_medium.render("价格调整", True, ACCENT)
-        screen.blit(price_title, (580, 105))
+        view_btn.draw(screen)
+        if show_map:
+            layer_btn.draw(screen)
+            city_map.draw(screen)
+        else:
+            area_list.draw(screen)
         
         # 绘制滑块
-        for slider in sliders:
+        for slider in visible_sliders():
             slider.draw(screen)
         
-        # 绘制策略面板（增加高度）
-        pygame.draw.rect(screen, PANEL_BG, (560, 290, 400, 120), border_radius=8)  # 增加高度20像素
-        strategy_title = font_medium.render("时段策略", True, ACCENT)
-        screen.blit(strategy_title, (580, 300))
-        
         # 绘制复选框
         for cb in checkboxes:
             cb.draw(screen)
         
-        # 绘制结果面板（下移20像素）
-        pygame.draw.rect(screen, PANEL_BG, (560, 430, 400, 150), border_radius=8)  # 下移20像素
-        result_title = font_medium.render("运营结果", True, ACCENT)
-        screen.blit(result_title, (580, 440))
-        
         # 绘制当前时段结果
         revenue, cost, penalty, net = game.last_results
         result_texts = [
@@ -530,28 +729,21 @@ while running:
             color = TEXT_COLOR
             if i == 3:
                 color = SUCCESS if net >= 0 else WARNING
-            text_surf = font_small.render(text, True, color)
+            text_surf = text_cache.render(font_small, text, color)
             screen.blit(text_surf, (580, 465 + i*25))
         
         # 绘制按钮（已向左调整位置）
         execute_btn.draw(screen)
         next_btn.draw(screen)
         
-        # 操作提示
-        help_text = font_tiny.render("操作流程: 1. 调整价格滑块 2. 选择时段策略 3. 点击'执行决策' 4. 点击'下一时段'", True, (150, 150, 150))
-        text_width = help_text.get_width()
-        x = (WIDTH - text_width) // 2
-        screen.blit(help_text, (x, HEIGHT - 40))
+        projection_chart.draw(screen)
 
     # 每日总结页面
     elif game.game_phase == "day_summary":
         # 绘制标题
-        title = font_large.render(f"第 {game.day - 1} 天运营总结", True, ACCENT)
+        title = text_cache.render(font_large, f"第 {game.day - 1} 天运营总结", ACCENT)
         screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
 
-        # 绘制总结卡片
-        pygame.draw.rect(screen, PANEL_BG, (WIDTH // 2 - 350, 100, 700, 400), border_radius=10)
-
         # 获取最后一天的结果
         if game.day_history:
             day_result = game.day_history[-1]
@@ -561,7 +753,7 @@ while running:
                 f"日收入: ¥{day_result['revenue']:.1f}",
                 f"日成本: ¥{day_result['cost']:.1f}",
                 f"日罚款: ¥{day_result['penalty']:.1f}",
-                f"日净收益: ¥{day_result['revenue'] - day_result['cost'] - day_result['penalty']:.1f}",
+                f"日净收益: ¥{day_result['net']:.1f}",
                 f"天气: {'晴天' if day_result['weather'] == 'sunny' else '雨天' if day_result['weather'] == 'rain' else '高温'}"
                 # 修改为文字
             ]
@@ -570,7 +762,7 @@ while running:
                 color = TEXT_COLOR
                 if i == 3:
                     color = SUCCESS if day_result['net'] >= 0 else WARNING
-                text_surf = font_medium.render(text, True, color)
+                text_surf = text_cache.render(font_medium, text, color)
                 screen.blit(text_surf, (WIDTH // 2 - text_surf.get_width() // 2, 150 + i * 50))
 
             # 根据不同的游戏结果生成不同的经济学分析文本
@@ -608,24 +800,233 @@ while running:
             ]
 
         # 绘制经济学分析
-        pygame.draw.rect(screen, (240, 248, 255), (WIDTH // 2 - 350, 380, 700, 120), border_radius=8)
-        analysis_title = font_small.render("经济学分析:", True, ACCENT)
-        screen.blit(analysis_title, (WIDTH // 2 - 330, 390))
-
         for i, text in enumerate(analysis_texts):
-            analysis_text = font_tiny.render(text, True, TEXT_COLOR)
+            analysis_text = text_cache.render(font_tiny, text, TEXT_COLOR)
             screen.blit(analysis_text, (WIDTH // 2 - 330, 420 + i * 20))
 
         # 绘制按钮
         continue_btn.draw(screen)
         back_btn.draw(screen)
+        analytics_btn.draw(screen)
+    
+    # 数据分析页面
+    elif game.game_phase == "analytics":
+        analytics_back_btn.draw(screen)
+    
+    if profiler.enabled:
+        hud.draw(screen)
+
+
+# 各页面上可能单独重绘的控件
+def page_widgets():
+    extra = [hud] if profiler.enabled else []
+    if game.game_phase == "cover":
+        return [start_btn] + extra
+    elif game.game_phase == "playing":
+        zone_view = [layer_btn, city_map] if show_map else [area_list]
+        return [execute_btn, next_btn, view_btn] + zone_view + visible_sliders() + checkboxes + [projection_chart] + extra
+    elif game.game_phase == "analytics":
+        return [analytics_back_btn] + extra
+    return [continue_btn, back_btn, analytics_btn] + extra
 
-        # 操作提示
-        help_text = font_tiny.render("点击'继续'进入下一天，或点击'返回封面'重新开始", True, (150, 150, 150))
-        screen.blit(help_text, (WIDTH // 2 - help_text.get_width() // 2, HEIGHT - 40))
 
+# 主游戏循环
+def main():
+    global show_map
+    clock = pygame.time.Clock()
+    running = True
+    full_redraw = True  # 页面或模型结果变化时整屏重绘，否则只重绘变化的控件
+    
+    # 先显示第一帧，报告启动耗时
+    draw_frame()
     pygame.display.flip()
-    clock.tick(60)
+    startup_end = time.perf_counter()
+    if profiler.enabled:
+        profiler.record("startup", "startup", STARTUP_BEGIN, startup_end)
+    print(f"启动耗时: {(startup_end - STARTUP_BEGIN) * 1000:.0f} ms")
+
+    while running:
+        if profiler.enabled or any(slider.dragging for slider in sliders):
+            # 拖动滑块或显示剖析浮层时按帧率轮询
+            events = pygame.event.get()
+        else:
+            # 空闲时阻塞等待事件，不占用 CPU
+            events = [pygame.event.wait()] + pygame.event.get()
+        profiler.begin_frame()
+        mouse_pos = pygame.mouse.get_pos()
+        phase = game.game_phase
+        
+        with profiler.span("events"):
+            for event in events:
+                if event.type == QUIT:
+                    running = False
+                elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                    full_redraw = True
+                elif event.type == KEYDOWN and event.key == K_F3:
+                    # 开关性能剖析，关闭时整屏重绘以擦掉浮层
+                    profiler.enabled = not profiler.enabled
+                    full_redraw = True
+                
+                # 处理封面按钮
+                if game.game_phase == "cover":
+                    if start_btn.is_clicked(mouse_pos, event):
+                        game.game_phase = "playing"
+                        if decision_log is not None:
+                            decision_log.start()
+                
+                # 处理游戏内按钮
+                elif game.game_phase == "playing":
+                    if execute_btn.is_clicked(mouse_pos, event):
+                        # 更新区域价格
+                        changed = (pending_prices != game.zones.price).nonzero()[0]
+                        game.set_prices(pending_prices)
+                        
+                        # 更新策略
+                        game.strategies["高峰溢价"] = checkboxes[0].checked
+                        game.strategies["需求激励"] = checkboxes[1].checked
+                        game.strategies["夜间折扣"] = checkboxes[2].checked
+                        
+                        # 计算并显示结果
+                        game.last_results = game.evaluate()
+                        full_redraw = True
+                        
+                        if decision_log is not None:
+                            if len(changed):
+                                decision_log.prices(changed, pending_prices[changed])
+                            decision_log.strategies(strategies_to_mask(game.strategies))
+                            decision_log.execute()
+                    
+                    if next_btn.is_clicked(mouse_pos, event):
+                        # 推进到下一个时段
+                        game.advance_time()
+                        if decision_log is not None:
+                            decision_log.next_slot()
+                        
+                        # 更新滑块值
+                        pending_prices[:] = game.zones.price
+                        bind_sliders()
+                        
+                        # 重置复选框
+                        for cb in checkboxes:
+                            cb.checked = False
+                        projection.reset(pending_prices, 0)
+                        full_redraw = True
+                    
+                    # 处理复选框点击
+                    for cb in checkboxes:
+                        cb.toggle(mouse_pos, event)
+                    
+                    # 切换区域列表 / 城市热力图
+                    if view_btn.is_clicked(mouse_pos, event):
+                        show_map = not show_map
+                        view_btn.text = "列表" if show_map else "地图"
+                        full_redraw = True
+                    
+                    if show_map:
+                        if layer_btn.is_clicked(mouse_pos, event):
+                            city_map.layer = 1 - city_map.layer
+                            layer_btn.text = CityMap.LAYERS[1 - city_map.layer][0]
+                            city_map.dirty = True
+                        # 点击地图上的区域，滑块跳到该区域
+                        if city_map.handle(mouse_pos, event):
+                            select_zone(city_map.selected)
+                    # 滚动区域列表，滑块跟随可见区域
+                    elif area_list.handle(mouse_pos, event):
+                        bind_sliders()
+                
+                # 处理总结页面按钮
+                elif game.game_phase == "day_summary":
+                    if continue_btn.is_clicked(mouse_pos, event):
+                        game.game_phase = "playing"
+                        if decision_log is not None:
+                            decision_log.continue_day()
+                    if back_btn.is_clicked(mouse_pos, event):
+                        game.game_phase = "cover"
+                        if decision_log is not None:
+                            decision_log.back()
+                    if analytics_btn.is_clicked(mouse_pos, event):
+                        # 只看数据，不改变游戏状态，不记入决策日志
+                        day_stats.sync(game.day_history)
+                        game.game_phase = "analytics"
+                
+                # 处理数据分析页面按钮
+                elif game.game_phase == "analytics":
+                    if analytics_back_btn.is_clicked(mouse_pos, event):
+                        game.game_phase = "day_summary"
+        
+        # 更新滑块值
+        if game.game_phase == "playing":
+            with profiler.span("slider_update"):
+                for slider in visible_sliders():
+                    pending_prices[slider.zone] = slider.update(mouse_pos, events)
+            with profiler.span("projection"):
+                projection.set_strategy(strategies_to_mask({name: cb.checked for name, cb in zip(STRATEGY_NAMES, checkboxes)}))
+                dragged = None
+                for slider in visible_sliders():
+                    projection.set_price(slider.zone, pending_prices[slider.zone])
+                    if slider.dragging:
+                        dragged = slider
+                projection_chart.follow(dragged)
+        
+        # 更新悬停状态
+        if game.game_phase == "cover":
+            start_btn.check_hover(mouse_pos)
+        elif game.game_phase == "playing":
+            execute_btn.check_hover(mouse_pos)
+            next_btn.check_hover(mouse_pos)
+            view_btn.check_hover(mouse_pos)
+            if show_map:
+                layer_btn.check_hover(mouse_pos)
+            for cb in checkboxes:
+                cb.check_hover(mouse_pos)
+        elif game.game_phase == "day_summary":
+            continue_btn.check_hover(mouse_pos)
+            back_btn.check_hover(mouse_pos)
+            analytics_btn.check_hover(mouse_pos)
+        elif game.game_phase == "analytics":
+            analytics_back_btn.check_hover(mouse_pos)
+        
+        if game.game_phase != phase:
+            full_redraw = True
+        
+        if full_redraw:
+            with profiler.span("draw"):
+                draw_frame()
+            with profiler.span("flip"):
+                pygame.display.flip()
+            for widget in page_widgets():
+                widget.dirty = False
+            full_redraw = False
+        else:
+            # 只重绘状态变化的控件：先用静态图层盖住原区域，再画控件
+            with profiler.span("draw"):
+                background = page_layer()
+                rects = []
+                for widget in page_widgets():
+                    if widget.dirty:
+                        rect = widget.bounds
+                        screen.blit(background, rect, rect)
+                        widget.draw(screen)
+                        rects.append(rect)
+                        widget.dirty = False
+            if rects:
+                with profiler.span("flip"):
+                    pygame.display.update(rects)
+        
+        with profiler.span("tick"):
+            clock.tick(60)
+        profiler.end_frame()
+        # 浮层每帧刷新
+        hud.dirty = profiler.enabled
+
+    if decision_log is not None:
+        decision_log.close()
+    if profiler.events:
+        profiler.write_chrome_trace(TRACE_PATH)
+        print(f"性能记录已写入 {TRACE_PATH}")
+    pygame.quit()
+    sys.exit()
+
 
-pygame.quit()
-sys.exit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
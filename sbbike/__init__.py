@@ -0,0 +1,4 @@
+"""共享单车动态定价模拟的核心模块"""
+from .model import GameState
+
+__all__ = ["GameState"]
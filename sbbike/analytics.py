@@ -0,0 +1,134 @@
+"""每日结果的流式统计和折线图降采样
+
+DayStats 每追加一天只做 O(1) 的更新：全部天数和最近 window 天净收益的均值与方差
+（Welford 算法，窗口移出时反向更新），累计罚款，以及各天气下的收入合计和天数。
+净收益、滑动均值和累计罚款按天存进 array.array，画图时用 LTTB 降采样到图宽的点数，
+十万天的历史也只画几百个点；降采样结果按天数缓存，没有新数据时直接复用。
+"""
+from array import array
+from collections import deque
+
+import numpy as np
+
+from .params import WEATHERS
+
+
+class DayStats:
+    def __init__(self, window=30):
+        self.window = window
+        self.count = 0
+        # 全部天数
+        self.mean = 0.0
+        self._m2 = 0.0
+        # 最近 window 天
+        self.recent = deque()
+        self.recent_mean = 0.0
+        self._recent_m2 = 0.0
+        self.total_penalty = 0.0
+        self.weather_revenue = [0.0] * len(WEATHERS)
+        self.weather_days = [0] * len(WEATHERS)
+        # 画图用的逐日序列
+        self.net = array("d")
+        self.rolling_mean = array("d")
+        self.cumulative_penalty = array("d")
+        self._synced = 0
+        self._downsampled = {}
+
+    def update(self, revenue, penalty, net, weather):
+        """追加一天，weather 为天气名称"""
+        self.count += 1
+        delta = net - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (net - self.mean)
+
+        self.recent.append(net)
+        n = len(self.recent)
+        delta = net - self.recent_mean
+        self.recent_mean += delta / n
+        self._recent_m2 += delta * (net - self.recent_mean)
+        if n > self.window:
+            old = self.recent.popleft()
+            delta = old - self.recent_mean
+            self.recent_mean -= delta / (n - 1)
+            self._recent_m2 = max(0.0, self._recent_m2 - delta * (old - self.recent_mean))
+
+        self.total_penalty += penalty
+        w = WEATHERS.index(weather)
+        self.weather_revenue[w] += revenue
+        self.weather_days[w] += 1
+
+        self.net.append(net)
+        self.rolling_mean.append(self.recent_mean)
+        self.cumulative_penalty.append(self.total_penalty)
+
+    def sync(self, history):
+        """把 DayHistory 中上次同步之后新增的天追加进来，返回新增天数
+
+        已移出历史内存窗口的天无法补上，应在每天结束时同步（如 run_days 的 on_day）。
+        """
+        segments = history.segments()
+        first = segments[0][1] if segments else history.count
+        start = max(self._synced, first)
+        for i in range(start, history.count):
+            row = history[i]
+            self.update(row["revenue"], row["penalty"], row["net"], row["weather"])
+        added = history.count - self._synced
+        self._synced = history.count
+        return added
+
+    @property
+    def variance(self):
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def recent_variance(self):
+        return self._recent_m2 / len(self.recent) if self.recent else 0.0
+
+    def weather_mean_revenue(self):
+        """各天气下的日均收入，没有出现过的天气为 None"""
+        return [total / days if days else None for total, days in zip(self.weather_revenue, self.weather_days)]
+
+    def downsampled(self, name, points):
+        """序列 name 降采样到不超过 points 个点，返回 (天序号, 数值) 两个数组"""
+        key = (name, points)
+        cached = self._downsampled.get(key)
+        if cached is None or cached[0] != self.count:
+            cached = (self.count, lttb(np.frombuffer(getattr(self, name), dtype=np.float64), points))
+            self._downsampled[key] = cached
+        return cached[1]
+
+
+def lttb(y, points):
+    """Largest-Triangle-Three-Buckets 降采样，x 为下标
+
+    保留首尾两点，其余各桶中选出与前一选中点和下一桶均值构成的三角形面积最大的点，
+    曲线的峰谷基本都能保留。返回 (下标, 数值)。
+    """
+    n = len(y)
+    if points >= n or points < 3:
+        index = np.arange(n)
+        return index, np.asarray(y, dtype=np.float64)[index]
+
+    # 中间 n - 2 个点分成 points - 2 个桶
+    edges = (np.arange(points - 1) * ((n - 2) / (points - 2))).astype(np.intp) + 1
+    edges[-1] = n - 1
+    # 各桶的均值（最后一个桶之后用末点），用前缀和一次算出
+    cumsum = np.concatenate(([0.0], np.cumsum(y)))
+    starts, ends = edges[:-1], edges[1:]
+    next_x = np.append((starts[1:] + ends[1:] - 1) / 2, n - 1)
+    next_y = np.append((cumsum[ends[1:]] - cumsum[starts[1:]]) / (ends[1:] - starts[1:]), y[-1])
+
+    y = np.asarray(y, dtype=np.float64)
+    xs = np.arange(n, dtype=np.float64)
+    index = [0]
+    a = 0
+    # 逐桶依赖上一个选中点，只能顺序处理；循环内用 Python 标量减少 NumPy 调用开销
+    for lo, hi, cx, cy in zip(starts.tolist(), ends.tolist(), next_x.tolist(), next_y.tolist()):
+        ay = float(y[a])
+        # 三角形面积的两倍（省去常数因子不影响取最大）
+        area = np.abs((a - cx) * (y[lo:hi] - ay) - (a - xs[lo:hi]) * (cy - ay))
+        a = lo + int(area.argmax())
+        index.append(a)
+    index.append(n - 1)
+    index = np.array(index, dtype=np.intp)
+    return index, y[index]
@@ -0,0 +1,242 @@
+"""性能基准测试
+
+覆盖模型各计算函数（3、100、10000 个区域）、无界面整季模拟、空间索引查询、
+各页面的单帧绘制时间和游戏冷启动时间。
+结果保存为 JSON，可与之前保存的基线比较，找出变慢的项目。
+
+每一项先自动确定每轮调用次数（单轮至少 min_time 秒），再重复若干轮，
+记录每次调用耗时的中位数、最小值和平均值；比较时使用中位数。
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from .headless import run_days
+from .model import GameState
+from .spatial import GridIndex
+from .zones import ZoneStore
+
+ZONE_COUNTS = (3, 100, 10000)
+SEASON_DAYS = 30
+PHASES = ("cover", "playing", "day_summary")
+# 相对基线变慢超过该比例视为性能回退
+DEFAULT_THRESHOLD = 0.10
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_SCRIPT = os.path.join(REPO_DIR, "public bicycle game.py")
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """测量 func 单次调用的耗时（秒）"""
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    per_call = [t / number for t in timer.repeat(repeat, number)]
+    return {
+        "median": statistics.median(per_call),
+        "min": min(per_call),
+        "mean": statistics.fmean(per_call),
+        "calls": number * repeat,
+    }
+
+
+def make_game(zones):
+    """zones 为 3 时使用默认的三个区域，否则随机生成城市"""
+    return GameState(0, zones=None if zones == 3 else ZoneStore.generate(zones, 0))
+
+
+def model_benchmarks(repeat, min_time, zone_counts=ZONE_COUNTS):
+    """模型各计算函数，每次调用前清空缓存，测的是实际计算开销"""
+    results = {}
+    for n in zone_counts:
+        game = make_game(n)
+        game.game_phase = "playing"
+        area = game.zones.names[0]
+
+        def cold(method, *args):
+            def call():
+                game.invalidate()
+                method(*args)
+            return call
+
+        results[f"calculate_demand/{n}"] = measure(cold(game.calculate_demand, area), repeat, min_time)
+        results[f"calculate_revenue/{n}"] = measure(cold(game.calculate_revenue), repeat, min_time)
+        results[f"calculate_costs/{n}"] = measure(cold(game.calculate_costs), repeat, min_time)
+        results[f"calculate_penalty/{n}"] = measure(cold(game.calculate_penalty), repeat, min_time)
+        results[f"advance_time/{n}"] = measure(game.advance_time, repeat, min_time)
+    return results
+
+
+def season_benchmarks(repeat, min_time, zone_counts=(3, 100), days=SEASON_DAYS):
+    """无界面整季模拟"""
+    results = {}
+    for n in zone_counts:
+        results[f"season_{days}d/{n}"] = measure(lambda: run_days(days, make_game(n)), repeat, min_time)
+    return results
+
+
+def spatial_benchmarks(repeat, min_time, zones=10000, points=1_000_000):
+    """把一批点分配到最近的区域，以及查询每个区域最近的 16 个区域"""
+    store = ZoneStore.generate(zones, 0)
+    index = GridIndex.from_zones(store)
+    rng = np.random.default_rng(0)
+    px = rng.uniform(store.x.min(), store.x.max(), points)
+    py = rng.uniform(store.y.min(), store.y.max(), points)
+    return {
+        f"spatial_assign_{points}/{zones}": measure(lambda: index.assign(px, py), repeat, min_time),
+        f"spatial_knn16/{zones}": measure(lambda: index.query(store.x, store.y, 16), repeat, min_time),
+    }
+
+
+def load_gui(zones=None):
+    """在 dummy 视频驱动下加载游戏脚本（不进入主循环），返回其全局变量"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if zones:
+        os.environ["SBBIKE_ZONES"] = str(zones)
+    else:
+        os.environ.pop("SBBIKE_ZONES", None)
+    import runpy
+    return runpy.run_path(GUI_SCRIPT, run_name="sbbike_gui")
+
+
+def render_benchmarks(repeat, min_time):
+    """各页面整帧绘制（draw_frame + flip）的耗时"""
+    try:
+        import pygame
+    except ImportError:
+        return {}
+
+    results = {}
+    for zones, phases in ((None, PHASES), (10000, ("playing",))):
+        gui = load_gui(zones)
+        game = gui["game"]
+        # 先推进一天，让总结页面有数据可画
+        game.advance_day()
+        for phase in phases:
+            game.game_phase = phase
+
+            def frame():
+                gui["draw_frame"]()
+                pygame.display.flip()
+
+            name = f"render/{phase}" if zones is None else f"render/{phase}/{zones}"
+            results[name] = measure(frame, repeat, min_time)
+        if zones is not None:
+            # 城市热力图单独计时（不含整屏翻转）
+            city_map = gui["city_map"]
+            results[f"render/map/{zones}"] = measure(lambda: city_map.draw(gui["screen"]), repeat, min_time)
+    return results
+
+
+def startup_benchmark(repeat):
+    """在新进程中启动游戏直到第一帧显示、随即退出的总耗时（含解释器启动）"""
+    code = ("import pygame, runpy\n"
+            "pygame.event.wait = lambda *args: pygame.event.Event(pygame.QUIT)\n"
+            f"runpy.run_path({GUI_SCRIPT!r}, run_name='__main__')\n")
+    # 子进程在仓库目录中运行并把它放在 PYTHONPATH 最前，从任何目录运行 bench 都能导入 sbbike
+    path = os.pathsep.join(p for p in (REPO_DIR, os.environ.get("PYTHONPATH")) if p)
+    env = dict(os.environ, SDL_VIDEODRIVER=os.environ.get("SDL_VIDEODRIVER", "dummy"), PYTHONPATH=path)
+    env.pop("SBBIKE_ZONES", None)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], env=env, cwd=REPO_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return {"startup": {"median": statistics.median(times), "min": min(times),
+                        "mean": statistics.fmean(times), "calls": repeat}}
+
+
+def environment():
+    info = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        import pygame
+        info["pygame"] = pygame.version.ver
+    except ImportError:
+        pass
+    return info
+
+
+def run(quick=False, render=True):
+    """运行全部基准测试，返回可写入 JSON 的结果"""
+    repeat, min_time = (3, 0.02) if quick else (5, 0.2)
+    results = {}
+    results.update(model_benchmarks(repeat, min_time))
+    results.update(season_benchmarks(repeat, min_time))
+    results.update(spatial_benchmarks(repeat, min_time))
+    if render:
+        results.update(render_benchmarks(repeat, min_time))
+        results.update(startup_benchmark(repeat))
+    return {"environment": environment(), "results": results}
+
+
+def save(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """逐项比较中位数耗时
+
+    返回 [(名称, 基线秒数, 当前秒数, 比值, 状态)]，状态为 "slower"、"faster"、"ok"，
+    只在一方出现的项目为 "new" 或 "missing"。
+    """
+    base = baseline["results"]
+    cur = current["results"]
+    rows = []
+    for name in sorted(set(base) | set(cur)):
+        if name not in base:
+            rows.append((name, None, cur[name]["median"], None, "new"))
+        elif name not in cur:
+            rows.append((name, base[name]["median"], None, None, "missing"))
+        else:
+            b, c = base[name]["median"], cur[name]["median"]
+            ratio = c / b if b > 0 else float("inf")
+            if ratio > 1 + threshold:
+                status = "slower"
+            elif ratio < 1 / (1 + threshold):
+                status = "faster"
+            else:
+                status = "ok"
+            rows.append((name, b, c, ratio, status))
+    return rows
+
+
+def format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f} ms"
+    return f"{seconds:.3f} s"
+
+
+def print_report(report, file=sys.stdout):
+    for name, r in report["results"].items():
+        print(f"{name:32s} {format_seconds(r['median']):>12s}  (最小 {format_seconds(r['min'])})", file=file)
+
+
+def print_comparison(rows, file=sys.stdout):
+    for name, b, c, ratio, status in rows:
+        change = "" if ratio is None else f"{(ratio - 1) * 100:+.1f}%"
+        print(f"{name:32s} {format_seconds(b):>12s} -> {format_seconds(c):>12s} {change:>8s}  {status}", file=file)
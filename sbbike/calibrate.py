@@ -0,0 +1,354 @@
+"""用真实骑行记录校准需求模型
+
+一次顺序扫描骑行日志（每行一次骑行：天、时段、起点区域、价格、天气），按
+(区域, 时段, 天气, 价格档) 累加回归所需的充分统计量，再拟合时段系数、高峰/平峰价格弹性、
+天气系数和各区域基础需求，写成 JSON 系数文件；设置 SBBIKE_COEFFICIENTS（或
+sbbike14.py --coefficients）后模型启动时加载（见 params.load_coefficients）。
+
+输入格式：
+- 二进制：TRIP_DTYPE 定长记录，用 np.memmap 映射后按块读取，不整体载入内存；
+- CSV：表头 day,slot,zone,price,weather，按固定字节数分块读取，每块用 np.loadtxt
+  整块解析；weather 可以是天气名或 WEATHERS 中的下标。格式错误（列数不对、不是数字、
+  day/slot/zone/weather 不是整数、天气下标越界）时报告文件中的行号。
+日志须按天非递减排列。同一天、同一时段、同一区域的骑行数除以 TRIPS_PER_DEMAND 为
+该时段的需求；每块只保留最后一天的行到下一块，内存占用与文件大小无关。
+没有任何骑行的 (天, 时段, 区域) 不在日志中，需求很低时估计会略微偏高。
+
+模型为 需求 = 基础需求[区域] × 时段系数[时段] × (1 + 弹性 × (价格 - 2) / 0.5) × 天气系数[天气, 时段]，
+再截断到 [DEMAND_MIN, DEMAND_MAX]：
+0. 截断：同一 (区域, 时段, 天气, 价格档) 的需求相同，平均需求与截断边界的差在泊松噪声的
+   CLIP_SIGMAS 倍标准差以内的格视为被截断，不参与拟合（只用未截断的范围）；
+1. 每个 (区域, 时段, 天气) 组对 x = (价格 - 2) / 0.5 做加权线性回归，截距 α、斜率 β
+   之比即弹性，同一类时段（高峰/平峰）的各组合并求 β / α；
+2. 去掉价格影响后各组的需求取对数，按 log 基础需求 + log 时段系数 + log 天气系数
+   交替加权最小二乘，日间时段系数和晴天天气系数固定为 1。
+所有格都被截断的组不提供信息；价格档按 PRICE_RANGES 的总范围以 PRICE_STEP 划分，
+范围外的价格并入两端的档（回归仍用精确的价格）。
+"""
+import io
+import json
+import os
+
+import numpy as np
+
+from . import engine, params
+from .params import (
+    DEFAULT_AREAS,
+    DEMAND_MAX,
+    DEMAND_MIN,
+    PEAK_SLOTS,
+    PRICE_RANGES,
+    PRICE_STEP,
+    TRIPS_PER_DEMAND,
+    WEATHER_WEIGHTS,
+    WEATHERS,
+)
+
+TRIP_DTYPE = np.dtype([("day", "<i4"), ("slot", "u1"), ("zone", "<i4"), ("price", "<f4"), ("weather", "u1")])
+CSV_COLUMNS = ("day", "slot", "zone", "price", "weather")
+CHUNK_ROWS = 1 << 22
+CHUNK_BYTES = 1 << 26
+N_SLOTS = engine.N_TIMES
+N_WEATHERS = len(WEATHERS)
+# 时段系数以日间为基准
+REFERENCE_SLOT = 1
+# 充分统计量：实例数、Σx、Σx²、Σ需求、Σ需求·x
+N_MOMENTS = 5
+# 价格档：覆盖所有区域滑块范围，步长 PRICE_STEP
+PRICE_LOW = min(lo for lo, _ in PRICE_RANGES.values())
+N_PRICE_BINS = int(round((max(hi for _, hi in PRICE_RANGES.values()) - PRICE_LOW) / PRICE_STEP)) + 1
+# 平均需求距截断边界不超过这么多倍标准差时视为被截断
+CLIP_SIGMAS = 4.0
+
+
+def iter_binary(path, chunk_rows=CHUNK_ROWS):
+    """把二进制日志映射到内存，按块产生各列"""
+    if os.path.getsize(path) == 0:
+        return
+    records = np.memmap(path, dtype=TRIP_DTYPE, mode="r")
+    for start in range(0, len(records), chunk_rows):
+        chunk = records[start:start + chunk_rows]
+        yield {name: np.asarray(chunk[name]) for name in CSV_COLUMNS}
+
+
+def iter_csv(path, chunk_bytes=CHUNK_BYTES):
+    """按块读取 CSV，每块在最后一个换行处截断，剩余部分并入下一块"""
+    with open(path, "rb") as f:
+        header = f.readline().decode("utf-8").strip().split(",")
+        if [h.strip() for h in header] != list(CSV_COLUMNS):
+            raise ValueError(f"{path}: expected CSV header {','.join(CSV_COLUMNS)}")
+        line = 2  # 下一块第一行的行号
+        rest = b""
+        while True:
+            block = f.read(chunk_bytes)
+            data = rest + block
+            if not block:
+                rest = b""
+            else:
+                cut = data.rfind(b"\n") + 1
+                data, rest = data[:cut], data[cut:]
+            if data.strip():
+                try:
+                    yield _parse_csv(data, line)
+                except ValueError as exc:
+                    raise ValueError(f"{path}: {exc}") from None
+            line += data.count(b"\n")
+            if not block:
+                break
+
+
+def _valid_row(line):
+    fields = line.split(b",")
+    if len(fields) != len(CSV_COLUMNS):
+        return False
+    try:
+        for field in fields[:-1]:
+            float(field)
+        if fields[-1].strip().decode() not in WEATHERS:
+            float(fields[-1])
+    except ValueError:
+        return False
+    return True
+
+
+def _bad_line(data, first_line, row=None):
+    """data 中第 row 个非空行（默认为第一个格式错误的行）的行号和内容，用于报错"""
+    lines = [(first_line + i, line) for i, line in enumerate(data.split(b"\n")) if line.strip()]
+    if row is None:
+        row = next((i for i, (_, line) in enumerate(lines) if not _valid_row(line)), 0)
+    number, line = lines[row]
+    return f"line {number}: malformed CSV row {line.strip().decode('utf-8', 'replace')!r}"
+
+
+def _parse_csv(data, first_line=2):
+    """解析若干完整的 CSV 行；first_line 为 data 第一行在文件中的行号"""
+    text = data.replace(b"\r", b"")
+    for code, name in enumerate(WEATHERS):
+        text = text.replace(name.encode(), str(code).encode())
+    try:
+        values = np.loadtxt(io.StringIO(text.decode("utf-8")), delimiter=",", ndmin=2)
+    except ValueError:
+        raise ValueError(_bad_line(data, first_line)) from None
+    if values.shape[1] != len(CSV_COLUMNS):
+        raise ValueError(_bad_line(data, first_line, 0))
+    codes = values[:, [0, 1, 2, 4]]
+    bad = np.flatnonzero((codes != np.floor(codes)).any(axis=1) | ~np.isfinite(values).all(axis=1) |
+                         (values[:, 4] < 0) | (values[:, 4] >= N_WEATHERS))
+    if len(bad):
+        raise ValueError(_bad_line(data, first_line, bad[0]))
+    return {
+        "day": values[:, 0].astype(np.int64),
+        "slot": values[:, 1].astype(np.int64),
+        "zone": values[:, 2].astype(np.int64),
+        "price": values[:, 3],
+        "weather": values[:, 4].astype(np.int64),
+    }
+
+
+def iter_log(path, chunk_rows=CHUNK_ROWS):
+    """按扩展名选择格式：.csv 为 CSV，其余为二进制"""
+    if path.endswith(".csv"):
+        return iter_csv(path)
+    return iter_binary(path, chunk_rows)
+
+
+class Aggregator:
+    """逐块累加 (区域, 时段, 天气, 价格档) 的充分统计量"""
+
+    def __init__(self):
+        self.moments = np.zeros((0, N_SLOTS, N_WEATHERS, N_PRICE_BINS, N_MOMENTS))
+        self.rows = 0
+        self.instances = 0
+        self._pending = None
+        self._last_day = None
+
+    def add(self, chunk):
+        """加入一块；最后一天的行可能在下一块继续，留到下次处理"""
+        day = np.asarray(chunk["day"], dtype=np.int64)
+        if len(day) == 0:
+            return
+        if np.any(np.diff(day) < 0) or (self._last_day is not None and day[0] < self._last_day):
+            raise ValueError("trip log must be sorted by day")
+        self._last_day = int(day[-1])
+        self.rows += len(day)
+        columns = {name: np.asarray(chunk[name]) for name in CSV_COLUMNS}
+        if self._pending is not None:
+            columns = {name: np.concatenate((self._pending[name], columns[name])) for name in CSV_COLUMNS}
+        split = np.searchsorted(columns["day"], columns["day"][-1])
+        self._pending = {name: column[split:] for name, column in columns.items()}
+        if split:
+            self._accumulate({name: column[:split] for name, column in columns.items()})
+
+    def finish(self):
+        if self._pending is not None and len(self._pending["day"]):
+            self._accumulate(self._pending)
+        self._pending = None
+
+    def _accumulate(self, rows):
+        day = rows["day"].astype(np.int64)
+        slot = rows["slot"].astype(np.int64)
+        zone = rows["zone"].astype(np.int64)
+        if np.any((slot < 0) | (slot >= N_SLOTS)) or np.any(zone < 0):
+            raise ValueError("slot or zone out of range")
+        zones = int(zone.max()) + 1
+        if zones > len(self.moments):
+            grown = np.zeros((zones, N_SLOTS, N_WEATHERS, N_PRICE_BINS, N_MOMENTS))
+            grown[:len(self.moments)] = self.moments
+            self.moments = grown
+
+        # 每个 (天, 时段, 区域) 为一个实例：骑行数为行数，价格和天气取第一行
+        key = ((day - day[0]) * N_SLOTS + slot) * zones + zone
+        span = int(key.max()) + 1
+        if span <= 8 * len(key):
+            counts = np.bincount(key, minlength=span)
+            present = np.flatnonzero(counts)
+            first = np.full(span, len(key))
+            np.minimum.at(first, key, np.arange(len(key)))
+            first = first[present]
+            counts = counts[present]
+        else:
+            _, first, counts = np.unique(key, return_index=True, return_counts=True)
+        self.instances += len(first)
+
+        demand = counts / TRIPS_PER_DEMAND
+        price = rows["price"][first].astype(np.float64)
+        x = (price - 2.0) / 0.5
+        level = np.clip(np.round((price - PRICE_LOW) / PRICE_STEP), 0, N_PRICE_BINS - 1).astype(np.int64)
+        group = ((zone[first] * N_SLOTS + slot[first]) * N_WEATHERS +
+                 rows["weather"][first].astype(np.int64)) * N_PRICE_BINS + level
+        size = len(self.moments) * N_SLOTS * N_WEATHERS * N_PRICE_BINS
+        flat = self.moments.reshape(size, N_MOMENTS)
+        for k, weights in enumerate((None, x, x * x, demand, demand * x)):
+            flat[:, k] += np.bincount(group, weights, minlength=size)
+
+    def censored(self):
+        """各 (区域, 时段, 天气, 价格档) 格是否被截断：平均需求在边界的噪声范围以内"""
+        n, sm = self.moments[..., 0], self.moments[..., 3]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = sm / n
+            # 骑行数为泊松分布，n 个实例的平均需求的标准差为 sqrt(需求 / (TRIPS_PER_DEMAND × n))
+            low = DEMAND_MIN + CLIP_SIGMAS * np.sqrt(DEMAND_MIN / (TRIPS_PER_DEMAND * n))
+            high = DEMAND_MAX - CLIP_SIGMAS * np.sqrt(DEMAND_MAX / (TRIPS_PER_DEMAND * n))
+        return (n > 0) & ((mean <= low) | (mean >= high))
+
+    def fit(self, iterations=200):
+        """拟合模型系数，返回可写入 JSON 的字典"""
+        censored = self.censored()
+        # 去掉被截断的格后按价格档求和，得到各 (区域, 时段, 天气) 组的统计量
+        n, sx, sxx, sm, smx = np.moveaxis(np.where(censored[..., None], 0.0, self.moments).sum(axis=3), -1, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_x = sx / n
+            var_x = sxx / n - mean_x ** 2
+            beta = (smx / n - mean_x * sm / n) / var_x
+            alpha = sm / n - beta * mean_x
+        # 1. 弹性：各组 β = 弹性 × α，按实例数加权合并同一类时段的组
+        varied = (n > 2) & (var_x > 1e-9)
+        peak = np.isin(np.arange(N_SLOTS), PEAK_SLOTS)[None, :, None]
+        elasticity = {}
+        for label, slots in (("peak", peak), ("offpeak", ~peak)):
+            use = varied & slots
+            den = (n * alpha ** 2)[use].sum()
+            elasticity[label] = float((n * alpha * beta)[use].sum() / den) if den > 0 else None
+        e = np.where(peak, elasticity["peak"] or 0.0, elasticity["offpeak"] or 0.0)
+
+        # 2. 去掉价格影响后的各组需求，对数域交替最小二乘
+        with np.errstate(invalid="ignore", divide="ignore"):
+            level = sm / (n + e * sx)
+        weight = np.where((n > 0) & (level > 0), n, 0.0)
+        y = np.log(np.where(weight > 0, level, 1.0))
+        log_base = np.zeros(len(self.moments))
+        log_time = np.zeros(N_SLOTS)
+        log_weather = np.zeros((N_WEATHERS, N_SLOTS))
+
+        def wmean(values, axes):
+            total = weight.sum(axis=axes)
+            return np.where(total > 0, (weight * values).sum(axis=axes) / np.where(total > 0, total, 1), 0.0)
+
+        for _ in range(iterations):
+            log_base = wmean(y - log_time[None, :, None] - log_weather.T[None], (1, 2))
+            log_time = wmean(y - log_base[:, None, None] - log_weather.T[None], (0, 2))
+            log_weather = wmean(y - log_base[:, None, None] - log_time[None, :, None], 0).T
+            log_weather[0] = 0.0  # 晴天为基准
+        # 日间时段系数为 1，差额并入基础需求
+        shift = log_time[REFERENCE_SLOT]
+        log_time -= shift
+        log_base += shift
+
+        names = zone_names(len(self.moments))
+        seen = weight.sum(axis=(1, 2)) > 0
+        return {
+            "time_factors": np.exp(log_time).round(4).tolist(),
+            "elasticity_peak": round(elasticity["peak"], 4) if elasticity["peak"] is not None else None,
+            "elasticity_offpeak": round(elasticity["offpeak"], 4) if elasticity["offpeak"] is not None else None,
+            "weather_factors": {w: np.exp(log_weather[i]).round(4).tolist() for i, w in enumerate(WEATHERS)},
+            "base_demand": {name: round(float(np.exp(b)), 4) for name, b, ok in zip(names, log_base, seen) if ok},
+            "rows": self.rows,
+            "instances": self.instances,
+            "censored": int(self.moments[..., 0][censored].sum()),
+        }
+
+
+def zone_names(n):
+    """区域序号对应的名称：3 个区域时为默认区域，否则与随机生成的城市相同"""
+    if n <= len(DEFAULT_AREAS):
+        return list(DEFAULT_AREAS)[:n]
+    return [f"站点{i + 1}" for i in range(n)]
+
+
+def calibrate(paths, chunk_rows=CHUNK_ROWS):
+    """扫描全部日志并拟合，返回系数字典"""
+    aggregator = Aggregator()
+    for path in paths:
+        for chunk in iter_log(path, chunk_rows):
+            aggregator.add(chunk)
+    aggregator.finish()
+    coefficients = aggregator.fit()
+    # 样本中没有价格变化的一类时段沿用当前弹性
+    if coefficients["elasticity_peak"] is None:
+        coefficients["elasticity_peak"] = params.ELASTICITY_PEAK
+    if coefficients["elasticity_offpeak"] is None:
+        coefficients["elasticity_offpeak"] = params.ELASTICITY_OFFPEAK
+    return coefficients
+
+
+def save(coefficients, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(coefficients, f, ensure_ascii=False, indent=2)
+
+
+def synthesize(path, days, zones=None, seed=0):
+    """按当前模型生成合成骑行日志（用于测试校准），价格在各区域滑块范围内随机取值
+
+    扩展名为 .csv 时写 CSV，否则写二进制；逐天写入，返回总行数。
+    """
+    from .zones import ZoneStore
+
+    store = ZoneStore.generate(zones, seed) if zones else ZoneStore.default()
+    rng = np.random.default_rng(seed)
+    n = len(store)
+    weather_p = np.asarray(WEATHER_WEIGHTS) / np.sum(WEATHER_WEIGHTS)
+    levels = [np.arange(lo, hi + PRICE_STEP / 2, PRICE_STEP) for lo, hi in zip(store.price_min, store.price_max)]
+    as_csv = path.endswith(".csv")
+    total = 0
+    with open(path, "w" if as_csv else "wb") as f:
+        if as_csv:
+            f.write(",".join(CSV_COLUMNS) + "\n")
+        for day in range(days):
+            weather = int(rng.choice(N_WEATHERS, p=weather_p))
+            prices = np.array([[rng.choice(levels[a]) for a in range(n)] for _ in range(N_SLOTS)])
+            demand = engine.demand(store.demand, prices, np.arange(N_SLOTS), weather, 0)
+            counts = rng.poisson(demand * TRIPS_PER_DEMAND).ravel()
+            records = np.zeros(int(counts.sum()), dtype=TRIP_DTYPE)
+            slot_zone = np.repeat(np.arange(N_SLOTS * n), counts)
+            records["day"] = day
+            records["slot"] = slot_zone // n
+            records["zone"] = slot_zone % n
+            records["price"] = prices.ravel()[slot_zone]
+            records["weather"] = weather
+            if as_csv:
+                np.savetxt(f, np.column_stack([records[c] for c in CSV_COLUMNS]),
+                           fmt=["%d", "%d", "%d", "%.2f", "%d"], delimiter=",")
+            else:
+                records.tofile(f)
+            total += len(records)
+    return total
@@ -0,0 +1,393 @@
+"""命令行入口"""
+import argparse
+import os
+import runpy
+
+HISTORY_WINDOW = 1000
+
+GUI_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public bicycle game.py")
+
+
+def make_zones(args):
+    """--zones 指定时随机生成城市站点，否则使用默认的三个区域"""
+    if not getattr(args, "zones", None):
+        return None
+    from .zones import ZoneStore
+    return ZoneStore.generate(args.zones, args.city_seed)
+
+
+def add_zone_arguments(p):
+    p.add_argument("--zones", type=int, default=None, help="随机生成的站点数（默认使用三个区域）")
+    p.add_argument("--city-seed", type=int, default=0, help="生成站点使用的随机种子")
+
+
+def add_slots_argument(p):
+    p.add_argument("--slots", type=int, default=None,
+                   help="把一天均匀分成该数目的时段（4～1440，须整除 1440），默认使用原来的四个时段")
+
+
+def check_slots(parser, args):
+    """检查时段数；细分时段时不能使用按四个时段生成的策略表"""
+    if not getattr(args, "slots", None):
+        return
+    from .timeline import TimeAxis
+    try:
+        TimeAxis.uniform(args.slots)
+    except ValueError as e:
+        parser.error(str(e))
+    if getattr(args, "policy", None):
+        parser.error("--policy is built for the default four slots and cannot be combined with --slots")
+
+
+def cmd_play(args):
+    """打开 pygame 游戏窗口"""
+    if getattr(args, "zones", None):
+        # 游戏脚本从环境变量读取站点设置
+        os.environ["SBBIKE_ZONES"] = str(args.zones)
+        os.environ["SBBIKE_CITY_SEED"] = str(args.city_seed)
+    if getattr(args, "seed", None) is not None:
+        os.environ["SBBIKE_SEED"] = str(args.seed)
+    if getattr(args, "log", None):
+        os.environ["SBBIKE_LOG"] = args.log
+    if getattr(args, "profile", False):
+        os.environ["SBBIKE_PROFILE"] = "1"
+    if getattr(args, "trace", None):
+        os.environ["SBBIKE_TRACE"] = args.trace
+    runpy.run_path(GUI_SCRIPT, run_name="__main__")
+
+
+def cmd_run(args):
+    """无界面连续模拟 N 天并报告吞吐量"""
+    from .headless import run_days
+    from .history import DayHistory
+    from .model import GameState
+
+    policy = None
+    if args.policy:
+        from .policy import PolicyTable
+        policy = PolicyTable.load(args.policy)
+    # 内存中只保留最近若干天，完整历史可写入文件
+    history = DayHistory(args.history, window=HISTORY_WINDOW)
+    zones = make_zones(args)
+    trips = None
+    if args.trips:
+        from .trips import TripSimulator
+        from .zones import ZoneStore
+        zones = zones if zones is not None else ZoneStore.default()
+        trips = TripSimulator(zones, seed=args.seed, scale=args.trip_scale)
+    time_axis = None
+    if args.slots:
+        from .timeline import TimeAxis
+        time_axis = TimeAxis.uniform(args.slots)
+    game = GameState(args.seed, history, zones, args.rebalance, trips, time_axis)
+    profiler = None
+    if args.trace:
+        from .profiler import Profiler
+        profiler = Profiler(enabled=True)
+        profiler.instrument(game)
+    stats = on_day = None
+    if args.dashboard:
+        from .analytics import DayStats
+        stats = DayStats()
+        # 每天结束时同步，历史移出内存窗口前就已计入统计
+        on_day = lambda game: stats.sync(game.day_history)
+    game, elapsed = run_days(args.days, game, policy, on_day)
+    history.close()
+
+    net = game.total_revenue - game.total_cost - game.total_penalty
+    print(f"模拟天数: {args.days}  区域数: {len(game.zones)}  每天时段数: {game.time_axis.slots}")
+    print(f"总收入: ¥{game.total_revenue:.1f}")
+    print(f"总成本: ¥{game.total_cost:.1f}")
+    print(f"总罚款: ¥{game.total_penalty:.1f}")
+    print(f"总净收益: ¥{net:.1f}")
+    if args.rebalance:
+        print(f"调度单车: {game.rebalanced_bikes} 辆  调度费: ¥{game.rebalance_cost:.1f}")
+    if trips is not None:
+        print(f"骑行请求: {trips.total_trips} 次  借车失败: {trips.total_lost} 次")
+    print(f"耗时: {elapsed:.3f} 秒")
+    print(f"吞吐量: {args.days / elapsed if elapsed > 0 else float('inf'):.0f} 天/秒")
+    if profiler is not None:
+        profiler.write_chrome_trace(args.trace)
+        print(f"性能记录已写入 {args.trace}")
+    if stats is not None:
+        from .dashboard import render_image
+        render_image(stats, args.dashboard)
+        print(f"数据分析面板已写入 {args.dashboard}")
+
+
+def cmd_optimize(args):
+    """穷举所有价格和策略组合，生成策略表"""
+    import time
+    from .model import GameState
+    from .policy import PolicyTable
+
+    start = time.perf_counter()
+    table = PolicyTable.build(GameState(zones=make_zones(args)))
+    elapsed = time.perf_counter() - start
+    table.save(args.output)
+    states = table.net.size if table.net is not None else table.strategy.size
+    print(f"策略表已写入 {args.output}（{len(table.areas)} 个区域，{states} 个状态，用时 {elapsed:.3f} 秒）")
+
+
+def cmd_plan(args):
+    """逆向归纳求多天最优策略的期望净收益，可用蒙特卡洛核对或给决策日志打分"""
+    import time
+    from .model import GameState
+    from .planner import Plan, grade
+
+    if args.grade:
+        print("文件\t时段数\t玩家净收益\t最优净收益\t差距")
+        for path in args.grade:
+            g = grade(path)
+            print(f"{path}\t{g['slots']}\t{g['net']:.1f}\t{g['best']:.1f}\t{g['regret']:.1f}")
+        return
+
+    zones = make_zones(args)
+    start = time.perf_counter()
+    plan = Plan.solve(GameState(zones=zones), args.days)
+    elapsed = time.perf_counter() - start
+    print(f"{args.days} 天最优策略的期望净收益: ¥{plan.expected():.1f}  （求解用时 {elapsed:.3f} 秒）")
+
+    if args.check:
+        import numpy as np
+        from .headless import run_days
+        from .montecarlo import season_seed
+
+        start = time.perf_counter()
+        nets = np.empty(args.check)
+        for i in range(args.check):
+            game, _ = run_days(args.days, GameState(season_seed(args.seed, i), zones=zones.copy() if zones else None),
+                               plan.policy)
+            nets[i] = game.total_revenue - game.total_cost - game.total_penalty
+        elapsed = time.perf_counter() - start
+        half_width = 1.96 * nets.std() / np.sqrt(args.check)
+        print(f"蒙特卡洛 {args.check} 季: ¥{nets.mean():.1f} ± {half_width:.1f} (95%)  （用时 {elapsed:.3f} 秒）")
+
+
+def cmd_montecarlo(args):
+    """多进程蒙特卡洛赛季模拟"""
+    from .montecarlo import METRICS, run_seasons
+
+    stats, elapsed = run_seasons(args.seasons, args.days, args.workers, args.seed, args.policy,
+                                 zones=args.zones, city_seed=args.city_seed, rebalancing=args.rebalance,
+                                 slots=args.slots)
+    labels = {"revenue": "收入", "cost": "成本", "penalty": "罚款", "net": "净收益"}
+    print(f"赛季数: {args.seasons}  每季天数: {args.days}  种子: {stats['seed']}")
+    for name in METRICS:
+        s = stats[name]
+        print(f"{labels[name]}: 均值 ¥{s['mean']:.1f}  标准差 ¥{s['std']:.1f}  "
+              f"P5 ¥{s['p5']:.1f}  P50 ¥{s['p50']:.1f}  P95 ¥{s['p95']:.1f}")
+    print(f"耗时: {elapsed:.3f} 秒  ({args.seasons / elapsed:.0f} 季/秒)")
+
+
+def replay_one(path):
+    """重放一个决策日志，返回汇总值（供进程池调用）"""
+    from .decisions import replay
+
+    _, game, decisions = replay(path)
+    return (path, game.day, decisions, game.total_revenue, game.total_cost, game.total_penalty,
+            game.total_revenue - game.total_cost - game.total_penalty)
+
+
+def cmd_replay(args):
+    """无界面重放决策日志"""
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    start = time.perf_counter()
+    if args.workers == 1:
+        results = [replay_one(path) for path in args.logs]
+    else:
+        with ProcessPoolExecutor(args.workers) as pool:
+            results = list(pool.map(replay_one, args.logs, chunksize=8))
+    elapsed = time.perf_counter() - start
+
+    total = 0
+    print("文件\t天数\t决策数\t收入\t成本\t罚款\t净收益")
+    for path, day, decisions, revenue, cost, penalty, net in results:
+        total += decisions
+        print(f"{path}\t{day}\t{decisions}\t{revenue:.1f}\t{cost:.1f}\t{penalty:.1f}\t{net:.1f}")
+    print(f"重放 {len(args.logs)} 个日志、{total} 个决策，耗时 {elapsed:.3f} 秒")
+
+
+def cmd_bench(args):
+    """运行基准测试，保存 JSON，可选与基线比较"""
+    from . import bench
+
+    report = bench.run(quick=args.quick, render=not args.no_render)
+    bench.print_report(report)
+    if args.output:
+        bench.save(report, args.output)
+        print(f"结果已保存到 {args.output}")
+    if args.baseline:
+        return report_comparison(bench.load(args.baseline), report, args.threshold)
+    return 0
+
+
+def cmd_compare(args):
+    """比较两份基准测试结果"""
+    from . import bench
+
+    return report_comparison(bench.load(args.baseline), bench.load(args.current), args.threshold)
+
+
+def cmd_serve(args):
+    """启动多会话游戏服务器"""
+    from . import server
+
+    server.run(args.host, args.port, idle_timeout=args.idle_timeout, max_sessions=args.max_sessions,
+               max_scores=args.max_scores)
+
+
+def cmd_calibrate(args):
+    """从骑行日志拟合需求系数，或生成合成日志"""
+    import time
+    from . import calibrate
+
+    if args.synthesize:
+        start = time.perf_counter()
+        rows = calibrate.synthesize(args.logs[0], args.synthesize, args.zones, args.city_seed)
+        print(f"生成 {rows} 条骑行记录到 {args.logs[0]}，耗时 {time.perf_counter() - start:.2f} 秒")
+        return
+
+    start = time.perf_counter()
+    coefficients = calibrate.calibrate(args.logs)
+    elapsed = time.perf_counter() - start
+    calibrate.save(coefficients, args.output)
+    print(f"读取 {coefficients['rows']} 条骑行记录（{coefficients['instances']} 个区域时段），"
+          f"耗时 {elapsed:.2f} 秒，{coefficients['rows'] / max(elapsed, 1e-9) / 1e6:.2f} 百万条/秒")
+    print("时段系数: " + ", ".join(f"{f:.3f}" for f in coefficients["time_factors"]))
+    print(f"价格弹性: 高峰 {coefficients['elasticity_peak']:.3f}  平峰 {coefficients['elasticity_offpeak']:.3f}")
+    for weather, factors in coefficients["weather_factors"].items():
+        print(f"天气系数 {weather}: " + ", ".join(f"{f:.3f}" for f in factors))
+    print(f"{len(coefficients['base_demand'])} 个区域的基础需求，系数已保存到 {args.output}")
+
+
+def load_coefficients(path):
+    """启动时加载需求系数文件；同时设置环境变量，让子进程也使用同一份系数"""
+    from . import engine, params
+
+    os.environ["SBBIKE_COEFFICIENTS"] = path
+    params.load_coefficients(path)
+    engine.reload_coefficients()
+
+
+def report_comparison(baseline, current, threshold):
+    """打印比较结果，有项目变慢时返回 1"""
+    from . import bench
+
+    rows = bench.compare(baseline, current, threshold / 100)
+    print()
+    bench.print_comparison(rows)
+    slower = [row[0] for row in rows if row[4] == "slower"]
+    if slower:
+        print(f"{len(slower)} 项比基线慢 {threshold:g}% 以上")
+        return 1
+    print("没有发现性能回退")
+    return 0
+
+
+def add_threshold_argument(p):
+    p.add_argument("--threshold", type=float, default=10, help="变慢超过该百分比视为回退（默认 10）")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sbbike14", description="共享单车动态定价模拟")
+    parser.add_argument("--coefficients", default=None,
+                        help="使用 calibrate 生成的需求系数文件（也可设置环境变量 SBBIKE_COEFFICIENTS）")
+    sub = parser.add_subparsers(dest="command")
+
+    p = sub.add_parser("play", help="打开游戏窗口（默认）")
+    p.add_argument("--profile", action="store_true", help="启动时打开性能剖析浮层（游戏中按 F3 开关）")
+    p.add_argument("--trace", default=None, help="退出时把性能记录写入该文件（Chrome trace 格式）")
+    p.add_argument("--seed", type=int, default=None, help="随机种子（默认随机选取）")
+    p.add_argument("--log", default=None, help="把玩家的每个决策记录到该文件，可用 replay 重放")
+    add_zone_arguments(p)
+    p.set_defaults(func=cmd_play)
+
+    p = sub.add_parser("run", help="无界面模拟 N 天")
+    p.add_argument("-n", "--days", type=int, default=1000, help="模拟天数")
+    p.add_argument("--seed", type=int, default=None, help="随机种子")
+    p.add_argument("--policy", default=None, help="按策略表定价（由 optimize 生成）")
+    p.add_argument("--history", default=None, help="把每日结果逐日写入该二进制文件")
+    p.add_argument("--rebalance", action="store_true", help="时段之间用卡车在区域间调度单车（最小成本方案）")
+    p.add_argument("--trace", default=None, help="记录每次模型调用的耗时，写入该文件（Chrome trace 格式）")
+    p.add_argument("--dashboard", default=None, help="把数据分析面板（统计和折线图）画成该图片")
+    p.add_argument("--trips", action="store_true", help="逐次模拟骑行（单车在区域之间流动）代替解析公式")
+    p.add_argument("--trip-scale", type=float, default=1.0, help="骑行请求数的放大倍数（默认 1）")
+    add_slots_argument(p)
+    add_zone_arguments(p)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("montecarlo", help="并行模拟大量赛季并汇总统计")
+    p.add_argument("-n", "--seasons", type=int, default=1000, help="赛季数")
+    p.add_argument("-d", "--days", type=int, default=30, help="每个赛季的天数")
+    p.add_argument("-j", "--workers", type=int, default=None, help="进程数（默认为 CPU 核数）")
+    p.add_argument("--seed", type=int, default=None, help="总随机种子")
+    p.add_argument("--policy", default=None, help="按策略表定价（由 optimize 生成）")
+    p.add_argument("--rebalance", action="store_true", help="时段之间用卡车在区域间调度单车（最小成本方案）")
+    add_slots_argument(p)
+    add_zone_arguments(p)
+    p.set_defaults(func=cmd_montecarlo)
+
+    p = sub.add_parser("optimize", help="生成最优定价策略表")
+    p.add_argument("-o", "--output", default="policy.npz", help="输出文件")
+    add_zone_arguments(p)
+    p.set_defaults(func=cmd_optimize)
+
+    p = sub.add_parser("plan", help="逆向归纳求多天最优策略和期望净收益")
+    p.add_argument("-d", "--days", type=int, default=30, help="规划天数")
+    p.add_argument("--check", type=int, default=0, metavar="N", help="再用 N 个蒙特卡洛赛季核对期望值")
+    p.add_argument("--seed", type=int, default=0, help="蒙特卡洛核对使用的随机种子")
+    p.add_argument("--grade", nargs="+", metavar="LOG", help="给决策日志打分：逐时段与最优决策比较")
+    add_zone_arguments(p)
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("replay", help="无界面重放决策日志")
+    p.add_argument("logs", nargs="+", help="决策日志文件")
+    p.add_argument("-j", "--workers", type=int, default=1, help="进程数")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("bench", help="运行性能基准测试")
+    p.add_argument("-o", "--output", default=None, help="把结果保存为 JSON")
+    p.add_argument("--baseline", default=None, help="与该基线 JSON 比较")
+    p.add_argument("--quick", action="store_true", help="减少重复次数，快速跑一遍")
+    p.add_argument("--no-render", action="store_true", help="跳过界面绘制测试")
+    add_threshold_argument(p)
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("compare", help="比较两份基准测试结果")
+    p.add_argument("baseline", help="基线 JSON")
+    p.add_argument("current", help="当前 JSON")
+    add_threshold_argument(p)
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser("serve", help="启动多会话游戏服务器（HTTP / WebSocket）")
+    p.add_argument("--host", default="127.0.0.1", help="监听地址（默认 127.0.0.1）")
+    p.add_argument("--port", type=int, default=8765, help="端口（默认 8765）")
+    p.add_argument("--idle-timeout", type=float, default=600, help="空闲多少秒后回收会话（默认 600）")
+    p.add_argument("--max-sessions", type=int, default=1000, help="最多同时存在的会话数")
+    p.add_argument("--max-scores", type=int, default=10000, help="排行榜最多保留的会话数（含已关闭的）")
+    p.set_defaults(func=cmd_serve)
+
+    p = sub.add_parser("calibrate", help="用骑行日志校准需求系数")
+    p.add_argument("logs", nargs="+", help="骑行日志（.csv 或二进制），须按天排序")
+    p.add_argument("-o", "--output", default="coefficients.json", help="输出的系数文件")
+    p.add_argument("--synthesize", type=int, default=0, metavar="DAYS",
+                   help="改为按当前模型生成 DAYS 天的合成日志，写入第一个文件")
+    add_zone_arguments(p)
+    p.set_defaults(func=cmd_calibrate)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    check_slots(parser, args)
+    if args.coefficients:
+        load_coefficients(args.coefficients)
+    if args.command is None:
+        # 不带子命令时与原来一样直接打开游戏
+        return cmd_play(args)
+    return args.func(args)
@@ -0,0 +1,133 @@
+"""数据分析面板：把 DayStats 画成文字统计、折线图和柱状图
+
+折线图的点数不超过图宽的像素数（LTTB 降采样并缓存），所以历史再长也只画几百个点。
+游戏界面和命令行导出图片（sbbike14.py run --dashboard）共用这里的绘制代码。
+"""
+import pygame
+
+from .params import WEATHERS
+
+WEATHER_LABELS = {"sunny": "晴天", "rain": "雨天", "heat": "高温"}
+
+DEFAULT_PALETTE = {
+    "background": (238, 232, 232),
+    "panel": (250, 248, 248),
+    "plot": (243, 240, 240),
+    "grid": (210, 210, 210),
+    "text": (70, 70, 70),
+    "muted": (150, 150, 150),
+    "accent": (176, 147, 147),
+    "success": (127, 185, 127),
+    "warning": (224, 167, 124),
+}
+
+
+class Dashboard:
+    """font 用于标题，small_font 用于统计文字和坐标标注"""
+
+    def __init__(self, font, small_font, palette=DEFAULT_PALETTE):
+        self.font = font
+        self.small_font = small_font
+        self.palette = palette
+
+    def text(self, surface, text, pos, color=None, font=None):
+        font = font or self.small_font
+        surf = font.render(text, True, color or self.palette["text"])
+        surface.blit(surf, pos)
+        return surf.get_height()
+
+    def draw(self, surface, rect, stats):
+        """在 rect 内画出整个面板"""
+        rect = pygame.Rect(rect)
+        palette = self.palette
+        pygame.draw.rect(surface, palette["panel"], rect, border_radius=8)
+        if stats.count == 0:
+            self.text(surface, "暂无数据，完成至少一天后再查看。", (rect.x + 20, rect.y + 20))
+            return
+
+        # 左栏：汇总统计和各天气收入
+        left = pygame.Rect(rect.x + 20, rect.y + 20, 250, rect.height - 40)
+        lines = [
+            (f"已完成 {stats.count} 天", palette["text"]),
+            (f"净收益均值 ¥{stats.mean:.1f}", palette["text"]),
+            (f"净收益标准差 ¥{stats.variance ** 0.5:.1f}", palette["text"]),
+            (f"近 {stats.window} 天均值 ¥{stats.recent_mean:.1f}", palette["text"]),
+            (f"近 {stats.window} 天标准差 ¥{stats.recent_variance ** 0.5:.1f}", palette["text"]),
+            (f"累计罚款 ¥{stats.total_penalty:.1f}", palette["warning"]),
+        ]
+        y = left.y
+        for line, color in lines:
+            y += self.text(surface, line, (left.x, y), color) + 8
+        self.weather_bars(surface, pygame.Rect(left.x, y + 20, left.width, left.bottom - y - 20), stats)
+
+        # 右栏：每日净收益和滑动均值、累计罚款
+        right = pygame.Rect(left.right + 20, rect.y + 20, rect.right - left.right - 40, rect.height - 40)
+        net_height = right.height * 3 // 5
+        self.line_chart(surface, pygame.Rect(right.x, right.y, right.width, net_height - 10), stats,
+                        [("net", palette["accent"], 1), ("rolling_mean", palette["success"], 2)],
+                        f"每日净收益（绿线为近 {stats.window} 天均值）")
+        self.line_chart(surface, pygame.Rect(right.x, right.y + net_height + 10, right.width, right.height - net_height - 10),
+                        stats, [("cumulative_penalty", palette["warning"], 2)], "累计罚款")
+
+    def line_chart(self, surface, rect, stats, series, title):
+        palette = self.palette
+        header = self.text(surface, title, rect.topleft, palette["accent"]) + 4
+        plot = pygame.Rect(rect.x + 60, rect.y + header, rect.width - 60, rect.height - header - 16)
+        pygame.draw.rect(surface, palette["plot"], plot)
+
+        data = [(stats.downsampled(name, plot.width), color, width) for name, color, width in series]
+        low = min(float(values.min()) for (_, values), _, _ in data)
+        high = max(float(values.max()) for (_, values), _, _ in data)
+        span = (high - low) or 1.0
+        last = max(stats.count - 1, 1)
+
+        def to_y(values):
+            return plot.bottom - 1 - (values - low) / span * (plot.height - 2)
+
+        if low < 0 < high:
+            zero = int(to_y(0.0))
+            pygame.draw.line(surface, palette["grid"], (plot.x, zero), (plot.right - 1, zero))
+        for (index, values), color, width in data:
+            xs = plot.x + index / last * (plot.width - 1)
+            points = list(zip(xs.tolist(), to_y(values).tolist()))
+            if len(points) > 1:
+                pygame.draw.lines(surface, color, False, points, width)
+            else:
+                pygame.draw.circle(surface, color, points[0], width + 2)
+
+        # 纵轴范围和横轴天数
+        self.text(surface, f"{high:.0f}", (rect.x, plot.y), palette["muted"])
+        self.text(surface, f"{low:.0f}", (rect.x, plot.bottom - 14), palette["muted"])
+        self.text(surface, "第 1 天", (plot.x, plot.bottom + 2), palette["muted"])
+        end = self.small_font.render(f"第 {stats.count} 天", True, palette["muted"])
+        surface.blit(end, (plot.right - end.get_width(), plot.bottom + 2))
+
+    def weather_bars(self, surface, rect, stats):
+        """各天气下的日均收入"""
+        palette = self.palette
+        header = self.text(surface, "各天气日均收入", rect.topleft, palette["accent"]) + 8
+        means = stats.weather_mean_revenue()
+        top = max([m for m in means if m is not None] + [1.0])
+        bar_width = (rect.width - 20) // len(WEATHERS)
+        plot_height = rect.height - header - 40
+        for i, (weather, mean, days) in enumerate(zip(WEATHERS, means, stats.weather_days)):
+            x = rect.x + i * bar_width
+            height = 0 if mean is None else max(1, int(max(mean, 0.0) / top * plot_height))
+            bar = pygame.Rect(x + 6, rect.y + header + plot_height - height, bar_width - 12, height)
+            pygame.draw.rect(surface, palette["accent"], bar, border_radius=3)
+            label = "-" if mean is None else f"¥{mean:.0f}"
+            self.text(surface, label, (x + 6, rect.y + header + plot_height + 4))
+            self.text(surface, f"{WEATHER_LABELS[weather]} {days}天", (x + 6, rect.y + header + plot_height + 20),
+                      palette["muted"])
+
+
+def render_image(stats, path, size=(1000, 620)):
+    """不打开窗口把面板画成图片"""
+    from .fonts import LazyFont
+
+    pygame.font.init()
+    surface = pygame.Surface(size)
+    surface.fill(DEFAULT_PALETTE["background"])
+    dashboard = Dashboard(LazyFont("SimSun", 18), LazyFont("SimSun", 12))
+    dashboard.draw(surface, surface.get_rect().inflate(-40, -40), stats)
+    pygame.image.save(surface, path)
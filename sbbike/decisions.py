@@ -0,0 +1,165 @@
+"""决策日志：记录玩家对 GameState 的每个操作，并可无界面快速重放
+
+文件以定长文件头开始，记录随机种子和城市设置，之后每个决策追加一条记录：
+一个字节的操作码，后接该操作的参数（小端序）。
+
+    文件头   magic "SBDL", version: uint8, flags: uint8, seed: uint64, zones: uint32, city_seed: uint32
+    PRICES   count: uint32，之后 count 个 (区域序号: uint32, 价格: float64)，只记录变化的价格
+    STRATEGIES  位掩码: uint8
+    EXECUTE / NEXT / START / CONTINUE / BACK  无参数
+
+文件只追加写入，每条记录写完即刷新；程序中途退出时末尾不完整的记录在读取时忽略。
+"""
+import struct
+
+import numpy as np
+
+from . import engine
+from .model import GameState
+from .zones import ZoneStore
+
+MAGIC = b"SBDL"
+VERSION = 1
+HEADER = struct.Struct("<4sBBQII")
+FLAG_REBALANCING = 1
+
+# 操作码
+PRICES = 1
+STRATEGIES = 2
+EXECUTE = 3
+NEXT = 4
+START = 5
+CONTINUE = 6
+BACK = 7
+
+OP_NAMES = {PRICES: "prices", STRATEGIES: "strategies", EXECUTE: "execute", NEXT: "next",
+            START: "start", CONTINUE: "continue", BACK: "back"}
+
+_COUNT = struct.Struct("<I")
+_PRICE = np.dtype([("zone", "<u4"), ("price", "<f8")])
+_MASK = struct.Struct("<B")
+
+
+class DecisionLog:
+    """追加写入的决策日志
+
+    seed 为 GameState 的随机种子；zones 为 0 时使用默认的三个区域，
+    否则为 ZoneStore.generate(zones, city_seed) 生成的城市。
+    """
+
+    def __init__(self, path, seed, zones=0, city_seed=0, rebalancing=False):
+        self.path = path
+        self._file = open(path, "wb")
+        flags = FLAG_REBALANCING if rebalancing else 0
+        self._file.write(HEADER.pack(MAGIC, VERSION, flags, seed, zones, city_seed))
+        self._file.flush()
+
+    def _write(self, op, payload=b""):
+        self._file.write(bytes((op,)) + payload)
+        self._file.flush()
+
+    def prices(self, zones, prices):
+        """记录修改的价格：zones 为区域序号，prices 为对应的新价格"""
+        records = np.empty(len(zones), dtype=_PRICE)
+        records["zone"] = zones
+        records["price"] = prices
+        self._write(PRICES, _COUNT.pack(len(records)) + records.tobytes())
+
+    def strategies(self, mask):
+        self._write(STRATEGIES, _MASK.pack(mask))
+
+    def execute(self):
+        self._write(EXECUTE)
+
+    def next_slot(self):
+        self._write(NEXT)
+
+    def start(self):
+        self._write(START)
+
+    def continue_day(self):
+        self._write(CONTINUE)
+
+    def back(self):
+        self._write(BACK)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_header(data):
+    magic, version, flags, seed, zones, city_seed = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a decision log")
+    if version != VERSION:
+        raise ValueError(f"unsupported decision log version {version}")
+    return {"seed": seed, "zones": zones, "city_seed": city_seed,
+            "rebalancing": bool(flags & FLAG_REBALANCING)}
+
+
+def iter_records(data):
+    """逐条解析文件头之后的记录，产生 (操作码, 参数)"""
+    pos = HEADER.size
+    end = len(data)
+    while pos < end:
+        op = data[pos]
+        pos += 1
+        if op == PRICES:
+            if pos + _COUNT.size > end:
+                return
+            (count,) = _COUNT.unpack_from(data, pos)
+            pos += _COUNT.size
+            size = count * _PRICE.itemsize
+            if pos + size > end:
+                return
+            arg = np.frombuffer(data, dtype=_PRICE, count=count, offset=pos)
+            pos += size
+        elif op == STRATEGIES:
+            if pos + _MASK.size > end:
+                return
+            (arg,) = _MASK.unpack_from(data, pos)
+            pos += _MASK.size
+        elif op in OP_NAMES:
+            arg = None
+        else:
+            raise ValueError(f"unknown decision op {op} at offset {pos - 1}")
+        yield op, arg
+
+
+def new_game(header):
+    """按文件头创建与记录时相同的初始游戏状态"""
+    zones = ZoneStore.generate(header["zones"], header["city_seed"]) if header["zones"] else None
+    return GameState(header["seed"], zones=zones, rebalancing=header["rebalancing"])
+
+
+def replay_record(game, op, arg):
+    """把一条记录作用到 game 上"""
+    if op == PRICES:
+        prices = game.zones.price.copy()
+        prices[arg["zone"]] = arg["price"]
+        game.set_prices(prices)
+    elif op == STRATEGIES:
+        game.strategies.update(engine.mask_to_strategies(arg))
+    elif op == EXECUTE:
+        game.last_results = game.evaluate()
+    elif op == NEXT:
+        game.advance_time()
+    elif op in (START, CONTINUE):
+        game.game_phase = "playing"
+    elif op == BACK:
+        game.game_phase = "cover"
+
+
+def replay(path):
+    """无界面重放决策日志，返回 (文件头, 游戏状态, 决策数)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    header = read_header(data)
+    game = new_game(header)
+    count = 0
+    for op, arg in iter_records(data):
+        count += 1
+        replay_record(game, op, arg)
+    return header, game, count
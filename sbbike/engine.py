@@ -0,0 +1,149 @@
+"""批量计算引擎
+
+用 NumPy 一次性计算大量组合（区域 × 时段 × 天气 × 策略位掩码 × 价格向量）的
+需求、收入、成本、罚款和净收益。各系数预先展开成查找表，不再逐个分支判断。
+GameState 本身也通过这里的函数计算，区域维度上的求和都是对最后一维的整列归约，
+所以单个状态和批量计算的结果逐位相同。
+
+天气编码为 WEATHERS 中的下标，策略位掩码的第 i 位对应 STRATEGY_NAMES[i]。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .params import (
+    DEMAND_MAX,
+    DEMAND_MIN,
+    STRATEGY_COSTS,
+    STRATEGY_NAMES,
+    TIME_FACTORS,
+    WEATHERS,
+    elasticity_for,
+    strategy_factor_for,
+    weather_factor_for,
+)
+
+N_TIMES = len(TIME_FACTORS)
+N_WEATHERS = len(WEATHERS)
+N_STRATEGIES = 1 << len(STRATEGY_NAMES)
+
+
+def mask_to_strategies(mask):
+    """位掩码 -> 策略字典"""
+    return {name: bool(mask >> i & 1) for i, name in enumerate(STRATEGY_NAMES)}
+
+
+def strategies_to_mask(strategies):
+    """策略字典 -> 位掩码"""
+    return sum(1 << i for i, name in enumerate(STRATEGY_NAMES) if strategies[name])
+
+
+def demand_tables():
+    """由 params 中的系数展开时段系数、价格弹性和天气系数的查找表"""
+    return (np.array(TIME_FACTORS, dtype=np.float64),
+            np.array([elasticity_for(t) for t in range(N_TIMES)]),
+            np.array([[weather_factor_for(w, t) for t in range(N_TIMES)] for w in WEATHERS]))
+
+
+def reload_coefficients():
+    """params.load_coefficients 之后就地更新查找表（其他模块持有的引用随之更新）"""
+    TIME_FACTOR[:], ELASTICITY[:], WEATHER_FACTOR[:] = demand_tables()
+
+
+# 系数查找表：TIME_FACTOR[时段]、ELASTICITY[时段]、WEATHER_FACTOR[天气, 时段]
+TIME_FACTOR, ELASTICITY, WEATHER_FACTOR = demand_tables()
+STRATEGY_FACTOR = np.array([[strategy_factor_for(mask_to_strategies(m), t) for t in range(N_TIMES)]
+                            for m in range(N_STRATEGIES)])                     # [策略, 时段]
+STRATEGY_COST = np.array([sum(c for i, c in enumerate(STRATEGY_COSTS) if m >> i & 1)
+                          for m in range(N_STRATEGIES)], dtype=np.float64)     # [策略]
+
+BatchResult = namedtuple("BatchResult", ["demand", "revenue", "cost", "penalty", "net"])
+
+
+def demand(base, prices, time, weather, strategy, tables=None):
+    """批量计算需求
+
+    base、prices 的最后一维为区域；time、weather、strategy 为整数编码数组，
+    形状与其余维度广播。返回形状 (..., 区域)。
+    tables 为 (时段系数, 弹性, 天气系数, 策略系数) 四张查找表，默认为本模块的四个时段；
+    细分时段时由 timeline.TimeAxis.tables 提供。
+    """
+    time_factor, elasticity, weather_factor, strategy_factor = tables or (
+        TIME_FACTOR, ELASTICITY, WEATHER_FACTOR, STRATEGY_FACTOR)
+    time = np.asarray(time)[..., None]
+    weather = np.asarray(weather)[..., None]
+    strategy = np.asarray(strategy)[..., None]
+    prices = np.asarray(prices, dtype=np.float64)
+
+    price_effect = 1 + elasticity[time] * (prices - 2.0) / 0.5
+    d = base * time_factor[time] * price_effect * weather_factor[weather, time] * strategy_factor[strategy, time]
+    return np.clip(d, DEMAND_MIN, DEMAND_MAX)
+
+
+def revenue(d, prices, bikes):
+    """收入：各区域使用量（需求 × 8，不超过单车数量）乘以价格之和"""
+    return (np.minimum(d * 8, bikes) * prices).sum(axis=-1)
+
+
+def costs(bikes, optimal, strategy):
+    """成本：调度成本 + 维护成本 + 策略成本"""
+    relocation = (np.abs(bikes - optimal) * 0.8).sum(axis=-1)
+    maintenance = (bikes * 0.2).sum(axis=-1)
+    return relocation + maintenance + STRATEGY_COST[strategy]
+
+
+def penalty(d, bikes, optimal):
+    """罚款：车辆分布不均衡罚款 + 需求未满足罚款
+
+    两部分拼成一行后一次求和，区域不多时与逐个区域先累加不均衡罚款、再累加未满足罚款的顺序相同。
+    """
+    imbalance = np.abs(bikes - optimal)
+    unmet = d * 0.7
+    terms = np.broadcast_arrays(np.where(imbalance > 15, imbalance * 0.5, 0.0),
+                                np.where(bikes < unmet, (unmet - bikes) * 1.0, 0.0))
+    return np.concatenate(terms, axis=-1).sum(axis=-1)
+
+
+def evaluate(base, prices, bikes, optimal, time, weather, strategy, tables=None):
+    """批量计算需求、收入、成本、罚款和净收益"""
+    prices = np.asarray(prices, dtype=np.float64)
+    bikes = np.asarray(bikes, dtype=np.float64)
+    optimal = np.asarray(optimal, dtype=np.float64)
+    strategy = np.asarray(strategy)
+    d = demand(base, prices, time, weather, strategy, tables)
+
+    r = revenue(d, prices, bikes)
+    c = costs(bikes, optimal, strategy)
+    p = penalty(d, bikes, optimal)
+    net = r - c - p
+    # 各项结果统一广播成相同形状
+    r, c, p = (np.broadcast_to(x, net.shape) for x in (r, c, p))
+    return BatchResult(d, r, c, p, net)
+
+
+def state_arrays(game):
+    """从 GameState 取出 (base, prices, bikes, optimal) 四个区域数组"""
+    zones = game.zones
+    return tuple(np.asarray(a, dtype=np.float64) for a in (zones.demand, zones.price, zones.bikes, zones.optimal))
+
+
+def price_grid(*ranges):
+    """按滑块步长 0.5 生成价格组合，ranges 为每个区域的 (最小值, 最大值)
+
+    返回形状 (组合数, 区域) 的数组。
+    """
+    axes = [np.arange(lo, hi + 0.25, 0.5) for lo, hi in ranges]
+    return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(ranges))
+
+
+def sweep(game, prices, times=range(N_TIMES), weathers=range(N_WEATHERS), strategies=range(N_STRATEGIES)):
+    """在当前区域状态下扫描所有组合
+
+    prices 形状为 (P, 区域)，返回的各数组形状为 (P, 时段, 天气, 策略)，需求再多一维区域。
+    """
+    base, _, bikes, optimal = state_arrays(game)
+    prices = np.asarray(prices, dtype=np.float64)[:, None, None, None, :]
+    t = np.asarray(times)[None, :, None, None]
+    w = np.asarray(weathers)[None, None, :, None]
+    s = np.asarray(strategies)[None, None, None, :]
+    return evaluate(base, prices, bikes, optimal, t, w, s)
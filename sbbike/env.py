@@ -0,0 +1,134 @@
+"""强化学习环境：reset / step 接口
+
+- PricingEnv 包装一个 GameState，每步设置价格和策略后调用 advance_time；
+- VecPricingEnv 把成千上万个相互独立的环境存成 NumPy 数组一起推进，
+  每步只做几次整列运算，不再逐个对象调用 Python 方法。
+
+动作为各区域价格（按各区域滑块范围截断）和策略位掩码；观测为
+{"time", "weather", "bikes", "optimal"}；奖励为该时段的净收益。
+每个回合持续 days 天，结束后自动重置。
+
+两者的时段结果都由 engine 计算，相同状态和动作下奖励逐位相同。VecPricingEnv 的天气和
+理想数量漂移用 NumPy 随机数生成器抽取，分布与 GameState 相同，但随机序列不同；
+VecPricingEnv 不做单车调度。
+"""
+import numpy as np
+
+from . import engine
+from .model import GameState
+from .params import OPTIMAL_DRIFT, OPTIMAL_MAX, OPTIMAL_MIN, WEATHER_WEIGHTS, WEATHERS
+from .zones import ZoneStore
+
+SLOTS_PER_DAY = engine.N_TIMES
+
+
+class PricingEnv:
+    """单个环境，直接驱动 GameState"""
+
+    def __init__(self, days=30, seed=None, zones=None):
+        self.days = days
+        self.zones = zones
+        self._seeds = np.random.SeedSequence(seed)
+        self.game = None
+
+    def reset(self):
+        seed = int(self._seeds.spawn(1)[0].generate_state(1)[0])
+        self.game = GameState(seed, zones=self.zones.copy() if self.zones is not None else None)
+        self.game.game_phase = "playing"
+        self.steps = 0
+        return self.observe()
+
+    def observe(self):
+        game = self.game
+        return {
+            "time": game.current_time,
+            "weather": WEATHERS.index(game.weather),
+            "bikes": game.zones.bikes.copy(),
+            "optimal": game.zones.optimal.copy(),
+        }
+
+    def step(self, prices, mask):
+        """返回 (观测, 奖励, 是否结束, 附加信息)"""
+        game = self.game
+        zones = game.zones
+        game.set_prices(np.clip(prices, zones.price_min, zones.price_max))
+        game.strategies.update(engine.mask_to_strategies(int(mask)))
+        revenue, cost, penalty, net = game.advance_time()
+        game.game_phase = "playing"
+        self.steps += 1
+        done = self.steps >= self.days * SLOTS_PER_DAY
+        info = {"revenue": revenue, "cost": cost, "penalty": penalty}
+        return self.observe(), net, done, info
+
+
+class VecPricingEnv:
+    """num_envs 个独立环境的批量版本
+
+    各状态为形状 (num_envs,) 或 (num_envs, 区域数) 的数组；所有环境共享 zones
+    给出的区域设置（基础需求、初始单车数量和理想数量、价格范围）。
+    """
+
+    def __init__(self, num_envs, days=30, seed=None, zones=None):
+        if zones is None:
+            zones = ZoneStore.default()
+        self.num_envs = num_envs
+        self.days = days
+        self.rng = np.random.default_rng(seed)
+        self.base = zones.demand.copy()
+        self.price_min = zones.price_min.copy()
+        self.price_max = zones.price_max.copy()
+        self.initial_bikes = zones.bikes.astype(np.float64)
+        self.initial_optimal = zones.optimal.astype(np.float64)
+        self.weather_p = np.asarray(WEATHER_WEIGHTS) / np.sum(WEATHER_WEIGHTS)
+
+        shape = (num_envs, len(self.base))
+        self.time = np.zeros(num_envs, dtype=np.intp)
+        self.weather = np.zeros(num_envs, dtype=np.intp)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.bikes = np.empty(shape)
+        self.optimal = np.empty(shape)
+
+    def _reset_envs(self, envs):
+        self.time[envs] = 0
+        self.weather[envs] = WEATHERS.index("sunny")
+        self.steps[envs] = 0
+        self.bikes[envs] = self.initial_bikes
+        self.optimal[envs] = self.initial_optimal
+
+    def reset(self):
+        self._reset_envs(slice(None))
+        return self.observe()
+
+    def observe(self):
+        return {"time": self.time.copy(), "weather": self.weather.copy(),
+                "bikes": self.bikes.copy(), "optimal": self.optimal.copy()}
+
+    def step(self, prices, masks):
+        """prices 形状 (num_envs, 区域数)，masks 形状 (num_envs,)
+
+        返回 (观测, 奖励, 是否结束, 附加信息)，结束的环境已自动重置；它们最后一个时段的观测
+        （推进时段、换天之前，不含下一天的天气和理想数量）在 info["final_observation"] 中。
+        """
+        prices = np.clip(prices, self.price_min, self.price_max)
+        masks = np.asarray(masks, dtype=np.intp)
+        result = engine.evaluate(self.base, prices, self.bikes, self.optimal, self.time, self.weather, masks)
+        reward = result.net.copy()
+        info = {"revenue": result.revenue, "cost": result.cost, "penalty": result.penalty}
+        done = self.steps + 1 >= self.days * SLOTS_PER_DAY
+        finished = np.flatnonzero(done)
+        if len(finished):
+            info["final_observation"] = {key: value[finished] for key, value in self.observe().items()}
+
+        # 推进时段；一天结束的环境抽取新天气并漂移理想数量
+        self.steps += 1
+        self.time += 1
+        new_day = np.flatnonzero(self.time == SLOTS_PER_DAY)
+        if len(new_day):
+            self.time[new_day] = 0
+            self.weather[new_day] = self.rng.choice(len(WEATHERS), size=len(new_day), p=self.weather_p)
+            drift = self.rng.integers(-OPTIMAL_DRIFT, OPTIMAL_DRIFT + 1, size=(len(new_day), len(self.base)))
+            self.optimal[new_day] = np.clip(self.optimal[new_day] + drift, OPTIMAL_MIN, OPTIMAL_MAX)
+
+        if len(finished):
+            self._reset_envs(finished)
+        return self.observe(), reward, done, info
@@ -0,0 +1,76 @@
+"""字体加载：字体文件路径解析一次后缓存到磁盘，字体对象第一次使用时才创建
+
+pygame.font.SysFont 每次冷启动都要扫描系统字体列表，字体多的机器上要几秒钟。
+这里按 (字体名, 是否加粗) 把解析出的文件路径（找不到时为 null）写入 JSON 缓存，
+之后启动直接按路径加载；缓存的文件不存在时重新解析。删除缓存文件即可强制重新扫描。
+"""
+import json
+import os
+
+import pygame
+
+CACHE_PATH = os.environ.get("SBBIKE_FONT_CACHE") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "sbbike", "fonts.json")
+
+_cache = None
+
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        try:
+            with open(CACHE_PATH, encoding="utf-8") as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save_cache():
+    # 缓存目录不可写（如只读的机房镜像）时只是不缓存
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp = CACHE_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(_cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, CACHE_PATH)
+    except OSError:
+        pass
+
+
+def resolve(name, bold=False):
+    """返回 (字体文件路径, 是否需要模拟加粗)，与 SysFont 的选择相同；找不到时路径为 None"""
+    cache = _load_cache()
+    key = f"{name}|{'bold' if bold else 'regular'}"
+    entry = cache.get(key)
+    if entry is not None and (entry[0] is None or os.path.exists(entry[0])):
+        return entry[0], entry[1]
+
+    path = pygame.font.match_font(name, bold=bold)
+    # 没有单独的粗体文件时与 SysFont 一样用常规字体模拟加粗
+    fake_bold = bold and (path is None or path == pygame.font.match_font(name))
+    cache[key] = [path, fake_bold]
+    _save_cache()
+    return path, fake_bold
+
+
+class LazyFont:
+    """pygame.font.Font 的代理，第一次访问属性（如 render）时才解析路径并加载字体"""
+
+    def __init__(self, name, size, bold=False):
+        self._name = name
+        self._size = size
+        self._bold = bold
+        self._font = None
+
+    def load(self):
+        if self._font is None:
+            path, fake_bold = resolve(self._name, self._bold)
+            self._font = pygame.font.Font(path, self._size)
+            if fake_bold:
+                self._font.set_bold(True)
+        return self._font
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
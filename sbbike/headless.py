@@ -0,0 +1,30 @@
+"""无界面模拟：不打开 pygame 窗口，以最快速度推进游戏"""
+import time
+
+from .model import GameState
+
+
+def run_days(days, game=None, policy=None, on_day=None):
+    """连续模拟若干天，返回 (游戏状态, 耗时秒数)
+
+    policy 为 PolicyTable 时，每个时段开始前按策略表设置价格和策略；没有策略表时
+    用 advance_day 一次算完一天的所有时段。on_day 不为 None 时每天结束后以游戏状态调用一次。
+    """
+    if game is None:
+        game = GameState()
+    game.game_phase = "playing"
+
+    start = time.perf_counter()
+    for _ in range(days):
+        if policy is None:
+            game.advance_day()
+        else:
+            for _ in range(game.time_axis.slots):
+                policy.apply(game)
+                game.advance_time()
+        # 跳过每日总结页面
+        game.game_phase = "playing"
+        if on_day is not None:
+            on_day(game)
+    elapsed = time.perf_counter() - start
+    return game, elapsed
@@ -0,0 +1,133 @@
+"""城市热力图：把各区域的数值（单车盈缺、需求）画成连续的颜色场
+
+不逐个区域调用 pygame.draw：每帧把视野内的区域按屏幕坐标落到粗网格（每格至少 CELL 像素）上，
+用 bincount 累加数值和权重，两遍盒式模糊（前缀和实现）近似高斯核平滑，数值 / 权重即
+核加权平均；再经颜色查找表得到 (宽, 高, 3) 数组，pygame.surfarray 一次写进小表面，
+smoothscale 放大到视图大小。整帧只有几次数组运算，最后由调用方贴一次图，
+与区域数量几乎无关。
+
+视图以公里坐标的中心点和缩放比例（像素/公里）表示，支持拖动平移和以鼠标为中心的缩放。
+"""
+import math
+
+import numpy as np
+import pygame
+
+# 粗网格每格的最少像素数；放大到平滑半径超过 MAX_RADIUS 格时改用更粗的网格
+CELL = 5
+MAX_RADIUS = 8
+# 相对“整个城市刚好放进视图”的最大放大倍数
+MAX_ZOOM = 40.0
+# 区域间距的多少倍作为平滑半径
+BLUR_SPACING = 0.75
+
+# 颜色查找表的节点：(位置 0～1, 颜色)
+SURPLUS_STOPS = [(0.0, (214, 120, 90)), (0.5, (246, 242, 238)), (1.0, (96, 132, 184))]
+DEMAND_STOPS = [(0.0, (246, 242, 238)), (0.5, (216, 176, 160)), (1.0, (150, 90, 96))]
+
+
+def color_lut(stops, size=256):
+    """按节点线性插值的颜色查找表，形状 (size, 3)"""
+    positions = np.array([p for p, _ in stops])
+    colors = np.array([c for _, c in stops], dtype=np.float64)
+    t = np.linspace(0.0, 1.0, size)
+    return np.stack([np.interp(t, positions, colors[:, k]) for k in range(3)], axis=1)
+
+
+def box_blur(grid, radius):
+    """对二维数组的两个维度各做一遍半径 radius 的盒式滤波（边界外视为 0）"""
+    width = 2 * radius + 1
+    for axis in (0, 1):
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (radius + 1, radius)
+        total = np.moveaxis(np.cumsum(np.pad(grid, pad), axis=axis), axis, 0)
+        grid = np.moveaxis((total[width:] - total[:-width]) / width, 0, axis)
+    return grid
+
+
+class Heatmap:
+    """x、y 为各区域坐标（公里）；size 为视图像素大小；background 为城市以外的颜色"""
+
+    def __init__(self, x, y, size, background=(250, 248, 248)):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.size = tuple(size)
+        self.background = np.array(background, dtype=np.float64)
+        width = max(float(np.ptp(self.x)), 1e-3)
+        height = max(float(np.ptp(self.y)), 1e-3)
+        # 区域的平均间距（公里）决定平滑半径
+        self.spacing = math.sqrt(width * height / len(self.x)) if len(self.x) > 1 else 1.0
+        self.fit_scale = 0.9 * min(self.size[0] / (width + 2 * self.spacing), self.size[1] / (height + 2 * self.spacing))
+        # 各网格粒度的 (小表面, 放大后的表面)
+        self._surfaces = {}
+        self.reset_view()
+
+    def reset_view(self):
+        """整个城市放进视图"""
+        self.center = (float(self.x.min() + self.x.max()) / 2, float(self.y.min() + self.y.max()) / 2)
+        self.scale = self.fit_scale
+
+    @property
+    def view(self):
+        """视图状态，可作缓存键"""
+        return self.center, self.scale
+
+    def to_screen(self, x, y):
+        """公里坐标 -> 视图内像素坐标（y 轴向上）"""
+        return ((np.asarray(x) - self.center[0]) * self.scale + self.size[0] / 2,
+                (self.center[1] - np.asarray(y)) * self.scale + self.size[1] / 2)
+
+    def to_world(self, px, py):
+        return (self.center[0] + (px - self.size[0] / 2) / self.scale,
+                self.center[1] - (py - self.size[1] / 2) / self.scale)
+
+    def pan(self, dx, dy):
+        """视图内容跟随鼠标移动 (dx, dy) 像素"""
+        self.center = (self.center[0] - dx / self.scale, self.center[1] + dy / self.scale)
+
+    def zoom(self, factor, pos):
+        """以视图内的像素位置 pos 为中心缩放，pos 下的地点保持不动"""
+        scale = min(max(self.scale * factor, self.fit_scale), self.fit_scale * MAX_ZOOM)
+        wx, wy = self.to_world(*pos)
+        self.scale = scale
+        self.center = (wx - (pos[0] - self.size[0] / 2) / scale, wy + (pos[1] - self.size[1] / 2) / scale)
+
+    def render(self, values, low, high, lut):
+        """把各区域的 values 画成热力图，返回表面（左上 size 部分有效）
+
+        values 按 [low, high] 线性映射到颜色查找表 lut；附近没有区域的地方渐变为背景色。
+        """
+        blur = self.spacing * self.scale * BLUR_SPACING
+        cell = max(CELL, math.ceil(blur / MAX_RADIUS))
+        radius = max(1, int(blur / cell + 0.5))
+        gw, gh = -(-self.size[0] // cell), -(-self.size[1] // cell)
+        if cell not in self._surfaces:
+            self._surfaces[cell] = (pygame.Surface((gw, gh), depth=32),
+                                    pygame.Surface((gw * cell, gh * cell), depth=32))
+        small, surface = self._surfaces[cell]
+        pad = 2 * radius
+        # 视图外 pad 格以内的区域也会被模糊进视图
+        cx = np.floor(self.to_screen(self.x, 0)[0] / cell).astype(np.int64) + pad
+        cy = np.floor(self.to_screen(0, self.y)[1] / cell).astype(np.int64) + pad
+        width, height = gw + 2 * pad, gh + 2 * pad
+        inside = (cx >= 0) & (cx < width) & (cy >= 0) & (cy < height)
+        flat = cx[inside] * height + cy[inside]
+        weight = np.bincount(flat, minlength=width * height).astype(np.float64).reshape(width, height)
+        total = np.bincount(flat, np.asarray(values, dtype=np.float64)[inside],
+                            minlength=width * height).reshape(width, height)
+
+        # 两遍盒式滤波近似高斯核
+        for _ in range(2):
+            weight = box_blur(weight, radius)
+            total = box_blur(total, radius)
+        weight = weight[pad:pad + gw, pad:pad + gh]
+        total = total[pad:pad + gw, pad:pad + gh]
+
+        mean = total / np.maximum(weight, 1e-12)
+        index = np.clip((mean - low) / (high - low) * (len(lut) - 1), 0, len(lut) - 1).astype(np.intp)
+        # 覆盖度：区域密度达到平均密度的一部分时为 1，城市边缘之外渐变为背景
+        coverage = np.clip(weight * (radius * radius * 4.0), 0.0, 1.0)[..., None]
+        rgb = self.background + (lut[index] - self.background) * coverage
+        pygame.surfarray.blit_array(small, rgb.astype(np.uint8))
+        pygame.transform.smoothscale(small, surface.get_size(), surface)
+        return surface
@@ -0,0 +1,165 @@
+"""按列存储的每日结果历史
+
+每一列是一个紧凑的 array.array，追加一天的开销为 O(1)。指定文件路径后，每天的记录
+会以定长二进制格式追加写入文件；再指定 window 时内存中只保留最近 window 天，
+长时间的无界面模拟内存占用保持不变。
+
+文件记录格式为小端序 (day: int32, revenue, cost, penalty, net: float64, weather: uint8)，
+可用 DayHistory.read 或 numpy.fromfile(path, dtype=DayHistory.NUMPY_DTYPE) 读取。
+
+fork 出的分支与原历史共享已有的行：原历史当前的各列被冻结为共享段，之后双方各自
+把新的行追加到自己的列中，分支之间不复制已有的历史。
+"""
+import struct
+from array import array
+from collections import namedtuple
+
+from .params import WEATHERS
+
+# 冻结的共享段：columns 中保存序号从 offset 开始的行，更早的行在 prefix 中
+_Segment = namedtuple("_Segment", "columns offset prefix")
+
+
+def _new_columns():
+    # day 与文件记录同为 32 位（array 的 "i"），超出范围时 append 在写入任何一列之前报 OverflowError
+    return {
+        "day": array("i"),
+        "revenue": array("d"),
+        "cost": array("d"),
+        "penalty": array("d"),
+        "net": array("d"),
+        "weather": array("B"),
+    }
+
+
+class DayHistory:
+    FIELDS = ("day", "revenue", "cost", "penalty", "net", "weather")
+    RECORD = struct.Struct("<i4dB")
+    NUMPY_DTYPE = [("day", "<i4"), ("revenue", "<f8"), ("cost", "<f8"),
+                   ("penalty", "<f8"), ("net", "<f8"), ("weather", "u1")]
+
+    def __init__(self, path=None, window=None):
+        self.columns = _new_columns()
+        self.count = 0   # 累计追加的天数
+        self.offset = 0  # self.columns 中第一行对应的序号
+        self.prefix = None  # 与其他分支共享的更早的行
+        self.window = window
+        self.path = path
+        self._file = open(path, "ab") if path else None
+
+    def append(self, day, revenue, cost, penalty, net, weather):
+        """追加一天的结果，weather 为天气名称"""
+        code = WEATHERS.index(weather)
+        row = (day, revenue, cost, penalty, net, code)
+        for column, value in zip(self.columns.values(), row):
+            column.append(value)
+        self.count += 1
+        if self._file is not None:
+            self._file.write(self.RECORD.pack(*row))
+
+        # 自己的行已够一个窗口时不再需要共享段
+        if self.window is not None and self.prefix is not None and self.count - self.offset >= self.window:
+            self.prefix = None
+        # 超出窗口一倍时整体丢弃较早的行，均摊 O(1)
+        if self.window is not None and self.count - self.offset >= 2 * self.window:
+            drop = self.count - self.offset - self.window
+            for column in self.columns.values():
+                del column[:drop]
+            self.offset += drop
+
+    @staticmethod
+    def _row(columns, i):
+        row = {name: column[i] for name, column in columns.items()}
+        row["weather"] = WEATHERS[row["weather"]]
+        return row
+
+    def segments(self):
+        """内存中保留的各段 (各列, 第一行的序号)，按序号从早到晚"""
+        chain = [(self.columns, self.offset)]
+        segment = self.prefix
+        while segment is not None:
+            chain.append((segment.columns, segment.offset))
+            segment = segment.prefix
+        chain.reverse()
+        # 较晚的段可能从更早的序号开始（窗口丢弃后），只保留各段未被覆盖的部分
+        result = []
+        for i, (columns, offset) in enumerate(chain):
+            end = chain[i + 1][1] if i + 1 < len(chain) else self.count
+            if end > offset:
+                result.append((columns, offset, end))
+        return result
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        """按天序号取一行（字典），支持负数下标；已移出内存的行会报 IndexError"""
+        if index < 0:
+            index += self.count
+        if self.offset <= index < self.count:
+            return self._row(self.columns, index - self.offset)
+        segment = self.prefix
+        while segment is not None and 0 <= index < self.offset:
+            if index >= segment.offset:
+                return self._row(segment.columns, index - segment.offset)
+            segment = segment.prefix
+        raise IndexError("day history index out of range")
+
+    def __iter__(self):
+        """遍历内存中保留的各行"""
+        for columns, offset, end in self.segments():
+            for i in range(end - offset):
+                yield self._row(columns, i)
+
+    def fork(self):
+        """共享已有各行的分支（不写文件）"""
+        if self.count > self.offset:
+            # 把当前的列冻结为共享段，自己改为追加到新的列
+            self.prefix = _Segment(self.columns, self.offset, self.prefix)
+            self.columns = _new_columns()
+            self.offset = self.count
+        branch = DayHistory(window=self.window)
+        branch.prefix = self.prefix
+        branch.count = branch.offset = self.count
+        return branch
+
+    def state(self):
+        """内存中保留的各行合并成的 (第一行序号, 总天数, 各列)，用于快照"""
+        segments = self.segments()
+        columns = _new_columns()
+        for name, column in columns.items():
+            for seg_columns, offset, end in segments:
+                column.extend(seg_columns[name][:end - offset])
+        first = segments[0][1] if segments else self.count
+        return first, self.count, columns
+
+    @classmethod
+    def from_state(cls, state, window=None):
+        first, count, columns = state
+        history = cls(window=window)
+        history.columns = columns
+        history.offset = first
+        history.count = count
+        return history
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @classmethod
+    def read(cls, path, chunk_days=65536):
+        """从文件分块读回完整历史"""
+        history = cls()
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(cls.RECORD.size * chunk_days)
+                if not chunk:
+                    break
+                for day, revenue, cost, penalty, net, code in cls.RECORD.iter_unpack(chunk):
+                    history.append(day, revenue, cost, penalty, net, WEATHERS[code])
+        return history
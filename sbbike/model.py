@@ -0,0 +1,431 @@
+"""共享单车动态定价模型
+
+不依赖 pygame，可在批处理脚本、测试和命令行中直接导入使用。
+"""
+import pickle
+import random
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+from . import engine, rebalance
+from .history import DayHistory
+from .params import (  # noqa: F401  （保留从 model 导入参数的旧写法）
+    DEFAULT_AREAS,
+    ELASTICITY_OFFPEAK,
+    ELASTICITY_PEAK,
+    NIGHT_SLOT,
+    OPTIMAL_DRIFT,
+    OPTIMAL_MAX,
+    OPTIMAL_MIN,
+    PEAK_SLOTS,
+    PRICE_RANGES,
+    PRICE_STEP,
+    STRATEGY_COSTS,
+    STRATEGY_NAMES,
+    TIME_FACTORS,
+    TIME_NAMES,
+    WEATHER_WEIGHTS,
+    WEATHERS,
+    elasticity_for,
+    strategy_factor_for,
+    weather_factor_for,
+)
+from .timeline import TimeAxis
+from .zones import COLUMNS, FIELDS, ZoneStore
+
+# 快照格式版本
+SNAPSHOT_VERSION = 1
+# 快照中保存的标量属性
+SNAPSHOT_SCALARS = ("current_time", "day", "total_revenue", "total_cost", "total_penalty",
+                    "day_revenue", "day_cost", "day_penalty", "game_phase", "weather",
+                    "last_results", "rebalancing", "rebalanced_bikes", "rebalance_cost")
+
+
+class WatchedDict(dict):
+    """值发生变化时调用 on_change(key) 的字典，用于让缓存失效"""
+
+    def __init__(self, data, on_change):
+        super().__init__(data)
+        self.on_change = on_change
+
+    def __setitem__(self, key, value):
+        if key in self and self[key] == value:
+            return
+        super().__setitem__(key, value)
+        self.on_change(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __reduce__(self):
+        return type(self), (dict(self), self.on_change)
+
+
+class ZoneView(MutableMapping):
+    """单个区域的字典式视图，读写直接落到 ZoneStore 的数组上"""
+
+    def __init__(self, game, index):
+        self._game = game
+        self._index = index
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self._game.zones, key)[self._index].item()
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        zones = self._game.zones
+        if getattr(zones, key)[self._index] != value:
+            zones.writable(key)[self._index] = value
+            self._game._zone_changed(key)
+
+    def __delitem__(self, key):
+        raise TypeError("zone fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+
+class AreaMapping(Mapping):
+    """按区域名访问 ZoneView，兼容原来的 areas 字典"""
+
+    def __init__(self, game):
+        self._game = game
+
+    def __getitem__(self, name):
+        return ZoneView(self._game, self._game.zones.index[name])
+
+    def __iter__(self):
+        return iter(self._game.zones.names)
+
+    def __len__(self):
+        return len(self._game.zones)
+
+
+# 游戏状态
+class GameState:
+    def __init__(self, seed=None, history=None, zones=None, rebalancing=False, trips=None, time_axis=None):
+        # 派生结果缓存：各区域需求数组及当前时段的 (收入, 成本, 罚款, 净收益)
+        self._demand = None
+        self._results = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # 时间轴：默认四个时段（0=早高峰, 1=日间, 2=晚高峰, 3=夜间），或 TimeAxis.uniform(n) 细分
+        self.time_axis = time_axis if time_axis is not None else TimeAxis.default()
+        self.current_time = 0
+        self.time_names = self.time_axis.names
+        self.day = 1
+        self.total_revenue = 0
+        self.total_cost = 0
+        self.total_penalty = 0
+        self.game_phase = "cover"  # cover, playing, day_summary
+        # 每日结果（按列存储，可边模拟边写入文件）
+        self.day_history = history if history is not None else DayHistory()
+        # 当天累计值，每天结束时清零
+        self.day_revenue = 0
+        self.day_cost = 0
+        self.day_penalty = 0
+        
+        # 区域数据，按列存储；areas 为按区域名访问的字典式视图
+        self.zones = zones if zones is not None else ZoneStore.default()
+        self._area_mapping = AreaMapping(self)
+        
+        self.strategies = {name: False for name in STRATEGY_NAMES}
+        
+        self.weather = "sunny"  # sunny, rain, heat
+        self.last_results = (0, 0, 0, 0)  # 存储上一步结果
+        
+        # 时段之间是否调度单车；调度费计入总成本
+        self.rebalancing = rebalancing
+        self.last_plan = None
+        self.rebalanced_bikes = 0
+        self.rebalance_cost = 0
+        
+        # 逐次骑行模拟器（sbbike.trips.TripSimulator）；为 None 时时段结果用解析公式计算
+        self.trips = trips
+        
+        # 独立的随机数流，传入相同种子可复现天气和理想数量的变化
+        self.rng = random.Random(seed)
+    
+    # 以下状态发生变化时使缓存失效
+    @property
+    def current_time(self):
+        return self._current_time
+    
+    @current_time.setter
+    def current_time(self, value):
+        if getattr(self, "_current_time", None) != value:
+            self._current_time = value
+            self.invalidate()
+    
+    @property
+    def weather(self):
+        return self._weather
+    
+    @weather.setter
+    def weather(self, value):
+        if getattr(self, "_weather", None) != value:
+            self._weather = value
+            self.invalidate()
+    
+    @property
+    def zones(self):
+        return self._zones
+    
+    @zones.setter
+    def zones(self, value):
+        self._zones = value
+        self.invalidate()
+    
+    @property
+    def areas(self):
+        return self._area_mapping
+    
+    @areas.setter
+    def areas(self, value):
+        self.zones = ZoneStore.from_dict(value)
+    
+    @property
+    def strategies(self):
+        return self._strategies
+    
+    @strategies.setter
+    def strategies(self, value):
+        self._strategies = WatchedDict(value, self._strategy_changed)
+        self.invalidate()
+    
+    def invalidate(self):
+        """清空所有缓存"""
+        self._demand = None
+        self._results = None
+    
+    def _strategy_changed(self, key):
+        self.invalidate()
+    
+    def _zone_changed(self, key):
+        # 需求只与基础需求和价格有关，单车数量和理想数量只影响时段结果
+        if key in ("demand", "price"):
+            self._demand = None
+        self._results = None
+    
+    def set_prices(self, prices):
+        """一次设置所有区域的价格"""
+        prices = np.asarray(prices, dtype=np.float64)
+        if not np.array_equal(prices, self.zones.price):
+            self.zones.writable("price")[:] = prices
+            self._zone_changed("price")
+    
+    def demands(self):
+        """当前时段所有区域的需求数组（带缓存）"""
+        if self._demand is None:
+            self.cache_misses += 1
+            self._demand = engine.demand(self.zones.demand, self.zones.price, self.current_time,
+                                         WEATHERS.index(self.weather),
+                                         engine.strategies_to_mask(self.strategies), self.time_axis.tables)
+        else:
+            self.cache_hits += 1
+        return self._demand
+    
+    def calculate_demand(self, area):
+        """计算当前时段的需求"""
+        return float(self.demands()[self.zones.index[area]])
+    
+    @property
+    def slot_weight(self):
+        """当前时段结果的权重（默认四个时段为 1）"""
+        return self.time_axis.weight[self.current_time]
+    
+    def calculate_revenue(self):
+        """计算收入"""
+        return float(engine.revenue(self.demands(), self.zones.price, self.zones.bikes) * self.slot_weight)
+    
+    def calculate_costs(self):
+        """计算成本：调度成本 + 维护成本 + 策略成本"""
+        return float(engine.costs(self.zones.bikes, self.zones.optimal,
+                                  engine.strategies_to_mask(self.strategies)) * self.slot_weight)
+    
+    def calculate_penalty(self):
+        """计算罚款：车辆分布不均衡罚款 + 需求未满足罚款"""
+        return float(engine.penalty(self.demands(), self.zones.bikes, self.zones.optimal) * self.slot_weight)
+    
+    def evaluate(self):
+        """当前时段的 (收入, 成本, 罚款, 净收益)，状态未变时直接返回缓存"""
+        if self._results is None:
+            self.cache_misses += 1
+            revenue = self.calculate_revenue()
+            cost = self.calculate_costs()
+            penalty = self.calculate_penalty()
+            self._results = (revenue, cost, penalty, revenue - cost - penalty)
+        else:
+            self.cache_hits += 1
+        return self._results
+    
+    def snapshot(self):
+        """把状态保存为字节串（区域数组、策略、天气、日期、累计值、内存中的历史、随机数状态）
+
+        快照用 pickle 编码，只应加载自己生成的快照。不包含历史文件，恢复后的历史只在内存中。
+        """
+        zones = self.zones
+        state = {
+            "version": SNAPSHOT_VERSION,
+            "scalars": tuple(getattr(self, name) for name in SNAPSHOT_SCALARS),
+            "strategies": engine.strategies_to_mask(self.strategies),
+            "names": zones.names,
+            "zones": {name: getattr(zones, name) for name in COLUMNS},
+            "history": self.day_history.state(),
+            "window": self.day_history.window,
+            "rng": self.rng.getstate(),
+            "slots": None if self.time_axis.is_default else self.time_axis.slots,
+        }
+        return pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+    
+    @classmethod
+    def restore(cls, data):
+        """由 snapshot() 的结果恢复出新的游戏状态"""
+        state = pickle.loads(data)
+        if state["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {state['version']}")
+        columns = state["zones"]
+        zones = ZoneStore(state["names"], *(columns[name] for name in COLUMNS))
+        slots = state.get("slots")
+        game = cls(history=DayHistory.from_state(state["history"], state["window"]), zones=zones,
+                   time_axis=TimeAxis.uniform(slots) if slots else None)
+        for name, value in zip(SNAPSHOT_SCALARS, state["scalars"]):
+            setattr(game, name, value)
+        game.strategies = engine.mask_to_strategies(state["strategies"])
+        game.rng.setstate(state["rng"])
+        return game
+    
+    def fork(self):
+        """复制出一个分支，与原状态共享未修改的数据
+
+        区域数组写时复制，历史共享已有的行，其余为少量标量；之后双方互不影响。
+        """
+        branch = GameState.__new__(GameState)
+        # 不复制 Profiler.instrument 装在实例上的计时包装
+        branch.__dict__ = {k: v for k, v in self.__dict__.items() if not callable(v)}
+        branch._zones = self.zones.fork()
+        branch._area_mapping = AreaMapping(branch)
+        branch._strategies = WatchedDict(self.strategies, branch._strategy_changed)
+        branch.day_history = self.day_history.fork()
+        if self.trips is not None:
+            branch.trips = self.trips.fork()
+        # 直接恢复随机数状态，跳过 Random() 从系统熵源播种
+        branch.rng = random.Random.__new__(random.Random)
+        branch.rng.setstate(self.rng.getstate())
+        return branch
+    
+    def rebalance(self):
+        """按成本最小的调度方案（rebalance.solve）在区域之间移动单车，返回方案"""
+        plan = rebalance.solve(self.zones)
+        if len(plan.bikes):
+            rebalance.apply(self.zones, plan)
+            self._zone_changed("bikes")
+        cost = plan.total_cost
+        self.total_cost += cost
+        self.day_cost += cost
+        self.rebalanced_bikes += plan.moved
+        self.rebalance_cost += cost
+        self.last_plan = plan
+        return plan
+    
+    def advance_time(self):
+        """推进到下一个时段"""
+        # 保存当前时段结果
+        if self.trips is not None:
+            revenue, cost, penalty, net = self.trips.run_slot(self)
+        else:
+            revenue, cost, penalty, net = self.evaluate()
+        self._book(revenue, cost, penalty)
+        
+        # 更新到下一个时段
+        self.current_time = (self.current_time + 1) % self.time_axis.slots
+        
+        # 如果一天结束
+        if self.current_time == 0:
+            self._end_day()
+        
+        # 细分时段只在原来的四个时段边界调度，每天的卡车趟数与默认时段相同
+        if self.rebalancing and self.time_axis.rebalance_before[self.current_time]:
+            self.rebalance()
+        
+        self.last_results = (revenue, cost, penalty, net)
+        return revenue, cost, penalty, net
+    
+    def advance_day(self, prices=None, strategies=None):
+        """一次数组运算求出当前时段到一天结束的所有时段，并进入下一天
+        
+        prices 为每个剩余时段一行的价格 (时段, 区域)，默认沿用当前价格；strategies 为每个
+        剩余时段的策略位掩码，默认沿用当前策略。单车数量在时段之间变化（调度或逐次模拟骑行）
+        时不能整天一起算，改为逐个时段推进。返回这些时段的合计 (收入, 成本, 罚款, 净收益)。
+        """
+        start = self.current_time
+        remaining = self.time_axis.slots - start
+        if prices is None:
+            prices = np.broadcast_to(self.zones.price, (remaining, len(self.zones)))
+        if strategies is None:
+            strategies = np.full(remaining, engine.strategies_to_mask(self.strategies))
+        if len(prices) != remaining or len(strategies) != remaining:
+            raise ValueError(f"expected prices and strategies for {remaining} slots")
+        
+        if self.rebalancing or self.trips is not None:
+            totals = np.zeros(4)
+            for price, mask in zip(prices, strategies):
+                self.set_prices(price)
+                self.strategies.update(engine.mask_to_strategies(int(mask)))
+                totals += self.advance_time()
+            return tuple(totals.tolist())
+        
+        base, _, bikes, optimal = engine.state_arrays(self)
+        result = self.time_axis.evaluate_day(base, prices, bikes, optimal, WEATHERS.index(self.weather),
+                                             np.asarray(strategies), start)
+        # 逐时段累加，净收益也由加权后的三项相减，与逐个调用 advance_time 的结果逐位相同
+        totals = np.zeros(4)
+        for revenue, cost, penalty in zip(result.revenue.tolist(), result.cost.tolist(), result.penalty.tolist()):
+            self._book(revenue, cost, penalty)
+            self.last_results = (revenue, cost, penalty, revenue - cost - penalty)
+            totals += self.last_results
+        self.set_prices(prices[-1])
+        self.strategies.update(engine.mask_to_strategies(int(strategies[-1])))
+        self.current_time = 0
+        self._end_day()
+        return tuple(totals.tolist())
+    
+    def _book(self, revenue, cost, penalty):
+        """把一个时段的结果计入总计和当天累计"""
+        self.total_revenue += revenue
+        self.total_cost += cost
+        self.total_penalty += penalty
+        self.day_revenue += revenue
+        self.day_cost += cost
+        self.day_penalty += penalty
+    
+    def _end_day(self):
+        """记录当天结果，进入下一天：随机天气、重置策略、理想数量漂移"""
+        self.day_history.append(self.day, self.day_revenue, self.day_cost, self.day_penalty,
+                                self.day_revenue - self.day_cost - self.day_penalty, self.weather)
+        self.day_revenue = self.day_cost = self.day_penalty = 0
+        
+        self.day += 1
+        # 每天开始时随机天气
+        self.weather = self.rng.choices(WEATHERS, weights=WEATHER_WEIGHTS)[0]
+        
+        # 重置策略
+        for key in self.strategies:
+            self.strategies[key] = False
+        
+        # 动态调整理想单车数量
+        drift = [self.rng.randint(-OPTIMAL_DRIFT, OPTIMAL_DRIFT) for _ in range(len(self.zones))]
+        np.clip(self.zones.optimal + drift, OPTIMAL_MIN, OPTIMAL_MAX, out=self.zones.writable("optimal"))
+        self._zone_changed("optimal")
+        
+        # 进入每日总结
+        self.game_phase = "day_summary"
@@ -0,0 +1,97 @@
+"""并行蒙特卡洛赛季模拟
+
+把大量多日赛季分块交给进程池执行。每个赛季用 (总种子, 赛季序号) 派生出独立的
+随机数流，因此结果与进程数和分块方式无关，可以完全复现。子进程只回传每个赛季的
+汇总值（收入、成本、罚款、净收益），不回传逐日历史。
+"""
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .headless import run_days
+from .model import GameState
+from .timeline import TimeAxis
+from .zones import ZoneStore
+
+METRICS = ("revenue", "cost", "penalty", "net")
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# 子进程中加载一次的策略表和城市站点
+_policy = None
+_city = None
+
+
+def _init_worker(policy_path, zones=None, city_seed=0):
+    global _policy, _city
+    if policy_path:
+        from .policy import PolicyTable
+        _policy = PolicyTable.load(policy_path)
+    else:
+        _policy = None
+    _city = ZoneStore.generate(zones, city_seed) if zones else None
+
+
+def season_seed(seed, index):
+    """由总种子和赛季序号派生独立的随机种子"""
+    state = np.random.SeedSequence(entropy=seed, spawn_key=(index,)).generate_state(2, np.uint64)
+    return int(state[0]) << 64 | int(state[1])
+
+
+def _run_chunk(seed, start, stop, days, rebalancing=False, slots=None):
+    """模拟 [start, stop) 号赛季，返回形状 (赛季数, 4) 的汇总数组"""
+    totals = np.empty((stop - start, len(METRICS)))
+    axis = TimeAxis.uniform(slots) if slots else None
+    for i, index in enumerate(range(start, stop)):
+        zones = _city.copy() if _city is not None else None
+        game = GameState(season_seed(seed, index), zones=zones, rebalancing=rebalancing, time_axis=axis)
+        game, _ = run_days(days, game, _policy)
+        totals[i] = (game.total_revenue, game.total_cost, game.total_penalty,
+                     game.total_revenue - game.total_cost - game.total_penalty)
+    return start, totals
+
+
+def summarize(values):
+    """均值、标准差和分位数"""
+    stats = {"mean": float(values.mean()), "std": float(values.std())}
+    for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        stats[f"p{q}"] = float(v)
+    return stats
+
+
+def run_seasons(seasons, days, workers=None, seed=None, policy_path=None, chunk_size=None,
+                zones=None, city_seed=0, rebalancing=False, slots=None):
+    """模拟 seasons 个各 days 天的赛季
+
+    返回 (各指标统计, 耗时秒数)。seed 为 None 时随机选取并写入结果中。
+    zones 指定时每个赛季都使用由 (zones, city_seed) 生成的同一座城市；
+    rebalancing 为 True 时各赛季在时段之间调度单车；slots 指定时把一天均匀分成 slots 个时段。
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(64)
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # 每个进程分到若干块，兼顾负载均衡和通信开销
+        chunk_size = max(1, seasons // (workers * 8))
+    chunks = [(start, min(start + chunk_size, seasons)) for start in range(0, seasons, chunk_size)]
+    totals = np.empty((seasons, len(METRICS)))
+
+    begin = time.perf_counter()
+    if workers == 1:
+        _init_worker(policy_path, zones, city_seed)
+        for start, stop in chunks:
+            _, part = _run_chunk(seed, start, stop, days, rebalancing, slots)
+            totals[start:stop] = part
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(policy_path, zones, city_seed)) as pool:
+            futures = [pool.submit(_run_chunk, seed, start, stop, days, rebalancing, slots) for start, stop in chunks]
+            for future in as_completed(futures):
+                start, part = future.result()
+                totals[start:start + len(part)] = part
+    elapsed = time.perf_counter() - begin
+
+    stats = {name: summarize(totals[:, i]) for i, name in enumerate(METRICS)}
+    stats["seed"] = seed
+    return stats, elapsed
@@ -0,0 +1,127 @@
+"""定价模型的参数和系数
+
+设置环境变量 SBBIKE_COEFFICIENTS 为 sbbike14.py calibrate 生成的系数文件时，导入本模块时
+用文件中的时段系数、价格弹性、天气系数和各区域基础需求替换下面的默认值。
+"""
+import json
+import os
+
+# 时段：0=早高峰, 1=日间, 2=晚高峰, 3=夜间
+TIME_NAMES = ["早高峰 (7:00-9:00)", "日间 (10:00-16:00)", "晚高峰 (17:00-19:00)", "夜间 (20:00-22:00)"]
+TIME_FACTORS = [1.8, 1.0, 1.5, 0.7]
+PEAK_SLOTS = (0, 2)
+NIGHT_SLOT = 3
+
+# 需求的取值范围（engine.demand 截断到该范围）
+DEMAND_MIN = 0.5
+DEMAND_MAX = 5.0
+
+# 价格弹性（高峰时段需求更刚性）
+ELASTICITY_PEAK = -0.3
+ELASTICITY_OFFPEAK = -0.4
+
+# 天气及其出现概率
+WEATHERS = ["sunny", "rain", "heat"]
+WEATHER_WEIGHTS = [0.7, 0.2, 0.1]
+# 各天气在各时段对需求的影响系数
+WEATHER_FACTORS = {"sunny": [1.0, 1.0, 1.0, 1.0], "rain": [0.6, 0.6, 0.6, 0.6], "heat": [1.1, 1.1, 1.1, 1.3]}
+
+# 时段策略（顺序即位掩码中的位序）及每日成本
+STRATEGY_NAMES = ["高峰溢价", "需求激励", "夜间折扣"]
+STRATEGY_COSTS = [100, 70, 50]
+
+# 默认的三个区域
+DEFAULT_AREAS = {
+    "商业区": {"demand": 4.5, "bikes": 35, "price": 2.5, "optimal": 30},
+    "住宅区": {"demand": 3.0, "bikes": 20, "price": 1.8, "optimal": 25},
+    "大学区": {"demand": 4.0, "bikes": 25, "price": 2.0, "optimal": 35}
+}
+
+# 各区域价格滑块的范围，滑块以 0.5 为步长
+PRICE_RANGES = {"商业区": (1.0, 4.0), "住宅区": (0.5, 3.0), "大学区": (1.0, 3.5)}
+PRICE_STEP = 0.5
+
+# 理想单车数量的范围及每天的随机漂移幅度
+OPTIMAL_MIN, OPTIMAL_MAX = 20, 50
+OPTIMAL_DRIFT = 3
+
+# 各区域的位置（公里），用于计算调度距离
+AREA_POSITIONS = {"商业区": (0.0, 0.0), "住宅区": (4.0, 3.0), "大学区": (6.0, -2.0)}
+# 随机生成城市时每个站点平均占地（平方公里）
+ZONE_AREA_KM2 = 0.25
+
+# 调度车辆：每车容量、每个时段间隙可出车的趟数、每公里运费、每辆单车装卸费
+TRUCK_CAPACITY = 20
+TRUCK_TRIPS = 50
+TRUCK_COST_PER_KM = 0.5
+HANDLING_COST = 0.3
+# 每辆单车的调度成本超过该值时不再调度：移动一辆车使两个区域的不均衡各减 1，
+# 每个时段可少付 2 × 0.8 的调度费
+MAX_UNIT_COST = 1.6
+
+
+# 逐次骑行模拟：各时段的分钟数、每单位需求对应的骑行次数（与收入公式中的需求 × 8 一致）、
+# 借不到车的每次骑行罚款、骑行速度和最短骑行时间、起止点矩阵每个起点考虑的终点数和距离衰减
+SLOT_MINUTES = [120, 360, 120, 120]
+TRIPS_PER_DEMAND = 8
+LOST_TRIP_PENALTY = 1.0
+RIDE_SPEED_KMH = 15.0
+MIN_RIDE_MINUTES = 2.0
+OD_NEIGHBORS = 16
+OD_DECAY_KM = 2.0
+
+# 细分时段（timeline.TimeAxis.uniform）：一天 24 小时均匀分成 4～MAX_SLOTS 个时段，
+# 时段系数取自平滑曲线：夜间水平 + (日间水平 - 夜间水平) × 运营时间的平滑开关 + 早晚两个高斯峰，
+# 曲线在原来四个时段内的均值约为 TIME_FACTORS；高峰弹性按高斯峰的相对高度在平峰弹性之间过渡
+MAX_SLOTS = 1440
+TIME_CURVE_NIGHT = 0.15
+TIME_CURVE_DAY = 1.0
+TIME_CURVE_HOURS = (5.5, 21.3)
+TIME_CURVE_SOFTNESS = 0.7
+TIME_CURVE_PEAKS = ((8.0, 1.0, 0.9), (18.0, 0.6, 1.2))  # (中心小时, 高度, 宽度小时)
+# 细分时段归入原来四个时段的分界小时（取到最近的时段边界），决定天气系数和时段策略的作用范围；
+# 细分的一天从第一个分界（早高峰开始）算起
+SLOT_BOUNDARIES_HOURS = (5.0, 9.5, 16.5, 19.5)
+
+
+def elasticity_for(time):
+    """时段对应的价格弹性"""
+    return ELASTICITY_PEAK if time in PEAK_SLOTS else ELASTICITY_OFFPEAK
+
+
+def weather_factor_for(weather, time):
+    """天气对需求的影响系数"""
+    return WEATHER_FACTORS[weather][time]
+
+
+def strategy_factor_for(strategies, time):
+    """时段策略对需求的影响系数"""
+    if strategies["高峰溢价"] and time in PEAK_SLOTS:
+        return 1.3
+    elif strategies["夜间折扣"] and time == NIGHT_SLOT:
+        return 0.8
+    return 1.0
+
+
+# 校准得到的各区域基础需求（区域名 -> 需求），随机生成城市时同名站点也使用
+CALIBRATED_DEMAND = {}
+
+
+def load_coefficients(path):
+    """用系数文件替换时段系数、价格弹性、天气系数和基础需求，须在导入 engine 之前调用"""
+    global ELASTICITY_PEAK, ELASTICITY_OFFPEAK
+    with open(path, encoding="utf-8") as f:
+        coefficients = json.load(f)
+    TIME_FACTORS[:] = coefficients["time_factors"]
+    ELASTICITY_PEAK = coefficients["elasticity_peak"]
+    ELASTICITY_OFFPEAK = coefficients["elasticity_offpeak"]
+    WEATHER_FACTORS.update(coefficients["weather_factors"])
+    CALIBRATED_DEMAND.update(coefficients.get("base_demand", {}))
+    for name, area in DEFAULT_AREAS.items():
+        if name in CALIBRATED_DEMAND:
+            area["demand"] = CALIBRATED_DEMAND[name]
+    return coefficients
+
+
+if os.environ.get("SBBIKE_COEFFICIENTS"):
+    load_coefficients(os.environ["SBBIKE_COEFFICIENTS"])
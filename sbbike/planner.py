@@ -0,0 +1,146 @@
+"""多天期望净收益规划：逆向归纳求精确的最优策略和期望值
+
+状态为 (第几天, 时段, 天气, 各区域理想单车数量)。天气每天按 WEATHER_WEIGHTS 独立抽取，
+理想数量每天各自漂移 randint(-3, 3) 并截断到 [20, 50]，单车数量不随决策变化（不调度时），
+所以状态转移与决策无关，值函数可以按以下结构分解：
+
+    时段净收益 = B[时段, 天气] - Σ_区域 h_a(理想数量_a)
+
+B 为最优价格和策略下（与理想数量无关，见 policy.py）去掉调度费和不均衡罚款后的部分，
+h_a 为区域 a 的调度费与不均衡罚款。于是从第 d 天开始的期望剩余净收益为
+
+    F[d, 天气] - Σ_区域 G[d, a, 理想数量_a]
+
+F 沿天数逆推（下一天天气的期望是与 WEATHER_WEIGHTS 的点积），G 对所有区域一起
+逆推（理想数量漂移的期望是乘以 31×31 的转移矩阵），每天只需几次数组运算，
+得到的是精确期望值而不是抽样估计。G 占用 天数 × 区域数 × 31 × 8 字节。
+"""
+import numpy as np
+
+from . import engine
+from .decisions import NEXT, iter_records, new_game, read_header, replay_record
+from .params import OPTIMAL_DRIFT, OPTIMAL_MAX, OPTIMAL_MIN, WEATHER_WEIGHTS, WEATHERS
+from .policy import PolicyTable
+
+SLOTS = engine.N_TIMES
+OPTIMAL_LEVELS = np.arange(OPTIMAL_MIN, OPTIMAL_MAX + 1)
+
+
+def drift_matrix():
+    """理想数量一天的转移矩阵 T[i, j] = P(明天为 j | 今天为 i)，下标从 OPTIMAL_MIN 起"""
+    n = len(OPTIMAL_LEVELS)
+    matrix = np.zeros((n, n))
+    steps = np.arange(-OPTIMAL_DRIFT, OPTIMAL_DRIFT + 1)
+    for i in range(n):
+        np.add.at(matrix[i], np.clip(i + steps, 0, n - 1), 1.0 / len(steps))
+    return matrix
+
+
+def weather_probabilities():
+    p = np.asarray(WEATHER_WEIGHTS, dtype=np.float64)
+    return p / p.sum()
+
+
+def imbalance_costs(bikes):
+    """各区域在每个理想数量下一个时段的调度费与不均衡罚款，形状 (区域, 31)"""
+    imbalance = np.abs(np.asarray(bikes, dtype=np.float64)[:, None] - OPTIMAL_LEVELS)
+    return imbalance * 0.8 + np.where(imbalance > 15, imbalance * 0.5, 0.0)
+
+
+class Plan:
+    """days 天的最优策略和期望值表
+
+    policy 为每个 (时段, 天气) 的最优价格和策略（最优决策与天数和理想数量无关）；
+    weather_value[d, w] 和 zone_value[d, a, o] 为第 d 天（从 1 起，d = days + 1 时为 0）
+    开始时的 F 和 G。
+    """
+
+    def __init__(self, policy, slot_base, slot_cost, weather_value, zone_value, initial):
+        self.policy = policy
+        self.slot_base = slot_base
+        self.slot_cost = slot_cost
+        self.weather_value = weather_value
+        self.zone_value = zone_value
+        self.initial = initial
+        self.days = len(weather_value) - 2
+        self._transition_t = drift_matrix().T
+
+    @classmethod
+    def solve(cls, game, days):
+        """以 game 当前的区域数据求解 days 天的规划；不支持单车调度"""
+        if game.rebalancing:
+            raise ValueError("planner does not model rebalancing")
+        if not game.time_axis.is_default:
+            raise ValueError("planner supports the default four slots only")
+        zones = game.zones
+        if np.any(zones.optimal < OPTIMAL_MIN) or np.any(zones.optimal > OPTIMAL_MAX):
+            raise ValueError("optimal bike counts outside the drift range")
+        policy = PolicyTable.build(game)
+        base, _, bikes, _ = engine.state_arrays(game)
+
+        # 理想数量等于单车数量时调度费和不均衡罚款为 0，剩下的就是 B
+        times = np.arange(SLOTS)[:, None]
+        weathers = np.arange(engine.N_WEATHERS)[None, :]
+        slot_base = engine.evaluate(base, policy.prices, bikes, bikes, times, weathers, policy.strategy).net
+        slot_cost = imbalance_costs(bikes)
+
+        p = weather_probabilities()
+        transition_t = drift_matrix().T
+        day_base = slot_base.sum(axis=0)
+        weather_value = np.zeros((days + 2, engine.N_WEATHERS))
+        zone_value = np.zeros((days + 2, len(zones), len(OPTIMAL_LEVELS)))
+        for d in range(days, 0, -1):
+            # 当天四个时段，之后一天的天气和理想数量都按转移概率取期望
+            weather_value[d] = day_base + (p @ weather_value[d + 1] if d < days else 0.0)
+            zone_value[d] = SLOTS * slot_cost + (zone_value[d + 1] @ transition_t if d < days else 0.0)
+
+        initial = (game.day, game.current_time, game.weather, zones.optimal.copy())
+        return cls(policy, slot_base, slot_cost, weather_value, zone_value, initial)
+
+    def value(self, day, time, weather, optimal):
+        """从第 day 天 time 时段开始、一直按最优策略做到第 days 天结束的期望净收益"""
+        if not 1 <= day <= self.days:
+            return 0.0
+        w = WEATHERS.index(weather) if isinstance(weather, str) else weather
+        o = np.asarray(optimal, dtype=np.intp) - OPTIMAL_MIN
+        zones = np.arange(len(o))
+        # 当天剩余时段天气已知，理想数量不变
+        today = self.slot_base[time:, w].sum() - (SLOTS - time) * self.slot_cost[zones, o].sum()
+        if day == self.days:
+            return float(today)
+        future = (weather_probabilities() @ self.weather_value[day + 1] -
+                  (self.zone_value[day + 1] * self._transition_t[:, o].T).sum())
+        return float(today + future)
+
+    def expected(self):
+        """求解时游戏状态下的期望总净收益"""
+        return self.value(*self.initial)
+
+    def slot_net(self, time, weather, optimal):
+        """该状态下最优决策的时段净收益"""
+        w = WEATHERS.index(weather) if isinstance(weather, str) else weather
+        o = np.asarray(optimal, dtype=np.intp) - OPTIMAL_MIN
+        return float(self.slot_base[time, w] - self.slot_cost[np.arange(len(o)), o].sum())
+
+
+def grade(path, plan=None):
+    """重放决策日志，逐时段把玩家的净收益与同一状态下最优决策的净收益比较
+
+    返回 {"slots", "net", "best", "regret"}；regret 为两者之差的总和，与天气运气无关。
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    header = read_header(data)
+    game = new_game(header)
+    if plan is None:
+        plan = Plan.solve(game, 1)
+
+    slots = 0
+    net = best = 0.0
+    for op, arg in iter_records(data):
+        if op == NEXT:
+            slots += 1
+            net += game.evaluate()[3]
+            best += plan.slot_net(game.current_time, game.weather, game.zones.optimal)
+        replay_record(game, op, arg)
+    return {"slots": slots, "net": net, "best": best, "regret": best - net}
@@ -0,0 +1,133 @@
+"""穷举定价/策略优化器，输出可 O(1) 查询的策略表
+
+决策空间是有限的：每个区域的价格按滑块步长 0.5 取值，策略为 STRATEGY_NAMES 的
+任意子集。对每个 (时段, 天气, 理想单车数量) 状态，策略表给出净收益最大的价格和策略。
+
+搜索时利用了模型的可分解结构来剪枝：
+- 理想单车数量只出现在调度成本和不均衡罚款中，与决策无关，只是一个加性常数，
+  所以最优决策只需对每个 (时段, 天气) 求一次，各理想数量状态共享同一决策；
+- 给定策略后，收入和需求未满足罚款按区域相加，每个区域可以独立选价，
+  不必枚举所有价格组合；
+- 对需求影响相同但成本更高的策略组合（如单独的"需求激励"）直接剔除。
+"""
+import numpy as np
+
+from . import engine
+from .params import OPTIMAL_MAX, OPTIMAL_MIN, PRICE_STEP, WEATHERS
+
+# 区域数不超过该值时才按理想单车数量的所有组合展开净收益表
+MAX_NET_TABLE_AREAS = 3
+
+
+def price_levels(lo, hi):
+    """滑块上所有可选的价格"""
+    return np.arange(lo, hi + PRICE_STEP / 2, PRICE_STEP)
+
+
+def undominated_strategies(time):
+    """剔除需求系数相同而成本更高的策略组合"""
+    keep = []
+    for s in range(engine.N_STRATEGIES):
+        factor = engine.STRATEGY_FACTOR[s, time]
+        cost = engine.STRATEGY_COST[s]
+        dominated = any(engine.STRATEGY_FACTOR[o, time] == factor and
+                        (engine.STRATEGY_COST[o], o) < (cost, s)
+                        for o in range(engine.N_STRATEGIES))
+        if not dominated:
+            keep.append(s)
+    return keep
+
+
+class PolicyTable:
+    """策略表
+
+    prices[t, w] 为各区域的最优价格，strategy[t, w] 为策略位掩码，
+    net[t, w, o1, o2, ...] 为按各区域理想单车数量索引的时段净收益；
+    区域较多时组合数过大，net 为 None。
+    """
+
+    def __init__(self, areas, bikes, prices, strategy, net, optimal_min=OPTIMAL_MIN):
+        self.areas = list(areas)
+        self.bikes = np.asarray(bikes)
+        self.prices = np.asarray(prices)
+        self.strategy = np.asarray(strategy)
+        self.net = None if net is None else np.asarray(net)
+        self.optimal_min = int(optimal_min)
+
+    @classmethod
+    def build(cls, game, optimal_range=(OPTIMAL_MIN, OPTIMAL_MAX)):
+        """以 game 当前的区域数据（基础需求、单车数量）构建策略表"""
+        zones = game.zones
+        areas = list(zones.names)
+        base, _, bikes, _ = engine.state_arrays(game)
+        times = np.arange(engine.N_TIMES)
+        weathers = np.arange(engine.N_WEATHERS)
+        masks = np.arange(engine.N_STRATEGIES)
+
+        # 每个区域单独计算各价格下的收入减未满足罚款，形状 [价格, 时段, 天气, 策略]
+        levels = []
+        best_value = np.zeros((engine.N_TIMES, engine.N_WEATHERS, engine.N_STRATEGIES))
+        best_index = np.zeros((len(areas), engine.N_TIMES, engine.N_WEATHERS, engine.N_STRATEGIES), dtype=np.intp)
+        for a, area in enumerate(areas):
+            p = price_levels(zones.price_min[a], zones.price_max[a])
+            levels.append(p)
+            d = engine.demand(base[a:a + 1], p[:, None, None, None, None],
+                              times[:, None, None], weathers[:, None], masks)[..., 0]
+            value = np.minimum(d * 8, bikes[a]) * p[:, None, None, None]
+            unmet = d * 0.7
+            value -= np.where(bikes[a] < unmet, (unmet - bikes[a]) * 1.0, 0.0)
+            best_index[a] = value.argmax(axis=0)
+            best_value += value.max(axis=0)
+        best_value -= engine.STRATEGY_COST
+
+        # 在未被支配的策略中选出最优
+        prices = np.zeros((engine.N_TIMES, engine.N_WEATHERS, len(areas)))
+        strategy = np.zeros((engine.N_TIMES, engine.N_WEATHERS), dtype=np.uint8)
+        for t in times:
+            candidates = np.array(undominated_strategies(t))
+            for w in weathers:
+                s = candidates[best_value[t, w, candidates].argmax()]
+                strategy[t, w] = s
+                prices[t, w] = [levels[a][best_index[a, t, w, s]] for a in range(len(areas))]
+
+        lo, hi = optimal_range
+        if len(areas) > MAX_NET_TABLE_AREAS:
+            return cls(areas, bikes, prices, strategy, None, lo)
+
+        # 对所有理想单车数量组合精确计算净收益
+        axis = np.arange(lo, hi + 1, dtype=np.float64)
+        optimal = np.stack(np.meshgrid(*[axis] * len(areas), indexing="ij"), axis=-1)
+        expand = (slice(None), slice(None)) + (None,) * len(areas)
+        result = engine.evaluate(base, prices[expand], bikes, optimal,
+                                 times[expand[:1] + (None,) + expand[2:]],
+                                 weathers[(None,) + expand[1:]], strategy[expand])
+        net = result.net.astype(np.float32)
+        return cls(areas, bikes, prices, strategy, net, lo)
+
+    def lookup(self, time, weather, optimal):
+        """查询最优决策，返回 (各区域价格, 策略位掩码, 预计净收益)"""
+        w = WEATHERS.index(weather) if isinstance(weather, str) else weather
+        net = None
+        if self.net is not None:
+            index = (time, w) + tuple(int(o) - self.optimal_min for o in optimal)
+            net = float(self.net[index])
+        return tuple(self.prices[time, w].tolist()), int(self.strategy[time, w]), net
+
+    def apply(self, game):
+        """按策略表设置 game 当前时段的价格和策略"""
+        w = WEATHERS.index(game.weather)
+        game.set_prices(self.prices[game.current_time, w])
+        game.strategies.update(engine.mask_to_strategies(int(self.strategy[game.current_time, w])))
+
+    def save(self, path):
+        arrays = dict(areas=np.array(self.areas), bikes=self.bikes, prices=self.prices,
+                      strategy=self.strategy, optimal_min=self.optimal_min)
+        if self.net is not None:
+            arrays["net"] = self.net
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["areas"].tolist(), data["bikes"], data["prices"], data["strategy"],
+                       data["net"] if "net" in data else None, data["optimal_min"])
@@ -0,0 +1,114 @@
+"""运行时性能剖析：按阶段计时，统计帧耗时，导出 Chrome trace
+
+Profiler 可以随时开关；关闭时 span 和包装过的模型方法只多一次标志判断。
+记录的每个区间保存在定长环形缓冲中，write_chrome_trace 写出的 JSON 可在
+chrome://tracing 或 https://ui.perfetto.dev 中打开。
+"""
+import functools
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# 默认包装的 GameState 方法
+MODEL_METHODS = ("demands", "calculate_demand", "calculate_revenue", "calculate_costs",
+                 "calculate_penalty", "evaluate", "advance_time", "rebalance")
+
+
+class Profiler:
+    """区间计时器
+
+    events 保存最近 max_events 个区间 (名称, 类别, 开始微秒, 时长微秒)；
+    frame_times 保存最近 window 帧的耗时（毫秒），last_frame 为最近一帧各阶段的耗时（毫秒）。
+    origin 为时间轴零点（time.perf_counter() 的读数），默认为创建时刻。
+    """
+
+    def __init__(self, enabled=False, max_events=200000, window=240, origin=None):
+        self.enabled = enabled
+        self.events = deque(maxlen=max_events)
+        self.frame_times = deque(maxlen=window)
+        self.last_frame = {}
+        self._current = {}
+        self._frame_start = None
+        self._model_depth = 0
+        self._origin = time.perf_counter() if origin is None else origin
+
+    def record(self, name, cat, start, end):
+        """记录一个区间，start / end 为 time.perf_counter() 的读数"""
+        self.events.append((name, cat, (start - self._origin) * 1e6, (end - start) * 1e6))
+
+    @contextmanager
+    def span(self, name, cat="frame"):
+        """计时一个区间；在帧内时计入该帧的 name 阶段"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.record(name, cat, start, end)
+            if self._frame_start is not None:
+                self._current[name] = self._current.get(name, 0.0) + (end - start) * 1e3
+
+    def begin_frame(self):
+        if self.enabled:
+            self._frame_start = time.perf_counter()
+            self._current = {}
+
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        end = time.perf_counter()
+        self.record("frame", "frame", self._frame_start, end)
+        self.frame_times.append((end - self._frame_start) * 1e3)
+        self.last_frame = self._current
+        self._frame_start = None
+
+    def instrument(self, obj, methods=MODEL_METHODS, cat="model"):
+        """把 obj 的方法替换为计时版本
+
+        嵌套调用各自记录区间，但只有最外层调用计入帧内的 cat 阶段，避免重复计算。
+        """
+        for name in methods:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self._timed(method, name, cat))
+
+    def _timed(self, method, name, cat):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return method(*args, **kwargs)
+            self._model_depth += 1
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                self._model_depth -= 1
+                self.record(name, cat, start, end)
+                if self._model_depth == 0 and self._frame_start is not None:
+                    self._current[cat] = self._current.get(cat, 0.0) + (end - start) * 1e3
+        return wrapper
+
+    def frame_stats(self):
+        """最近若干帧耗时的 (p50, p99, 帧数)，单位毫秒"""
+        if not self.frame_times:
+            return 0.0, 0.0, 0
+        p50, p99 = np.percentile(np.fromiter(self.frame_times, float), (50, 99))
+        return float(p50), float(p99), len(self.frame_times)
+
+    def write_chrome_trace(self, path):
+        """把记录的区间写成 Chrome trace 格式（完整事件 "X"）"""
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": 1, "args": {"name": "main"}}]
+        for name, cat, ts, dur in self.events:
+            events.append({"name": name, "cat": cat, "ph": "X", "ts": round(ts, 3),
+                           "dur": round(dur, 3), "pid": pid, "tid": 1})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
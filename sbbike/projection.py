@@ -0,0 +1,107 @@
+"""拖动价格滑块时的预计结果曲线
+
+给定当前 GameState（时段、天气、单车数和理想数量）、待执行的各区域价格和策略，
+计算某一区域价格取遍滑块范围时本时段的预计收入、成本、罚款和净收益。
+
+各区域的收入和罚款只与本区域的价格有关，成本与价格无关，所以：
+- 保存待执行价格下各区域的收入和罚款，以及它们的总和；
+- 某个区域的价格变化时只重算这一个区域，总和在下次查询时由各区域的项重新求和
+  （一次 NumPy 求和，不像逐次加减差值那样累积舍入误差）；
+- 每个区域在整个价格范围上的曲线只与策略和时段有关，算过一次就缓存，
+  其他滑块变化时只需换上新的"其余区域之和"。
+策略或时段变化后整列重算（一次向量化计算）。需求用游戏时间轴的查找表，结果乘以时段权重，
+与 GameState.evaluate() 一致。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import engine
+from .params import WEATHERS
+
+Curve = namedtuple("Curve", ["prices", "revenue", "cost", "penalty", "net"])
+
+
+class Projection:
+    """samples 为每条曲线的采样点数"""
+
+    def __init__(self, game, samples=61):
+        self.game = game
+        self.samples = samples
+        self.prices = game.zones.price.astype(np.float64)
+        self.mask = engine.strategies_to_mask(game.strategies)
+        self.invalidate()
+
+    def invalidate(self):
+        """时段推进等游戏状态变化后调用，下次查询时整列重算"""
+        self._revenue = None
+        self._curves = {}
+
+    def reset(self, prices, mask):
+        """重新设置全部待执行价格和策略位掩码"""
+        self.prices = np.array(prices, dtype=np.float64)
+        self.mask = mask
+        self.invalidate()
+
+    def set_strategy(self, mask):
+        if mask != self.mask:
+            self.mask = mask
+            self.invalidate()
+
+    def set_price(self, zone, price):
+        """修改一个区域的待执行价格，只重算该区域"""
+        if price == self.prices[zone]:
+            return
+        self.prices[zone] = price
+        if self._revenue is not None:
+            revenue, penalty = self._terms(slice(zone, zone + 1), self.prices[zone:zone + 1, None])
+            self._revenue[zone] = revenue[0, 0]
+            self._penalty[zone] = penalty[0, 0]
+            self._revenue_total = None
+
+    def _terms(self, zones, prices):
+        """zones 内各区域在 prices（形状 (区域, 采样数)）下的 (收入, 罚款)，逐点不求和"""
+        game = self.game
+        z = game.zones
+        base = z.demand[zones, None]
+        bikes = z.bikes[zones, None].astype(np.float64)
+        optimal = z.optimal[zones, None].astype(np.float64)
+        d = engine.demand(base[..., None], prices[..., None], game.current_time,
+                          WEATHERS.index(game.weather), self.mask, game.time_axis.tables)
+        weight = game.slot_weight
+        revenue = engine.revenue(d, prices[..., None], bikes[..., None]) * weight
+        penalty = engine.penalty(d, bikes[..., None], optimal[..., None]) * weight
+        return revenue, penalty
+
+    def _update(self):
+        if self._revenue is None:
+            revenue, penalty = self._terms(slice(None), self.prices[:, None])
+            self._revenue = revenue[:, 0]
+            self._penalty = penalty[:, 0]
+            self._revenue_total = None
+            z = self.game.zones
+            self._cost = float(engine.costs(z.bikes, z.optimal, self.mask) * self.game.slot_weight)
+        if self._revenue_total is None:
+            self._revenue_total = self._revenue.sum()
+            self._penalty_total = self._penalty.sum()
+
+    def totals(self):
+        """待执行价格下的 (收入, 成本, 罚款, 净收益)"""
+        self._update()
+        revenue, penalty = float(self._revenue_total), float(self._penalty_total)
+        return revenue, self._cost, penalty, revenue - self._cost - penalty
+
+    def curve(self, zone):
+        """zone 的价格取遍其范围、其余区域保持待执行价格时的预计结果"""
+        self._update()
+        own = self._curves.get(zone)
+        if own is None:
+            z = self.game.zones
+            prices = np.linspace(z.price_min[zone], z.price_max[zone], self.samples)
+            revenue, penalty = self._terms(slice(zone, zone + 1), prices[None, :])
+            own = self._curves[zone] = (prices, revenue[0], penalty[0])
+        prices, own_revenue, own_penalty = own
+        revenue = own_revenue + (self._revenue_total - self._revenue[zone])
+        penalty = own_penalty + (self._penalty_total - self._penalty[zone])
+        cost = np.full(self.samples, self._cost)
+        return Curve(prices, revenue, cost, penalty, revenue - cost - penalty)
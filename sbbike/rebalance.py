@@ -0,0 +1,185 @@
+"""单车调度：在时段之间把多余的单车运到缺车的区域
+
+单车多于理想数量的区域为供给点，少于理想数量的区域为需求点。调度是一个运输问题：
+在出车能力内运尽可能多的单车，并使总运输成本最小。solve 在稀疏的候选边上用
+逐次最短路（successive shortest path）求最小成本流，在候选边构成的图上是精确最优解：
+
+- 候选边只取每个供给点最近的若干个需求点和每个需求点最近的若干个供给点，
+  边数与区域数成线性关系，最近邻用 spatial.GridIndex 查询，不计算整个距离矩阵；
+- 卡车在路线上顺路装卸，一趟的行驶费由车上的 capacity 辆车分摊，每辆车的成本为
+  距离 × cost_per_km / capacity + handling，运输成本对车数是线性的，最小成本流就是最优解；
+- 车队在一个时段间隙内最多出车 trips 趟，即最多运 trips × capacity 辆车；
+- 单车成本超过 max_unit_cost 的边不值得运，不加入候选边。
+"""
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+from .params import HANDLING_COST, MAX_UNIT_COST, TRUCK_CAPACITY, TRUCK_COST_PER_KM, TRUCK_TRIPS
+from .spatial import GridIndex
+
+
+class Plan(namedtuple("Plan", "source target bikes trips cost")):
+    """调度方案：第 k 次运输从 source[k] 运 bikes[k] 辆车到 target[k]，折合满载 trips[k] 趟，花费 cost[k]"""
+    __slots__ = ()
+
+    @property
+    def moved(self):
+        return int(self.bikes.sum())
+
+    @property
+    def total_cost(self):
+        return float(self.cost.sum())
+
+
+def nearest_pairs(x, y, src, dst, k):
+    """每个供给点最近的 k 个需求点，返回 (供给点, 需求点, 距离) 三个一维数组"""
+    near, dist = GridIndex(x[dst], y[dst]).query(x[src], y[src], k)
+    return np.repeat(src, near.shape[1]), dst[near].ravel(), dist.ravel()
+
+
+def candidates(x, y, src, dst, k):
+    """供给点到最近需求点、需求点到最近供给点的候选边（去重），返回 (供给点, 需求点, 距离)"""
+    rows, cols, dists = nearest_pairs(x, y, src, dst, min(k, len(dst)))
+    back_cols, back_rows, back_dists = nearest_pairs(x, y, dst, src, min(k, len(src)))
+    rows, cols = np.concatenate([rows, back_rows]), np.concatenate([cols, back_cols])
+    dists = np.concatenate([dists, back_dists])
+    _, first = np.unique(rows * len(x) + cols, return_index=True)
+    return rows[first], cols[first], dists[first]
+
+
+def min_cost_flow(supply, need, rows, cols, unit_cost, limit):
+    """二分图上的最小成本流：供给点 i 最多发出 supply[i]，需求点 j 最多接收 need[j]，
+    总流量不超过 limit 且在此前提下尽量大；rows/cols 是边两端在 supply/need 中的下标。
+    返回每条边的流量
+
+    逐次最短路中 0 <= 势 <= 当前最短路长度 λ，成本不低于 λ 的边约化成本非负，不会出现在
+    更短的增广路上。因此边按成本从低到高分批加入残量网络，只在下一条增广路比未加入的
+    最便宜的边还贵时才加入下一批，结果与一次加入全部边相同，但通常只用到很少的边。
+    """
+    order = np.argsort(unit_cost, kind="stable")
+    rows, cols, unit_cost = rows[order].tolist(), cols[order].tolist(), unit_cost[order].tolist()
+    source, sink = 0, 1
+    # 残量网络：边 e 和反向边 e ^ 1 成对存放；点按首次出现的顺序编号。
+    # 边按成本升序加入，供给点的出边也就按成本升序排列
+    head, cap, cost = [], [], []
+    graph, is_src = [[], []], [False, False]
+    src_node, dst_node = {}, {}
+    edge_of = [0] * len(rows)
+    # 点 v 的势为 shift[v] + offset：每轮没出堆的点势都加 λ 的增量，只记在 offset 上
+    shift, offset = [0.0, 0.0], 0.0
+
+    def add(u, v, c, w):
+        graph[u].append(len(head))
+        head.append(v), cap.append(c), cost.append(w)
+        graph[v].append(len(head))
+        head.append(u), cap.append(0), cost.append(-w)
+
+    def node(table, key, supplying, p):
+        if key not in table:
+            table[key] = len(graph)
+            graph.append([])
+            is_src.append(supplying)
+            shift.append(p - offset)
+        return table[key]
+
+    added, batch, flow = 0, 64, 0
+    while flow < limit:
+        bound = unit_cost[added] if added < len(rows) else np.inf
+        # Dijkstra（约化边权非负），汇点出堆即停；没出堆的点距离按汇点距离计，势仍然可行
+        n = len(graph)
+        dist, prev, done = [np.inf] * n, [-1] * n, [False] * n
+        dist[source] = 0.0
+        heap, popped = [(0.0, source)], []
+        while heap:
+            d, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            popped.append(u)
+            if u == sink:
+                break
+            su = shift[u]
+            # 任何点的势都在 [0, 汇点的势] 之间：供给点出边成本 >= cut 时，经过它的路不会比
+            # 已找到的到汇点的路短，后面的边成本更高，不必再看
+            cut = dist[sink] - d - su + shift[sink] if is_src[u] else np.inf
+            for e in graph[u]:
+                if cost[e] >= cut:
+                    break
+                if cap[e] > 0:
+                    v = head[e]
+                    nd = d + cost[e] + su - shift[v]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        prev[v] = e
+                        heapq.heappush(heap, (nd, v))
+        if not done[sink] or dist[sink] + shift[sink] + offset > bound:
+            if added == len(rows):
+                break
+            # 新的供给点势为 0，新的需求点势等于汇点的势，新边成本 >= bound >= λ，约化成本都非负
+            for k in range(added, min(added + batch, len(rows))):
+                i = node(src_node, rows[k], True, 0.0)
+                j = node(dst_node, cols[k], False, shift[sink] + offset)
+                if not graph[i]:
+                    add(source, i, int(supply[rows[k]]), 0.0)
+                if not graph[j]:
+                    add(j, sink, int(need[cols[k]]), 0.0)
+                edge_of[k] = len(head)
+                add(i, j, limit, unit_cost[k])
+            added = min(added + batch, len(rows))
+            batch *= 2
+            continue
+
+        reach = dist[sink]
+        offset += reach
+        for v in popped:
+            shift[v] += dist[v] - reach
+        push, v = limit - flow, sink
+        while v != source:
+            e = prev[v]
+            push = min(push, cap[e])
+            v = head[e ^ 1]
+        v = sink
+        while v != source:
+            e = prev[v]
+            cap[e] -= push
+            cap[e ^ 1] += push
+            v = head[e ^ 1]
+        flow += push
+
+    result = np.zeros(len(rows), dtype=np.int64)
+    result[order[:added]] = [cap[e + 1] for e in edge_of[:added]]
+    return result
+
+
+def solve(zones, capacity=TRUCK_CAPACITY, trips=TRUCK_TRIPS, cost_per_km=TRUCK_COST_PER_KM,
+          handling=HANDLING_COST, max_unit_cost=MAX_UNIT_COST, neighbors=8):
+    """按 zones 当前的单车数量和理想数量求成本最小的调度方案"""
+    surplus = zones.bikes - zones.optimal
+    src = np.flatnonzero(surplus > 0)
+    dst = np.flatnonzero(surplus < 0)
+    empty = Plan(np.zeros(0, np.intp), np.zeros(0, np.intp), np.zeros(0, np.int64),
+                 np.zeros(0), np.zeros(0))
+    if len(src) == 0 or len(dst) == 0 or trips <= 0:
+        return empty
+
+    rows, cols, dists = candidates(zones.x, zones.y, src, dst, neighbors)
+    unit_cost = dists * cost_per_km / capacity + handling
+    keep = unit_cost <= max_unit_cost
+    rows, cols, dists, unit_cost = rows[keep], cols[keep], dists[keep], unit_cost[keep]
+    if len(rows) == 0:
+        return empty
+
+    flow = min_cost_flow(surplus[src], -surplus[dst], np.searchsorted(src, rows),
+                         np.searchsorted(dst, cols), unit_cost, trips * capacity)
+    used = flow > 0
+    bikes = flow[used]
+    return Plan(rows[used], cols[used], bikes, bikes / capacity, bikes * unit_cost[used])
+
+
+def apply(zones, plan):
+    """按方案移动 zones.bikes 中的单车"""
+    bikes = zones.writable("bikes")
+    np.subtract.at(bikes, plan.source, plan.bikes)
+    np.add.at(bikes, plan.target, plan.bikes)
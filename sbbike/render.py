@@ -0,0 +1,76 @@
+"""渲染缓存：文字表面 LRU 缓存、预渲染图标和静态图层"""
+from collections import OrderedDict
+from functools import lru_cache
+
+import pygame
+
+
+class TextCache:
+    """渲染好的文字表面的 LRU 缓存，键为 (字体, 文本, 颜色)"""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        if pygame.display.get_surface() is not None:
+            surf = surf.convert_alpha()
+        self._surfaces[key] = surf
+        if len(self._surfaces) > self.maxsize:
+            self._surfaces.popitem(last=False)
+        return surf
+
+    def clear(self):
+        self._surfaces.clear()
+
+
+@lru_cache(maxsize=64)
+def icon_sprite(icon, size, color):
+    """把字符画图标预渲染成透明表面
+
+    icon 为行字符串组成的元组；每个非空格字符画一个圆点。
+    返回 (表面, 圆点半径)，在 (x - 半径, y - 半径) 处绘制即与逐点绘制的结果相同。
+    """
+    step = int(size * 4)
+    radius = int(size * 2)
+    cols = max(len(line) for line in icon)
+    surf = pygame.Surface(((cols - 1) * step + radius * 2 + 1, (len(icon) - 1) * step + radius * 2 + 1),
+                          pygame.SRCALPHA)
+    for i, line in enumerate(icon):
+        for j, char in enumerate(line):
+            if char != ' ':
+                pygame.draw.circle(surf, color, (radius + j * step, radius + i * step), radius)
+    return surf, radius
+
+
+class Layer:
+    """缓存的静态图层
+
+    只在布局键变化时调用 build(surface) 重绘，其余帧直接整张贴图。
+    """
+
+    def __init__(self, size, build):
+        self.surface = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert()
+        self.build = build
+        self.key = None
+        self.rebuilds = 0
+
+    def get(self, key):
+        if key != self.key:
+            self.build(self.surface)
+            self.key = key
+            self.rebuilds += 1
+        return self.surface
@@ -0,0 +1,467 @@
+"""多会话游戏服务器：一个进程承载大量相互独立的无界面游戏
+
+基于 asyncio，只用标准库实现 HTTP/1.1（JSON）和 WebSocket 两种接口，两者调用同一组操作：
+
+    POST   /sessions                 创建会话，body 可含 name、seed、zones、city_seed
+    GET    /sessions/<id>            会话状态（含各区域数据）
+    POST   /sessions/<id>/decide     设置价格和策略并计算当前时段结果
+                                     body: {"prices": [..] 或 {区域名: 价格}, "strategies": {策略名: bool} 或 "mask": n}
+    POST   /sessions/<id>/next       推进到下一时段，一天结束时附带当天结果
+    DELETE /sessions/<id>            关闭会话
+    GET    /leaderboard?limit=N      按已完成各天净收益之和排名
+
+    WebSocket /ws：发送 {"op": "create" | "state" | "decide" | "next" | "close" | "leaderboard",
+                        "session": id, ...参数}，回复 {"ok": true, ...} 或 {"ok": false, "error": ...}；
+                        可带 "tag" 字段，回复中原样返回。
+
+每个会话有一把 asyncio.Lock，同一会话的操作依次执行。超过 idle_timeout 秒没有操作的会话
+被回收，但成绩保留在排行榜上。排行榜在每次推进时只累加 day_history 中新增的天，最多保留
+max_scores 条，超出时先丢弃已关闭会话中成绩最低的。
+"""
+import asyncio
+import base64
+import hashlib
+import heapq
+import inspect
+import json
+import random
+import secrets
+import struct
+import time
+import traceback
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from . import engine
+from .history import DayHistory
+from .model import GameState
+from .params import STRATEGY_NAMES
+from .zones import ZoneStore
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_BODY = 1 << 20
+MAX_ZONES = 100000
+
+HTTP_STATUS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:
+    def __init__(self, session_id, name, seed, zones, history_window):
+        self.id = session_id
+        self.name = name
+        self.seed = seed
+        self.game = GameState(seed, DayHistory(window=history_window), zones)
+        self.game.game_phase = "playing"
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.scored_days = 0  # 已计入成绩的天数
+        self.score = 0.0
+
+    def update_score(self):
+        """把 day_history 中新增的天累加到成绩"""
+        history = self.game.day_history
+        for i in range(self.scored_days, len(history)):
+            self.score += history[i]["net"]
+        self.scored_days = len(history)
+
+
+def _integer(value, name, low=None):
+    """校验 JSON 参数为整数（不接受 bool、浮点数和字符串）"""
+    if isinstance(value, bool) or not isinstance(value, int) or (low is not None and value < low):
+        raise ApiError(400, f"{name} must be an integer" + ("" if low is None else f" >= {low}"))
+    return value
+
+
+def _results(values):
+    revenue, cost, penalty, net = (float(v) for v in values)
+    return {"revenue": revenue, "cost": cost, "penalty": penalty, "net": net}
+
+
+def session_state(session, zones=True):
+    game = session.game
+    state = {
+        "session": session.id,
+        "name": session.name,
+        "seed": session.seed,
+        "day": game.day,
+        "time": game.current_time,
+        "time_name": game.time_names[game.current_time],
+        "weather": game.weather,
+        "strategies": dict(game.strategies),
+        "last_results": _results(game.last_results),
+        "totals": _results((game.total_revenue, game.total_cost, game.total_penalty,
+                            game.total_revenue - game.total_cost - game.total_penalty)),
+        "score": session.score,
+    }
+    if zones:
+        z = game.zones
+        state["zones"] = [
+            {"name": z.names[i], "demand": float(z.demand[i]), "bikes": int(z.bikes[i]),
+             "price": float(z.price[i]), "optimal": int(z.optimal[i]),
+             "price_min": float(z.price_min[i]), "price_max": float(z.price_max[i])}
+            for i in range(len(z))
+        ]
+    return state
+
+
+class GameServer:
+    """会话管理和各项操作，不涉及网络协议"""
+
+    def __init__(self, idle_timeout=600, max_sessions=1000, history_window=1000, max_scores=10000):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_scores = max(max_scores, max_sessions)
+        self.history_window = history_window
+        self.sessions = {}
+        # 排行榜：会话 id -> (成绩, 完成天数, 名字)，会话被回收后仍保留
+        self.scores = {}
+        self.evicted = 0
+
+    # ---- 操作 ----
+
+    def _session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ApiError(404, f"no such session: {session_id}")
+        session.last_active = time.monotonic()
+        return session
+
+    async def op_create(self, name=None, seed=None, zones=None, city_seed=0, **_):
+        if len(self.sessions) >= self.max_sessions:
+            raise ApiError(503, "too many sessions")
+        if zones is not None and not 0 < _integer(zones, "zones") <= MAX_ZONES:
+            raise ApiError(400, f"zones must be an integer in 1..{MAX_ZONES}")
+        if name is not None and not isinstance(name, str):
+            raise ApiError(400, "name must be a string")
+        seed = random.SystemRandom().getrandbits(63) if seed is None else _integer(seed, "seed")
+        city_seed = _integer(city_seed, "city_seed", 0)
+        session_id = secrets.token_hex(8)
+        store = ZoneStore.generate(zones, city_seed) if zones else None
+        session = Session(session_id, name or session_id, seed, store, self.history_window)
+        self.sessions[session_id] = session
+        self.scores[session_id] = (0.0, 0, session.name)
+        self._trim_scores()
+        return session_state(session)
+
+    async def op_state(self, session, **_):
+        session = self._session(session)
+        async with session.lock:
+            return session_state(session)
+
+    async def op_decide(self, session, prices=None, strategies=None, mask=None, **_):
+        session = self._session(session)
+        async with session.lock:
+            game = session.game
+            zones = game.zones
+            # 先校验全部参数，都合法后才修改会话，出错时会话保持原样
+            new = None
+            if prices is not None:
+                new = zones.price.copy()
+                try:
+                    if isinstance(prices, dict):
+                        for name, price in prices.items():
+                            new[zones.index[name]] = float(price)
+                    else:
+                        new[:] = np.asarray(prices, dtype=np.float64)
+                except (KeyError, ValueError, TypeError) as exc:
+                    raise ApiError(400, f"bad prices: {exc}")
+                # NaN 与任何数比较都为假，所以检查“全部在范围内”而不是“有超出范围的”
+                if not np.all((new >= zones.price_min) & (new <= zones.price_max)):
+                    raise ApiError(400, "price out of range")
+            if mask is not None and not 0 <= _integer(mask, "mask") < engine.N_STRATEGIES:
+                raise ApiError(400, "bad strategy mask")
+            if strategies is not None:
+                if not isinstance(strategies, dict):
+                    raise ApiError(400, "strategies must be an object")
+                unknown = set(strategies) - set(STRATEGY_NAMES)
+                if unknown:
+                    raise ApiError(400, f"unknown strategies: {sorted(unknown)}")
+                if not all(isinstance(v, bool) for v in strategies.values()):
+                    raise ApiError(400, "strategy values must be true or false")
+
+            if new is not None:
+                game.set_prices(new)
+            if mask is not None:
+                game.strategies.update(engine.mask_to_strategies(mask))
+            if strategies is not None:
+                game.strategies.update(strategies)
+            game.last_results = game.evaluate()
+            return {"session": session.id, "day": game.day, "time": game.current_time,
+                    "results": _results(game.last_results)}
+
+    async def op_next(self, session, **_):
+        session = self._session(session)
+        async with session.lock:
+            game = session.game
+            slot = _results(game.advance_time())
+            reply = {"session": session.id, "slot": slot}
+            if game.game_phase == "day_summary":
+                reply["day_result"] = {k: v.item() if hasattr(v, "item") else v
+                                       for k, v in game.day_history[-1].items()}
+                game.game_phase = "playing"
+                session.update_score()
+                self.scores[session.id] = (session.score, session.scored_days, session.name)
+            reply.update(day=game.day, time=game.current_time, weather=game.weather, score=session.score)
+            return reply
+
+    async def op_close(self, session, **_):
+        session = self._session(session)
+        async with session.lock:
+            # 等锁期间会话可能已被另一个 close 关闭
+            self.sessions.pop(session.id, None)
+        return {"session": session.id, "closed": True}
+
+    async def op_leaderboard(self, limit=10, **_):
+        try:
+            limit = max(1, min(int(limit), 1000))
+        except (TypeError, ValueError):
+            raise ApiError(400, "bad limit")
+        top = heapq.nlargest(limit, self.scores.items(), key=lambda item: item[1][0])
+        return {"leaderboard": [
+            {"rank": i + 1, "session": sid, "name": name, "days": days, "score": score,
+             "active": sid in self.sessions}
+            for i, (sid, (score, days, name)) in enumerate(top)
+        ], "sessions": len(self.sessions)}
+
+    async def call(self, op, args):
+        handler = getattr(self, f"op_{op}", None)
+        if handler is None:
+            raise ApiError(400, f"unknown op: {op}")
+        # 只在绑定参数时把 TypeError 当作参数错误，操作内部的异常照常抛出
+        try:
+            inspect.signature(handler).bind(**args)
+        except TypeError as exc:
+            raise ApiError(400, str(exc))
+        return await handler(**args)
+
+    # ---- 空闲会话回收 ----
+
+    def evict_idle(self, now=None):
+        """回收空闲超时且没有操作在进行的会话，返回回收数"""
+        now = time.monotonic() if now is None else now
+        idle = [s for s in self.sessions.values()
+                if now - s.last_active > self.idle_timeout and not s.lock.locked()]
+        evicted = sum(self.sessions.pop(session.id, None) is not None for session in idle)
+        self.evicted += evicted
+        return evicted
+
+    def _trim_scores(self):
+        """排行榜超过 max_scores 条时丢弃已关闭会话中成绩最低的"""
+        excess = len(self.scores) - self.max_scores
+        if excess > 0:
+            closed = (item for item in self.scores.items() if item[0] not in self.sessions)
+            for sid, _ in heapq.nsmallest(excess, closed, key=lambda item: item[1][0]):
+                del self.scores[sid]
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            self.evict_idle()
+
+    # ---- HTTP ----
+
+    def route(self, method, path, query, body):
+        """把 HTTP 请求映射为 (操作, 参数)"""
+        parts = [p for p in path.split("/") if p]
+        if parts == ["sessions"] and method == "POST":
+            return "create", body
+        if parts == ["leaderboard"] and method == "GET":
+            return "leaderboard", {k: v[-1] for k, v in query.items()}
+        if len(parts) == 2 and parts[0] == "sessions":
+            if method == "GET":
+                return "state", {"session": parts[1]}
+            if method == "DELETE":
+                return "close", {"session": parts[1]}
+            raise ApiError(405, "method not allowed")
+        if len(parts) == 3 and parts[0] == "sessions" and parts[2] in ("decide", "next"):
+            if method != "POST":
+                raise ApiError(405, "method not allowed")
+            return parts[2], dict(body, session=parts[1])
+        raise ApiError(404, "not found")
+
+    async def handle_http(self, method, target, body):
+        url = urlsplit(target)
+        try:
+            try:
+                args = json.loads(body) if body else {}
+            except ValueError:
+                raise ApiError(400, "invalid JSON")
+            if not isinstance(args, dict):
+                raise ApiError(400, "JSON body must be an object")
+            op, args = self.route(method, url.path, parse_qs(url.query), args)
+            result = await self.call(op, args)
+            return (201 if op == "create" else 200), result
+        except ApiError as exc:
+            return exc.status, {"error": str(exc)}
+        except Exception:
+            # 未预料的错误也回复错误信息，不断开连接
+            traceback.print_exc()
+            return 500, {"error": "internal error"}
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, _ = line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self.handle_websocket(reader, writer, headers)
+                    break
+
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    status, result = 400, {"error": "bad Content-Length"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, result = 413, {"error": "body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, result = await self.handle_http(method, target, body)
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_STATUS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ---- WebSocket ----
+
+    async def handle_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        message = b""
+        while True:
+            opcode, fin, data = await read_frame(reader)
+            if opcode == 0x8:  # 关闭
+                write_frame(writer, 0x8, data[:2])
+                await writer.drain()
+                return
+            if opcode == 0x9:  # ping
+                write_frame(writer, 0xA, data)
+                await writer.drain()
+                continue
+            if opcode in (0x1, 0x2, 0x0):
+                message += data
+                if len(message) > MAX_BODY:
+                    write_frame(writer, 0x8, struct.pack("!H", 1009))
+                    await writer.drain()
+                    return
+                if not fin:
+                    continue
+                reply = await self.handle_message(message)
+                message = b""
+                write_frame(writer, 0x1, json.dumps(reply, ensure_ascii=False).encode("utf-8"))
+                await writer.drain()
+
+    async def handle_message(self, message):
+        tag = None
+        try:
+            try:
+                request = json.loads(message)
+            except ValueError:
+                raise ApiError(400, "invalid JSON")
+            if not isinstance(request, dict):
+                raise ApiError(400, "message must be an object")
+            tag = request.pop("tag", None)
+            op = request.pop("op", None)
+            reply = dict(await self.call(op, request), ok=True)
+        except ApiError as exc:
+            reply = {"ok": False, "error": str(exc), "status": exc.status}
+        except Exception:
+            traceback.print_exc()
+            reply = {"ok": False, "error": "internal error", "status": 500}
+        if tag is not None:
+            reply["tag"] = tag
+        return reply
+
+    # ---- 启动 ----
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """开始监听，返回 asyncio.Server；port 为 0 时由系统分配端口"""
+        self._evictor = asyncio.ensure_future(self._evict_loop())
+        return await asyncio.start_server(self.handle_client, host, port)
+
+
+async def read_frame(reader):
+    """读一个客户端帧，返回 (操作码, 是否最后一帧, 去掩码后的数据)"""
+    head = await reader.readexactly(2)
+    fin = bool(head[0] & 0x80)
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_BODY:
+        raise ConnectionError("frame too large")
+    mask = await reader.readexactly(4) if masked else None
+    data = await reader.readexactly(length)
+    if mask:
+        data = (np.frombuffer(data, np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), length)).tobytes()
+    return opcode, fin, data
+
+
+def write_frame(writer, opcode, data):
+    """写一个不带掩码的服务端帧"""
+    length = len(data)
+    if length < 126:
+        head = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        head = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        head = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    writer.write(head + data)
+
+
+def run(host="127.0.0.1", port=8765, **options):
+    """启动服务器并一直运行"""
+    async def main():
+        server = GameServer(**options)
+        listener = await server.start(host, port)
+        addresses = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in listener.sockets)
+        print(f"服务器已启动: {addresses}")
+        async with listener:
+            await listener.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
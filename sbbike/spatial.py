@@ -0,0 +1,214 @@
+"""区域的空间索引：把大量点批量分配到最近的区域，查询最近的 k 个区域
+
+GridIndex 把区域按坐标放进均匀网格（平均每格 POINTS_PER_CELL 个区域，计数排序，
+构建 O(区域数)）。查询时每个点只和所在格周围 (2r + 1)² 个格中的区域比较距离：
+预先把每个格的邻域候选展开成一张定长表（不足的位置填哨兵），一批点的候选距离
+就是一次二维数组运算，没有逐点的 Python 循环。
+
+第 k 近的距离不超过点到邻域边界的距离时结果一定精确；否则（附近区域太稀疏）
+这部分点按已找到的第 k 近距离换用足够大的邻域重查，邻域的格数多于区域数时直接全量比较，
+所以结果总是精确的。格边长不小于长边的 points_per_cell / 区域数，区域共线或排成细条时
+网格也不会退化成几千格长的一条。
+
+坐标单位为公里；经纬度可先用 lonlat_to_km 投影。
+"""
+import math
+
+import numpy as np
+
+# 网格平均每格的区域数
+POINTS_PER_CELL = 2.0
+# 一批查询的候选表元素数上限，控制临时数组的大小
+BATCH_ELEMENTS = 1 << 22
+# 候选表元素数上限，超过时剩下的点直接与全部区域比较
+TABLE_ELEMENTS = 1 << 24
+EARTH_RADIUS_KM = 6371.0088
+
+
+def lonlat_to_km(lon, lat, lon0=None, lat0=None):
+    """经纬度按等距圆柱投影换算成以 (lon0, lat0) 为原点的公里坐标（城市范围内误差可忽略）
+
+    原点默认取各点经纬度的均值。返回 (x, y)。
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon0 = float(lon.mean()) if lon0 is None else lon0
+    lat0 = float(lat.mean()) if lat0 is None else lat0
+    scale = math.pi / 180 * EARTH_RADIUS_KM
+    return (lon - lon0) * scale * math.cos(math.radians(lat0)), (lat - lat0) * scale
+
+
+class GridIndex:
+    """x、y 为各区域的坐标；查询返回的是区域在 x、y 中的下标"""
+
+    def __init__(self, x, y, points_per_cell=POINTS_PER_CELL):
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        self.points_per_cell = points_per_cell
+        n = len(self.x)
+        if n == 0 or len(self.y) != n:
+            raise ValueError("GridIndex needs the same non-zero number of x and y coordinates")
+        self.x0, self.y0 = float(self.x.min()), float(self.y.min())
+        width = max(float(self.x.max()) - self.x0, 1e-9)
+        height = max(float(self.y.max()) - self.y0, 1e-9)
+        # 格边长不小于长边 / (n / points_per_cell)：区域共线或排成细条时网格不会拉得很长
+        self.cell = max(math.sqrt(width * height * points_per_cell / n), max(width, height) * points_per_cell / n, 1e-9)
+        self.nx = int(width / self.cell) + 1
+        self.ny = int(height / self.cell) + 1
+
+        # 计数排序：order[starts[c]:starts[c + 1]] 为格 c 中的区域
+        cell = self._cell_x(self.x) * self.ny + self._cell_y(self.y)
+        self.order = np.argsort(cell, kind="stable")
+        self.counts = np.bincount(cell, minlength=self.nx * self.ny)
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)))
+        # 候选表中的哨兵下标 n 对应无穷远的点
+        self._px = np.append(self.x, np.inf)
+        self._py = np.append(self.y, np.inf)
+        self._tables = {}
+
+    @classmethod
+    def from_zones(cls, zones, **kwargs):
+        return cls(zones.x, zones.y, **kwargs)
+
+    def __len__(self):
+        return len(self.x)
+
+    def _cell_x(self, x):
+        return np.clip(((x - self.x0) / self.cell).astype(np.int64), 0, self.nx - 1)
+
+    def _cell_y(self, y):
+        return np.clip(((y - self.y0) / self.cell).astype(np.int64), 0, self.ny - 1)
+
+    def _table(self, r):
+        """每个格周围 (2r + 1)² 个格中的全部区域及其坐标，形状 (格数, 最大候选数)，不足处为哨兵
+
+        偏移只取网格范围以内的；邻域的格数多于区域数或表太大时为 None（改为全量比较）。
+        """
+        if r in self._tables:
+            return self._tables[r]
+        rx, ry = min(r, self.nx - 1), min(r, self.ny - 1)
+        if (2 * rx + 1) * (2 * ry + 1) > len(self.x):
+            self._tables[r] = None
+            return None
+        gx, gy = np.divmod(np.arange(self.nx * self.ny), self.ny)
+        offsets = [(dx, dy) for dx in range(-rx, rx + 1) for dy in range(-ry, ry + 1)]
+        neighbours = []
+        total = np.zeros(self.nx * self.ny, dtype=np.int64)
+        for dx, dy in offsets:
+            nx, ny = gx + dx, gy + dy
+            valid = (nx >= 0) & (nx < self.nx) & (ny >= 0) & (ny < self.ny)
+            cells = np.flatnonzero(valid)
+            other = nx[valid] * self.ny + ny[valid]
+            neighbours.append((cells, other))
+            total[cells] += self.counts[other]
+
+        width = max(int(total.max()), 1)
+        if self.nx * self.ny * width > TABLE_ELEMENTS:
+            self._tables[r] = None
+            return None
+        table = np.full((self.nx * self.ny, width), len(self.x), dtype=np.int32)
+        filled = np.zeros(self.nx * self.ny, dtype=np.int64)
+        for cells, other in neighbours:
+            count = self.counts[other]
+            keep = count > 0
+            cells, other, count = cells[keep], other[keep], count[keep]
+            if len(cells) == 0:
+                continue
+            # 逐格的一段区域展开成 (格, 列, 区域) 三个平铺数组
+            group_start = np.cumsum(count) - count
+            within = np.arange(int(count.sum())) - np.repeat(group_start, count)
+            rows = np.repeat(cells, count)
+            table[rows, np.repeat(filled[cells], count) + within] = self.order[np.repeat(self.starts[other], count) + within]
+            filled[cells] += count
+        # 候选坐标也展开成表，查询时按行取，不再逐个元素间接寻址
+        table = (table, self._px[table], self._py[table])
+        self._tables[r] = table
+        return table
+
+    def _bound(self, px, py, cx, cy, r):
+        """点到其邻域边界的最近距离；邻域在某一侧已到网格边缘时，那一侧没有更远的区域"""
+        inf = np.inf
+        left = np.where(cx - r <= 0, inf, px - (self.x0 + (cx - r) * self.cell))
+        right = np.where(cx + r >= self.nx - 1, inf, self.x0 + (cx + r + 1) * self.cell - px)
+        down = np.where(cy - r <= 0, inf, py - (self.y0 + (cy - r) * self.cell))
+        up = np.where(cy + r >= self.ny - 1, inf, self.y0 + (cy + r + 1) * self.cell - py)
+        return np.minimum(np.minimum(left, right), np.minimum(down, up))
+
+    def _initial_radius(self, k):
+        """邻域平均约有 2k 个区域"""
+        return max(1, math.ceil((math.sqrt(2 * k / self.points_per_cell) - 1) / 2))
+
+    def _query(self, px, py, k, r):
+        table = None if r >= max(self.nx, self.ny) else self._table(r)
+        if table is None:
+            return self._brute(px, py, k)
+        cx, cy = self._cell_x(px), self._cell_y(py)
+        near = np.empty((len(px), k), dtype=np.int64)
+        dist = np.empty((len(px), k))
+        table, tx, ty = table
+        batch = max(1, BATCH_ELEMENTS // table.shape[1])
+        retry = []
+        for start in range(0, len(px), batch):
+            part = slice(start, start + batch)
+            cell = cx[part] * self.ny + cy[part]
+            d2 = (tx[cell] - px[part, None]) ** 2 + (ty[cell] - py[part, None]) ** 2
+            column, d = _smallest(d2, k)
+            # 补出的列（候选不足 k 个）距离为无穷，下标随便取一个，下面一定会重查
+            near[part] = table[cell[:, None], np.minimum(column, table.shape[1] - 1)]
+            dist[part] = d
+            # 候选不足 k 个时第 k 近的距离为无穷：即使邻域已到网格边缘（边界距离也为无穷）也要重查
+            ok = np.isfinite(d[:, -1]) & (d[:, -1] <= self._bound(px[part], py[part], cx[part], cy[part], r))
+            retry.append(np.flatnonzero(~ok) + start)
+        retry = np.concatenate(retry)
+        if len(retry):
+            # 已找到的第 k 近距离以内的区域都在半径 ceil(距离 / 格边长) 的邻域中，不必逐次翻倍
+            found = dist[retry, -1]
+            found = found[np.isfinite(found)]
+            reach = math.ceil(float(found.max()) / self.cell) if len(found) else 0
+            near[retry], dist[retry] = self._query(px[retry], py[retry], k, max(2 * r, reach))
+        return near, dist
+
+    def _brute(self, px, py, k):
+        near = np.empty((len(px), k), dtype=np.int64)
+        dist = np.empty((len(px), k))
+        batch = max(1, BATCH_ELEMENTS // len(self.x))
+        for start in range(0, len(px), batch):
+            part = slice(start, start + batch)
+            d2 = (self.x - px[part, None]) ** 2 + (self.y - py[part, None]) ** 2
+            near[part], dist[part] = _smallest(d2, k)
+        return near, dist
+
+    def query(self, px, py, k=1):
+        """每个点最近的 k 个区域（k 不超过区域数），按距离从近到远
+
+        返回 (下标, 距离)，形状均为 (点数, k)。
+        """
+        px = np.ascontiguousarray(px, dtype=np.float64).ravel()
+        py = np.ascontiguousarray(py, dtype=np.float64).ravel()
+        k = min(k, len(self.x))
+        if len(px) == 0:
+            return np.empty((0, k), dtype=np.int64), np.empty((0, k))
+        return self._query(px, py, k, self._initial_radius(k))
+
+    def assign(self, px, py):
+        """每个点所属（最近）的区域下标"""
+        return self.query(px, py, 1)[0][:, 0]
+
+
+def _smallest(d2, k):
+    """每行距离平方最小的 k 列，按距离排序，返回 (列号, 距离)"""
+    if k == 1:
+        column = d2.argmin(axis=1)[:, None]
+        return column, np.sqrt(np.take_along_axis(d2, column, axis=1))
+    if k > d2.shape[1]:
+        # 候选不足 k 个时补距离为无穷的列（指向最后一个真实列），排序后排在最后，
+        # 第 k 近的距离为无穷，调用方会换更大的邻域重查
+        d2 = np.pad(d2, ((0, 0), (0, k - d2.shape[1])), constant_values=np.inf)
+    if k < d2.shape[1]:
+        column = np.argpartition(d2, k - 1, axis=1)[:, :k]
+    else:
+        column = np.broadcast_to(np.arange(d2.shape[1]), d2.shape)
+    d2 = np.take_along_axis(d2, column, axis=1)
+    order = np.argsort(d2, axis=1, kind="stable")
+    column = np.take_along_axis(column, order, axis=1)
+    return column, np.sqrt(np.take_along_axis(d2, order, axis=1))
@@ -0,0 +1,132 @@
+"""可配置的时间轴：默认四个时段，或把一天均匀分成 4～1440 个时段
+
+TimeAxis 给出每个时段的名称、分钟数、权重和 engine.demand 用的四张查找表：
+
+- default() 即原来的四个时段，查找表就是 engine 的模块级数组，权重为 1，结果逐位不变；
+- uniform(n) 与原来一样从早高峰开始（SLOT_BOUNDARIES_HOURS[0]），把一天 24 小时均匀
+  分成 n 个时段（n 须整除 1440），时段系数和价格弹性取自 params 中的平滑曲线，天气系数和
+  时段策略沿用所属原时段的值（coarse_slots：分界取到最近的时段边界，uniform(4) 正好是
+  原来的四个时段）。各时段的收入、成本和罚款乘以权重 4 / n，一天的总量与四个时段的
+  模型相当：需求仍是“每时段”的强度，时段变短只按比例折算。
+
+单车调度（GameState(rebalancing=True)）的卡车趟数和单车成本上限是按原来四个时段间隙
+定的，所以只在 rebalance_before 为真的时段开始前调度：默认时段每个都是，细分时段只在
+所属的原时段变化处（每天四次），一天的调度次数与原来相同。
+
+evaluate_day 用一次数组运算求出一天所有时段的结果；单车数量在时段之间不变（不调度、
+不逐次模拟骑行）时，它与逐个时段调用 advance_time 的结果相同，1440 个时段也只是
+一个 (时段, 区域) 数组。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from . import engine, params
+from .params import (
+    MAX_SLOTS,
+    SLOT_BOUNDARIES_HOURS,
+    SLOT_MINUTES,
+    TIME_CURVE_DAY,
+    TIME_CURVE_HOURS,
+    TIME_CURVE_NIGHT,
+    TIME_CURVE_PEAKS,
+    TIME_CURVE_SOFTNESS,
+    TIME_NAMES,
+)
+
+MINUTES_PER_DAY = 1440
+DEFAULT_SLOTS = len(TIME_NAMES)
+
+DayResult = namedtuple("DayResult", ["revenue", "cost", "penalty", "net"])
+DayResult.__doc__ = "一天各时段（已乘权重）的收入、成本、罚款和净收益，形状 (时段,)"
+
+
+def peakness(hours):
+    """各时刻的高峰程度：高斯峰相对高度的最大值，0～1"""
+    hours = np.asarray(hours, dtype=np.float64)
+    return np.max([np.exp(-0.5 * ((hours - center) / width) ** 2) for center, _, width in TIME_CURVE_PEAKS], axis=0)
+
+
+def time_factor_curve(hours):
+    """各时刻的需求时段系数"""
+    hours = np.asarray(hours, dtype=np.float64)
+    start, end = TIME_CURVE_HOURS
+    active = (1 / (1 + np.exp(-(hours - start) / TIME_CURVE_SOFTNESS)) -
+              1 / (1 + np.exp(-(hours - end) / TIME_CURVE_SOFTNESS)))
+    factor = TIME_CURVE_NIGHT + (TIME_CURVE_DAY - TIME_CURVE_NIGHT) * active
+    for center, height, width in TIME_CURVE_PEAKS:
+        factor = factor + height * np.exp(-0.5 * ((hours - center) / width) ** 2)
+    return factor
+
+
+def elasticity_curve(hours):
+    """各时刻的价格弹性：平峰弹性按高峰程度向高峰弹性过渡（弹性可能已由系数文件替换，取当前值）"""
+    return params.ELASTICITY_OFFPEAK + (params.ELASTICITY_PEAK - params.ELASTICITY_OFFPEAK) * peakness(hours)
+
+
+def coarse_slots(slots):
+    """均匀的 slots 个时段各自归入的原时段（0=早高峰, 1=日间, 2=晚高峰, 3=夜间）
+
+    一天从第一个分界算起，各分界取到最近的时段边界，并保证每个原时段至少有一个时段。
+    """
+    edges = np.round((np.asarray(SLOT_BOUNDARIES_HOURS) - SLOT_BOUNDARIES_HOURS[0]) * slots / 24).astype(int)
+    for k in range(1, len(edges)):
+        edges[k] = max(edges[k], edges[k - 1] + 1)
+    edges = np.minimum(edges, slots - len(edges) + np.arange(len(edges)))
+    return np.searchsorted(edges, np.arange(slots), side="right") - 1
+
+
+class TimeAxis:
+    """names 为各时段名称，minutes 为分钟数，weight 为结果的权重；tables 传给 engine.demand"""
+
+    def __init__(self, names, minutes, weight, tables, rebalance_before=None):
+        self.names = list(names)
+        self.minutes = np.asarray(minutes, dtype=np.float64)
+        self.weight = np.asarray(weight, dtype=np.float64)
+        self.tables = tables
+        self.slots = len(self.names)
+        # 各时段开始前是否调度单车，默认每个时段都调度
+        self.rebalance_before = (np.ones(self.slots, dtype=bool) if rebalance_before is None
+                                 else np.asarray(rebalance_before, dtype=bool))
+
+    def __len__(self):
+        return self.slots
+
+    @classmethod
+    def default(cls):
+        """原来的四个时段"""
+        return cls(TIME_NAMES, SLOT_MINUTES, np.ones(DEFAULT_SLOTS),
+                   (engine.TIME_FACTOR, engine.ELASTICITY, engine.WEATHER_FACTOR, engine.STRATEGY_FACTOR))
+
+    @classmethod
+    def uniform(cls, slots):
+        """把一天均匀分成 slots 个时段"""
+        if not DEFAULT_SLOTS <= slots <= MAX_SLOTS or MINUTES_PER_DAY % slots:
+            raise ValueError(f"slots must divide {MINUTES_PER_DAY} and lie in [{DEFAULT_SLOTS}, {MAX_SLOTS}]")
+        minutes = MINUTES_PER_DAY // slots
+        start = round(SLOT_BOUNDARIES_HOURS[0] * 60) + np.arange(slots) * minutes
+        hours = (start + minutes / 2) / 60 % 24
+        coarse = coarse_slots(slots)
+        names = [f"{s // 60 % 24:02d}:{s % 60:02d}-{(s + minutes) // 60 % 24:02d}:{(s + minutes) % 60:02d}"
+                 for s in start.tolist()]
+        tables = (time_factor_curve(hours), elasticity_curve(hours),
+                  engine.WEATHER_FACTOR[:, coarse], engine.STRATEGY_FACTOR[:, coarse])
+        # 所属原时段与前一个时段不同处即原来的时段边界
+        return cls(names, np.full(slots, minutes), np.full(slots, DEFAULT_SLOTS / slots), tables,
+                   coarse != np.roll(coarse, 1))
+
+    @property
+    def is_default(self):
+        return self.tables[0] is engine.TIME_FACTOR
+
+    def evaluate_day(self, base, prices, bikes, optimal, weather, strategy, start=0):
+        """第 start 个时段起到一天结束的各时段结果（单车数量不变）
+
+        prices 形状为 (区域,) 或 (时段, 区域)，strategy 为位掩码或每个时段一个的数组，
+        均从 start 时段起对应。返回 DayResult。
+        """
+        times = np.arange(start, self.slots)
+        result = engine.evaluate(base, prices, bikes, optimal, times, weather,
+                                 np.broadcast_to(strategy, times.shape), self.tables)
+        weight = self.weight[start:]
+        return DayResult(*(np.asarray(column) * weight for column in result[1:]))
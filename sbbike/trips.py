@@ -0,0 +1,180 @@
+"""逐次骑行的离散事件模拟
+
+默认模型把每个区域每个时段的使用量算成 min(需求 × 8, 单车数)，单车从不在区域之间流动。
+这里改为模拟每一次骑行：
+
+- 每个区域的骑行请求数服从泊松分布，均值为按价格、时段、天气和策略调整后的需求
+  × TRIPS_PER_DEMAND × scale，出发时刻在时段内均匀分布；
+- 终点按起止点矩阵（ODMatrix）抽取，骑行时间由距离和车速决定；
+- 出发时起点没有车则记为借车失败（罚款 LOST_TRIP_PENALTY），否则起点少一辆车，
+  到达事件进入按时间排序的堆，到达时终点多一辆车；时段结束时在途的车全部到达。
+
+骑行记录存成几个定长数组（TripRecords），不为每次骑行创建对象；堆中的元素是把
+到达时刻（毫秒）和骑行序号打包成的一个整数。出发事件事先按时间排好序，只有到达
+事件需要进堆，每次骑行的 Python 开销只有几次列表操作和一次堆操作。
+
+GameState(trips=TripSimulator(...)) 在 advance_time 时用本模拟代替解析公式计算时段结果，
+并把骑行后的单车分布写回区域数据；evaluate() 仍是解析估计。快照不保存模拟器。
+"""
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+from . import engine
+from .params import (
+    LOST_TRIP_PENALTY,
+    MIN_RIDE_MINUTES,
+    OD_DECAY_KM,
+    OD_NEIGHBORS,
+    RIDE_SPEED_KMH,
+    SLOT_MINUTES,
+    TRIPS_PER_DEMAND,
+    WEATHERS,
+)
+from .spatial import GridIndex
+
+# 堆中整数的低位存骑行序号
+INDEX_BITS = 27
+
+TripRecords = namedtuple("TripRecords", "origin dest depart arrive served")
+TripRecords.__doc__ = "一个时段的全部骑行：起点、终点、出发和到达分钟数、是否借到车（按出发时间排序）"
+
+
+class ODMatrix:
+    """稀疏的起止点矩阵：每个起点只有 dest.shape[1] 个候选终点
+
+    dest[i, k] 为起点 i 的第 k 个候选终点，cumprob[i, k] 为前 k 个终点的累计概率，
+    dist[i, k] 为距离（公里）。
+    """
+
+    def __init__(self, dest, cumprob, dist):
+        self.dest = np.ascontiguousarray(dest, dtype=np.int32)
+        self.cumprob = np.ascontiguousarray(cumprob, dtype=np.float64)
+        self.dist = np.ascontiguousarray(dist, dtype=np.float64)
+
+    @classmethod
+    def gravity(cls, zones, neighbors=OD_NEIGHBORS, decay_km=OD_DECAY_KM):
+        """重力模型：终点概率与终点的基础需求成正比，随距离指数衰减，只考虑最近的 neighbors 个区域"""
+        dest, dist = GridIndex.from_zones(zones).query(zones.x, zones.y, neighbors)
+        weight = zones.demand[dest] * np.exp(-dist / decay_km)
+        return cls(dest, np.cumsum(weight, axis=1) / weight.sum(axis=1, keepdims=True), dist)
+
+    @classmethod
+    def dense(cls, matrix, zones):
+        """由稠密矩阵（matrix[i, j] 为从 i 出发去 j 的相对比例）构造，距离取区域坐标间的直线距离"""
+        matrix = np.asarray(matrix, dtype=np.float64)
+        n = len(zones)
+        dest = np.broadcast_to(np.arange(n), (n, n))
+        dist = np.hypot(zones.x[:, None] - zones.x, zones.y[:, None] - zones.y)
+        return cls(dest, np.cumsum(matrix, axis=1) / matrix.sum(axis=1, keepdims=True), dist)
+
+    def sample(self, origin, u):
+        """对每个起点按均匀随机数 u 抽取终点，返回 (终点, 距离)"""
+        cumprob = self.cumprob[origin]
+        k = np.minimum((cumprob < u[:, None]).sum(axis=1), cumprob.shape[1] - 1)
+        return self.dest[origin, k], self.dist[origin, k]
+
+
+class TripSimulator:
+    """scale 放大骑行请求数；speed_kmh 为骑行速度"""
+
+    def __init__(self, zones, od=None, seed=None, scale=1.0, speed_kmh=RIDE_SPEED_KMH):
+        self.od = od if od is not None else ODMatrix.gravity(zones)
+        self.rng = np.random.default_rng(seed)
+        self.scale = scale
+        self.speed_kmh = speed_kmh
+        self.last_trips = None
+        self.last_lost = None
+        self.total_trips = 0
+        self.total_lost = 0
+
+    def fork(self):
+        """共享起止点矩阵、随机数状态相同的副本"""
+        branch = TripSimulator.__new__(TripSimulator)
+        branch.__dict__ = dict(self.__dict__)
+        branch.rng = np.random.Generator(type(self.rng.bit_generator)())
+        branch.rng.bit_generator.state = self.rng.bit_generator.state
+        return branch
+
+    def generate(self, demand, minutes):
+        """按各区域的需求生成骑行请求，返回按出发时间排序的 TripRecords（served 全为 False）"""
+        rng = self.rng
+        counts = rng.poisson(demand * TRIPS_PER_DEMAND * self.scale)
+        total = int(counts.sum())
+        if total >= 1 << INDEX_BITS:
+            raise ValueError(f"too many trips in one slot: {total}")
+        depart = rng.uniform(0, minutes, total)
+        order = np.argsort(depart, kind="stable")
+        depart = depart[order]
+        origin = np.repeat(np.arange(len(demand), dtype=np.int32), counts)[order]
+        dest, dist = self.od.sample(origin, rng.random(total))
+        arrive = depart + np.maximum(dist / self.speed_kmh * 60, MIN_RIDE_MINUTES)
+        return TripRecords(origin, dest, depart.astype(np.float32), arrive.astype(np.float32),
+                           np.zeros(total, dtype=bool))
+
+    @staticmethod
+    def run(trips, bikes):
+        """按时间顺序处理出发和到达事件，就地修改 bikes（整数列表），填写 trips.served"""
+        total = len(trips.origin)
+        index = np.arange(total, dtype=np.int64)
+        # 同一毫秒先处理到达再处理出发
+        depart_keys = ((np.floor(trips.depart.astype(np.float64) * 60000).astype(np.int64) << INDEX_BITS) |
+                       ((1 << INDEX_BITS) - 1)).tolist()
+        arrive_keys = ((np.floor(trips.arrive.astype(np.float64) * 60000).astype(np.int64) << INDEX_BITS) |
+                       index).tolist()
+        origin = trips.origin.tolist()
+        dest = trips.dest.tolist()
+        served = bytearray(total)
+        mask = (1 << INDEX_BITS) - 1
+        heap = []
+        push, pop = heapq.heappush, heapq.heappop
+
+        for i in range(total):
+            key = depart_keys[i]
+            while heap and heap[0] <= key:
+                bikes[dest[pop(heap) & mask]] += 1
+            o = origin[i]
+            if bikes[o]:
+                bikes[o] -= 1
+                served[i] = 1
+                push(heap, arrive_keys[i])
+        # 时段结束，在途的车全部到达
+        for key in heap:
+            bikes[dest[key & mask]] += 1
+        trips.served[:] = np.frombuffer(served, dtype=bool)
+        return bikes
+
+    def simulate_slot(self, base, prices, bikes, time, weather, mask, minutes=None, tables=None, weight=1.0):
+        """模拟一个时段，返回 (TripRecords, 时段结束时各区域单车数, 各区域借车失败次数)
+
+        细分时间轴时 tables 为其查找表（见 engine.demand），minutes 为时段分钟数，
+        weight 为时段权重，骑行请求数按权重折算。
+        """
+        minutes = SLOT_MINUTES[time] if minutes is None else minutes
+        demand = engine.demand(base, prices, time, weather, mask, tables) * weight
+        trips = self.generate(demand, minutes)
+        after = np.array(self.run(trips, np.asarray(bikes).tolist()), dtype=np.int64)
+        lost = np.bincount(trips.origin[~trips.served], minlength=len(base))
+        return trips, after, lost
+
+    def run_slot(self, game):
+        """按 game 当前时段的状态模拟，更新单车分布，返回 (收入, 成本, 罚款, 净收益)"""
+        zones = game.zones
+        axis = game.time_axis
+        mask = engine.strategies_to_mask(game.strategies)
+        trips, after, lost = self.simulate_slot(zones.demand, zones.price, zones.bikes, game.current_time,
+                                                WEATHERS.index(game.weather), mask,
+                                                axis.minutes[game.current_time], axis.tables, game.slot_weight)
+        revenue = float(zones.price[trips.origin[trips.served]].sum())
+        zones.writable("bikes")[:] = after
+        game._zone_changed("bikes")
+        # 成本和不均衡罚款按骑行后的单车分布计算；需求未满足罚款改为按借车失败次数计
+        cost = float(engine.costs(zones.bikes, zones.optimal, mask) * game.slot_weight)
+        penalty = (float(engine.penalty(0.0, zones.bikes, zones.optimal) * game.slot_weight) +
+                   LOST_TRIP_PENALTY * int(lost.sum()))
+        self.last_trips = trips
+        self.last_lost = lost
+        self.total_trips += len(trips.origin)
+        self.total_lost += int(lost.sum())
+        return revenue, cost, penalty, revenue - cost - penalty
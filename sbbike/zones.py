@@ -0,0 +1,109 @@
+"""区域（站点）数据的列式存储
+
+每个字段是一个连续的 NumPy 数组，下标即区域序号，成千上万个区域的需求、收入、
+成本和罚款都可以整列计算，不再逐个区域循环。
+"""
+import numpy as np
+
+from .params import (
+    AREA_POSITIONS,
+    CALIBRATED_DEMAND,
+    DEFAULT_AREAS,
+    OPTIMAL_MAX,
+    OPTIMAL_MIN,
+    PRICE_RANGES,
+    PRICE_STEP,
+    ZONE_AREA_KM2,
+)
+
+FIELDS = ("demand", "bikes", "price", "optimal")
+# ZoneStore 中的全部数组
+COLUMNS = FIELDS + ("price_min", "price_max", "x", "y")
+
+
+class ZoneStore:
+    """区域数据
+
+    demand（基础需求）和 price 为 float64，bikes 和 optimal 为 int64；
+    price_min / price_max 为各区域价格滑块的范围；x / y 为区域位置（公里）。
+
+    fork 出的分支与原数据共享数组，共享的数组设为只读；原地修改数组前须通过
+    writable(字段名) 取得可写的数组，第一次写入时才复制（写时复制）。
+    """
+
+    def __init__(self, names, demand, bikes, price, optimal, price_min, price_max, x=None, y=None):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.demand = np.array(demand, dtype=np.float64)
+        self.bikes = np.array(bikes, dtype=np.int64)
+        self.price = np.array(price, dtype=np.float64)
+        self.optimal = np.array(optimal, dtype=np.int64)
+        self.price_min = np.array(price_min, dtype=np.float64)
+        self.price_max = np.array(price_max, dtype=np.float64)
+        self.x = np.zeros(len(self.names)) if x is None else np.array(x, dtype=np.float64)
+        self.y = np.zeros(len(self.names)) if y is None else np.array(y, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_dict(cls, areas, price_ranges=PRICE_RANGES, positions=AREA_POSITIONS):
+        """由 {区域名: {"demand", "bikes", "price", "optimal"}} 构建"""
+        names = list(areas)
+        # 没有预设滑块范围的区域使用所有滑块的总范围，没有预设位置的区域放在原点
+        default = (min(lo for lo, _ in price_ranges.values()), max(hi for _, hi in price_ranges.values()))
+        ranges = [price_ranges.get(name, default) for name in names]
+        points = [positions.get(name, (0.0, 0.0)) for name in names]
+        return cls(names, *([areas[name][key] for name in names] for key in FIELDS),
+                   [lo for lo, _ in ranges], [hi for _, hi in ranges],
+                   [x for x, _ in points], [y for _, y in points])
+
+    @classmethod
+    def default(cls):
+        """游戏默认的三个区域"""
+        return cls.from_dict(DEFAULT_AREAS)
+
+    @classmethod
+    def generate(cls, n, seed=None):
+        """随机生成 n 个站点的城市，参数分布与默认的三个区域相近"""
+        rng = np.random.default_rng(seed)
+        templates = list(PRICE_RANGES.values())
+        kind = rng.integers(len(templates), size=n)
+        price_min = np.array([templates[k][0] for k in kind])
+        price_max = np.array([templates[k][1] for k in kind])
+        # 初始价格取滑块中点，对齐到步长
+        price = np.round((price_min + price_max) / 2 / PRICE_STEP) * PRICE_STEP
+        demand = np.round(rng.uniform(2.5, 4.5, n), 1)
+        bikes = rng.integers(15, 46, n)
+        optimal = rng.integers(OPTIMAL_MIN, OPTIMAL_MAX + 1, n)
+        # 站点均匀散布在正方形城区内
+        side = np.sqrt(n * ZONE_AREA_KM2)
+        x, y = rng.uniform(0, side, (2, n))
+        names = [f"站点{i + 1}" for i in range(n)]
+        if CALIBRATED_DEMAND:
+            # 系数文件中有校准值的站点使用校准的基础需求
+            demand = np.array([CALIBRATED_DEMAND.get(name, d) for name, d in zip(names, demand.tolist())])
+        return cls(names, demand, bikes, price, optimal, price_min, price_max, x, y)
+
+    def copy(self):
+        return ZoneStore(self.names, self.demand, self.bikes, self.price, self.optimal,
+                         self.price_min, self.price_max, self.x, self.y)
+
+    def fork(self):
+        """共享所有数组的分支，双方修改时各自复制"""
+        branch = ZoneStore.__new__(ZoneStore)
+        branch.names = self.names
+        branch.index = self.index
+        for name in COLUMNS:
+            column = getattr(self, name)
+            column.flags.writeable = False
+            setattr(branch, name, column)
+        return branch
+
+    def writable(self, name):
+        """返回可原地修改的 name 数组，与其他分支共享时先复制一份"""
+        column = getattr(self, name)
+        if not column.flags.writeable:
+            column = column.copy()
+            setattr(self, name, column)
+        return column
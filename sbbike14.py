@@ -1 +1,11 @@
+"""共享单车动态定价模拟
 
+    python sbbike14.py              打开游戏窗口
+    python sbbike14.py run -n 1000  无界面模拟 1000 天
+"""
+import sys
+
+from sbbike.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+import pytest
+
+from sbbike import bench
+
+
+def test_startup_benchmark_from_another_directory(tmp_path, monkeypatch):
+    pytest.importorskip("pygame")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("PYTHONPATH", raising=False)
+    result = bench.startup_benchmark(1)["startup"]
+    assert result["calls"] == 1 and result["median"] > 0
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from sbbike import calibrate, params
+
+
+@pytest.fixture(scope="module")
+def synthetic(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("logs") / "trips.bin")
+    calibrate.synthesize(path, 2000, seed=3)
+    return path
+
+
+def test_round_trip_recovers_coefficients(synthetic):
+    fitted = calibrate.calibrate([synthetic])
+    assert fitted["censored"] > 0
+    np.testing.assert_allclose(fitted["time_factors"], params.TIME_FACTORS, rtol=0.03)
+    assert fitted["elasticity_peak"] == pytest.approx(params.ELASTICITY_PEAK, abs=0.01)
+    assert fitted["elasticity_offpeak"] == pytest.approx(params.ELASTICITY_OFFPEAK, abs=0.01)
+    np.testing.assert_allclose(fitted["weather_factors"]["rain"], params.WEATHER_FACTORS["rain"], rtol=0.03)
+    np.testing.assert_allclose(fitted["weather_factors"]["heat"], params.WEATHER_FACTORS["heat"], rtol=0.06)
+    base = {name: area["demand"] for name, area in params.DEFAULT_AREAS.items()}
+    np.testing.assert_allclose([fitted["base_demand"][name] for name in base], list(base.values()), rtol=0.03)
+
+
+def test_chunking_and_csv_give_the_same_fit(synthetic, tmp_path):
+    whole = calibrate.calibrate([synthetic])
+    chunked = calibrate.calibrate([synthetic], chunk_rows=1000)
+    assert chunked == whole
+    csv = str(tmp_path / "trips.csv")
+    calibrate.synthesize(csv, 50, seed=4)
+    binary = str(tmp_path / "trips.bin")
+    calibrate.synthesize(binary, 50, seed=4)
+    from_csv, from_binary = calibrate.calibrate([csv]), calibrate.calibrate([binary])
+    assert from_csv["rows"] == from_binary["rows"]
+    for key in ("time_factors", "elasticity_peak", "elasticity_offpeak"):
+        np.testing.assert_allclose(from_csv[key], from_binary[key], rtol=1e-3)
+
+
+def test_csv_accepts_weather_names_blank_lines_and_crlf(tmp_path):
+    path = tmp_path / "trips.csv"
+    path.write_bytes(b"day,slot,zone,price,weather\r\n1,0,2,2.5,sunny\r\n\r\n1,1,0,3,2\r\n2,3,1,1.5,rain")
+    chunks = list(calibrate.iter_csv(str(path), chunk_bytes=8))
+    assert np.concatenate([c["day"] for c in chunks]).tolist() == [1, 1, 2]
+    assert np.concatenate([c["weather"] for c in chunks]).tolist() == [0, 2, 1]
+    assert np.concatenate([c["price"] for c in chunks]).tolist() == [2.5, 3.0, 1.5]
+
+
+@pytest.mark.parametrize("row", ["1,0,2,x,sunny", "1,0,2,2.5", "1,0,2,2.5,sunny,7", "1,0.5,2,2.5,0",
+                                 "1,0,2,2.5,snow", "1,0,2,2.5,3", "1,0,2,nan,0", ""])
+@pytest.mark.parametrize("chunk_bytes", [16, 1 << 20])
+def test_csv_errors_report_the_line(tmp_path, row, chunk_bytes):
+    good = "1,0,2,2.5,sunny\n"
+    path = tmp_path / "trips.csv"
+    path.write_text("day,slot,zone,price,weather\n" + good * 5 + "\n" + good * 3 + row + "\n" + good * 4)
+    chunks = calibrate.iter_csv(str(path), chunk_bytes=chunk_bytes)
+    if not row:
+        assert sum(len(c["day"]) for c in chunks) == 12
+        return
+    with pytest.raises(ValueError, match=f"trips.csv: line 11: malformed CSV row '{row}'"):
+        list(chunks)
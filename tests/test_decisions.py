@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from sbbike import decisions, engine
+from sbbike.model import GameState
+from sbbike.zones import ZoneStore
+
+
+def record(path, zones=20):
+    """边玩边记录：改价格、改策略、执行、推进，返回玩过的游戏状态"""
+    rng = np.random.default_rng(0)
+    log = decisions.DecisionLog(path, seed=7, zones=zones, city_seed=3, rebalancing=True)
+    game = GameState(7, zones=ZoneStore.generate(zones, 3), rebalancing=True)
+    log.start()
+    game.game_phase = "playing"
+    for _ in range(4 * 3 + 1):
+        changed = np.flatnonzero(rng.random(zones) < 0.3)
+        prices = game.zones.price.copy()
+        prices[changed] = rng.uniform(game.zones.price_min, game.zones.price_max)[changed]
+        log.prices(changed, prices[changed])
+        game.set_prices(prices)
+        mask = int(rng.integers(engine.N_STRATEGIES))
+        log.strategies(mask)
+        game.strategies.update(engine.mask_to_strategies(mask))
+        log.execute()
+        game.last_results = game.evaluate()
+        log.next_slot()
+        game.advance_time()
+    log.close()
+    return game
+
+
+def summary(game):
+    return (game.day, game.current_time, game.total_revenue, game.total_cost, game.total_penalty,
+            game.zones.price.tolist(), game.zones.bikes.tolist(), game.zones.optimal.tolist(),
+            dict(game.strategies), game.weather, list(game.day_history))
+
+
+def test_replay_reproduces_recorded_game(tmp_path):
+    path = tmp_path / "game.sblog"
+    game = record(path)
+    header, replayed, count = decisions.replay(path)
+    assert header == {"seed": 7, "zones": 20, "city_seed": 3, "rebalancing": True}
+    assert count == 1 + 4 * (4 * 3 + 1)
+    assert summary(replayed) == summary(game)
+
+
+@pytest.mark.parametrize("op", ["prices", "strategies"])
+def test_truncated_final_record_is_ignored(tmp_path, op):
+    path = tmp_path / "game.sblog"
+    record(path)
+    data = path.read_bytes()
+    _, complete, count = decisions.replay(path)
+
+    # 末尾再追加一条记录，每种截断位置都应得到与不追加时相同的结果
+    log = decisions.DecisionLog(tmp_path / "tail.sblog", seed=7)
+    if op == "prices":
+        log.prices([0, 1, 2], [1.0, 1.5, 2.0])
+    else:
+        log.strategies(3)
+    log.close()
+    tail = (tmp_path / "tail.sblog").read_bytes()[decisions.HEADER.size:]
+    for cut in range(1, len(tail)):
+        path.write_bytes(data + tail[:cut])
+        _, replayed, replayed_count = decisions.replay(path)
+        assert replayed_count == count, cut
+        assert summary(replayed) == summary(complete)
+    path.write_bytes(data + tail)
+    assert decisions.replay(path)[2] == count + 1
@@ -0,0 +1,126 @@
+import random
+
+import numpy as np
+import pytest
+
+from sbbike import engine
+from sbbike.model import GameState
+from sbbike.params import DEFAULT_AREAS, PRICE_RANGES, STRATEGY_NAMES, WEATHERS
+
+
+class BaselineGame:
+    """拆分前 public bicycle game.py 中逐个区域计算的 GameState（只换成了独立的随机数流）"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.current_time = 0
+        self.total_revenue = self.total_cost = self.total_penalty = 0
+        self.areas = {name: dict(area) for name, area in DEFAULT_AREAS.items()}
+        self.strategies = {name: False for name in STRATEGY_NAMES}
+        self.weather = "sunny"
+
+    def calculate_demand(self, area):
+        base = self.areas[area]["demand"]
+        price = self.areas[area]["price"]
+        time_factor = [1.8, 1.0, 1.5, 0.7][self.current_time]
+        elasticity = -0.3 if self.current_time in [0, 2] else -0.4
+        price_effect = 1 + elasticity * (price - 2.0) / 0.5
+        weather_factor = 1.0
+        if self.weather == "rain":
+            weather_factor = 0.6
+        elif self.weather == "heat":
+            weather_factor = 1.3 if self.current_time == 3 else 1.1
+        strategy_factor = 1.0
+        if self.strategies["高峰溢价"] and self.current_time in [0, 2]:
+            strategy_factor = 1.3
+        elif self.strategies["夜间折扣"] and self.current_time == 3:
+            strategy_factor = 0.8
+        demand = base * time_factor * price_effect * weather_factor * strategy_factor
+        return max(0.5, min(5.0, demand))
+
+    def calculate_revenue(self):
+        revenue = 0
+        for area in self.areas:
+            usage = min(self.calculate_demand(area) * 8, self.areas[area]["bikes"])
+            revenue += usage * self.areas[area]["price"]
+        return revenue
+
+    def calculate_costs(self):
+        relocation_cost = 0
+        for area in self.areas:
+            relocation_cost += abs(self.areas[area]["bikes"] - self.areas[area]["optimal"]) * 0.8
+        maintenance = sum([data["bikes"] * 0.2 for data in self.areas.values()])
+        strategy_cost = sum(cost for name, cost in zip(STRATEGY_NAMES, (100, 70, 50)) if self.strategies[name])
+        return relocation_cost + maintenance + strategy_cost
+
+    def calculate_penalty(self):
+        penalty = 0
+        for area in self.areas:
+            imbalance = abs(self.areas[area]["bikes"] - self.areas[area]["optimal"])
+            if imbalance > 15:
+                penalty += imbalance * 0.5
+        for area in self.areas:
+            demand = self.calculate_demand(area)
+            if self.areas[area]["bikes"] < demand * 0.7:
+                penalty += (demand * 0.7 - self.areas[area]["bikes"]) * 1.0
+        return penalty
+
+    def advance_time(self):
+        revenue, cost, penalty = self.calculate_revenue(), self.calculate_costs(), self.calculate_penalty()
+        self.total_revenue += revenue
+        self.total_cost += cost
+        self.total_penalty += penalty
+        self.current_time = (self.current_time + 1) % 4
+        if self.current_time == 0:
+            self.weather = self.rng.choices(["sunny", "rain", "heat"], weights=[0.7, 0.2, 0.1])[0]
+            for key in self.strategies:
+                self.strategies[key] = False
+            for area in self.areas:
+                self.areas[area]["optimal"] = max(20, min(50, self.areas[area]["optimal"] + self.rng.randint(-3, 3)))
+        return revenue, cost, penalty, revenue - cost - penalty
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_game_state_matches_baseline_scalar_model(seed):
+    """随机的价格、单车数和策略下逐时段比较 400 步"""
+    choices = np.random.default_rng(seed)
+    baseline, game = BaselineGame(seed), GameState(seed)
+    for _ in range(400):
+        for name, (lo, hi) in PRICE_RANGES.items():
+            price = float(choices.choice(np.arange(lo, hi + 0.25, 0.5)))
+            bikes = int(choices.integers(0, 60))
+            baseline.areas[name].update(price=price, bikes=bikes)
+            game.areas[name]["price"] = price
+            game.areas[name]["bikes"] = bikes
+        mask = int(choices.integers(engine.N_STRATEGIES))
+        baseline.strategies.update(engine.mask_to_strategies(mask))
+        game.strategies.update(engine.mask_to_strategies(mask))
+
+        assert [game.calculate_demand(name) for name in DEFAULT_AREAS] == \
+               [baseline.calculate_demand(name) for name in DEFAULT_AREAS]
+        assert game.advance_time() == baseline.advance_time()
+        assert game.weather == baseline.weather
+        assert [game.areas[name]["optimal"] for name in DEFAULT_AREAS] == \
+               [baseline.areas[name]["optimal"] for name in DEFAULT_AREAS]
+    assert (game.total_revenue, game.total_cost, game.total_penalty) == \
+           (baseline.total_revenue, baseline.total_cost, baseline.total_penalty)
+
+
+def test_sweep_matches_baseline_for_every_combination():
+    game = GameState(0)
+    prices = engine.price_grid(*PRICE_RANGES.values())
+    result = engine.sweep(game, prices)
+    baseline = BaselineGame(0)
+    rng = np.random.default_rng(0)
+    for p in rng.choice(len(prices), 20, replace=False):
+        for name, price in zip(DEFAULT_AREAS, prices[p]):
+            baseline.areas[name]["price"] = float(price)
+        for t in range(engine.N_TIMES):
+            for w, weather in enumerate(WEATHERS):
+                for s in range(engine.N_STRATEGIES):
+                    baseline.current_time, baseline.weather = t, weather
+                    baseline.strategies.update(engine.mask_to_strategies(s))
+                    revenue, cost, penalty = (baseline.calculate_revenue(), baseline.calculate_costs(),
+                                              baseline.calculate_penalty())
+                    assert (result.revenue[p, t, w, s], result.cost[p, t, w, s], result.penalty[p, t, w, s]) == \
+                           (revenue, cost, penalty)
@@ -0,0 +1,22 @@
+import numpy as np
+
+from sbbike.env import SLOTS_PER_DAY, VecPricingEnv
+
+
+def test_final_observation_is_the_terminal_state():
+    env = VecPricingEnv(64, days=2, seed=0)
+    env.reset()
+    prices = np.broadcast_to((env.price_min + env.price_max) / 2, (64, len(env.base)))
+    for _ in range(2 * SLOTS_PER_DAY - 1):
+        _, _, done, info = env.step(prices, np.zeros(64))
+        assert not done.any() and "final_observation" not in info
+    before = env.observe()
+    observation, _, done, info = env.step(prices, np.zeros(64))
+    assert done.all()
+    final = info["final_observation"]
+    for key in before:
+        np.testing.assert_array_equal(final[key], before[key])
+    assert (final["time"] == SLOTS_PER_DAY - 1).all()
+    # 已自动重置
+    assert (observation["time"] == 0).all()
+    np.testing.assert_array_equal(observation["optimal"], np.broadcast_to(env.initial_optimal, (64, len(env.base))))
@@ -0,0 +1,42 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from sbbike import bench
+
+
+@pytest.fixture(scope="module")
+def gui():
+    import os
+    saved = os.environ.get("SBBIKE_ZONES")
+    yield bench.load_gui(2000)
+    if saved is None:
+        os.environ.pop("SBBIKE_ZONES", None)
+    else:
+        os.environ["SBBIKE_ZONES"] = saved
+
+
+@pytest.mark.parametrize("zone", [0, 1, 1000, 1996, 1997, 1998, 1999])
+def test_selecting_a_zone_shows_its_card_and_slider(gui, zone):
+    area_list = gui["area_list"]
+    gui["select_zone"](zone)
+    top = zone * area_list.pitch
+    assert area_list.scroll <= top
+    assert top + area_list.card_height <= area_list.scroll + area_list.rect.height
+    assert 0 <= area_list.scroll <= area_list.max_scroll
+    assert zone in [slider.zone for slider in gui["visible_sliders"]()]
+
+
+def test_clicking_the_last_zone_on_the_map(gui):
+    city_map, game = gui["city_map"], gui["game"]
+    heatmap = city_map.heatmap
+    last = len(game.zones) - 1
+    # 放到最大再把最后一个区域移到视图中心，点击它
+    heatmap.zoom(1e9, (0, 0))
+    heatmap.center = (float(game.zones.x[last]), float(game.zones.y[last]))
+    pos = city_map.rect.center
+    for kind in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        assert city_map.handle(pos, pygame.event.Event(kind, pos=pos, button=1)) == (kind == pygame.MOUSEBUTTONUP)
+    assert city_map.selected == last
+    gui["select_zone"](city_map.selected)
+    assert last in [slider.zone for slider in gui["visible_sliders"]()]
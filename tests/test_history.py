@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from sbbike.history import DayHistory
+from sbbike.params import WEATHERS
+
+
+def row(day):
+    return day, day * 10.0, day * 3.0, day * 0.5, day * 6.5, WEATHERS[day % len(WEATHERS)]
+
+
+def as_dict(day):
+    return dict(zip(DayHistory.FIELDS, row(day)))
+
+
+def fill(history, start, stop):
+    for day in range(start, stop):
+        history.append(*row(day))
+    return history
+
+
+@pytest.mark.parametrize("window", [1, 3, 7])
+def test_window_keeps_the_latest_days(window):
+    history = fill(DayHistory(window=window), 0, 10 * window + 2)
+    assert len(history) == 10 * window + 2
+    kept = list(history)
+    assert window <= len(kept) < 2 * window
+    assert kept == [as_dict(day) for day in range(len(history) - len(kept), len(history))]
+    assert history[-1] == as_dict(10 * window + 1)
+    assert history[-window] == as_dict(9 * window + 2)
+    with pytest.raises(IndexError):
+        history[0]
+    with pytest.raises(IndexError):
+        history[len(history)]
+
+
+def check(history, days, window):
+    """history 的总天数为 len(days)，内存中保留的是 days 的末尾（至少一个窗口）"""
+    kept = list(history)
+    assert len(history) == len(days)
+    assert len(kept) == len(days) if window is None else min(window, len(days)) <= len(kept)
+    assert kept == [as_dict(day) for day in days[len(days) - len(kept):]]
+
+
+@pytest.mark.parametrize("window", [None, 4])
+def test_forks_share_old_rows_and_diverge(window):
+    history = fill(DayHistory(window=window), 0, 6)
+    branch = history.fork()
+    fill(history, 6, 9)
+    fill(branch, 100, 103)
+    nested = branch.fork()
+    fill(nested, 200, 211)
+    fill(branch, 103, 104)
+
+    check(history, [*range(9)], window)
+    check(branch, [*range(6), *range(100, 104)], window)
+    check(nested, [*range(6), *range(100, 103), *range(200, 211)], window)
+    if window is None:
+        assert branch[5] == nested[5] == as_dict(5)
+
+
+def test_file_round_trip(tmp_path):
+    path = tmp_path / "days.bin"
+    history = DayHistory(path, window=5)
+    fill(history, 1, 50)
+    history.close()
+    assert list(DayHistory.read(path, chunk_days=7)) == [as_dict(day) for day in range(1, 50)]
+    records = np.fromfile(path, dtype=DayHistory.NUMPY_DTYPE)
+    assert records["day"].tolist() == list(range(1, 50))
+    assert records["net"].tolist() == [day * 6.5 for day in range(1, 50)]
+
+
+def test_day_out_of_int32_range_is_rejected(tmp_path):
+    path = tmp_path / "days.bin"
+    history = DayHistory(path)
+    history.append(*row(2 ** 31 - 1))
+    with pytest.raises(OverflowError):
+        history.append(2 ** 31, 0.0, 0.0, 0.0, 0.0, "sunny")
+    history.close()
+    # 出错的一天既不在内存中也不在文件里，各列长度一致
+    assert len(history) == 1 and len({len(column) for column in history.columns.values()}) == 1
+    assert list(DayHistory.read(path)) == [as_dict(2 ** 31 - 1)]
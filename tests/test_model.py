@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from sbbike import engine
+from sbbike.history import DayHistory
+from sbbike.model import SNAPSHOT_SCALARS, GameState
+from sbbike.timeline import TimeAxis
+from sbbike.zones import COLUMNS, ZoneStore
+
+
+def make_game(slots=None, window=None):
+    return GameState(3, DayHistory(window=window), ZoneStore.generate(50, 1), rebalancing=True,
+                     time_axis=TimeAxis.uniform(slots) if slots else None)
+
+
+def play(game, seed, slots):
+    """按 seed 随机设置价格和策略，推进 slots 个时段，返回各时段结果"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for _ in range(slots):
+        zones = game.zones
+        game.set_prices(rng.uniform(zones.price_min, zones.price_max))
+        game.strategies.update(engine.mask_to_strategies(int(rng.integers(engine.N_STRATEGIES))))
+        results.append(game.advance_time())
+    return results
+
+
+def state(game):
+    return ([getattr(game, name) for name in SNAPSHOT_SCALARS], dict(game.strategies),
+            {name: getattr(game.zones, name).tolist() for name in COLUMNS}, game.zones.names,
+            list(game.day_history), len(game.day_history), game.rng.getstate())
+
+
+@pytest.mark.parametrize("slots, window", [(None, None), (8, None), (None, 2)])
+def test_snapshot_mid_day_round_trip_then_continue(slots, window):
+    game = make_game(slots, window)
+    play(game, 0, game.time_axis.slots * 3 + 2)
+    assert game.current_time == 2 and game.day == 4
+
+    restored = GameState.restore(game.snapshot())
+    assert state(restored) == state(game)
+    assert restored.time_axis.slots == game.time_axis.slots
+    assert restored.evaluate() == game.evaluate()
+
+    # 恢复后继续玩几天，与原状态逐时段相同
+    assert play(restored, 1, game.time_axis.slots * 5) == play(game, 1, game.time_axis.slots * 5)
+    assert state(restored) == state(game)
+
+
+def test_fork_does_not_share_mutable_state():
+    game = make_game()
+    play(game, 0, 6)
+    before = state(game)
+    branch = game.fork()
+    assert state(branch) == before
+
+    # 分支修改价格、策略、单车、理想数量和历史，原状态不变
+    play(branch, 1, 4 * 3)
+    branch.areas[game.zones.names[0]]["bikes"] = 999
+    assert state(game) == before
+
+    # 原状态继续推进，分支也不变
+    after = state(branch)
+    play(game, 2, 4 * 3)
+    assert state(branch) == after
+
+    # 两个分支用相同输入推进，结果与未分叉时相同
+    again = game.fork()
+    assert play(again, 3, 4 * 2) == play(game, 3, 4 * 2)
+    assert state(again) == state(game)
+
+
+def test_evaluate_cache_counts_hits_and_is_invalidated_by_every_input():
+    game = GameState(0)
+    name = game.zones.names[0]
+
+    def fresh():
+        branch = game.fork()
+        branch.invalidate()
+        return branch.evaluate()
+
+    def toggle():
+        game.strategies["高峰溢价"] = not game.strategies["高峰溢价"]
+
+    def next_day():
+        day = game.day
+        while game.day == day:
+            game.advance_time()
+
+    game.evaluate()
+    hits, misses = game.cache_hits, game.cache_misses
+    assert misses > 0
+    assert game.evaluate() is game.evaluate()
+    assert (game.cache_hits, game.cache_misses) == (hits + 2, misses)
+
+    changes = [
+        ("same prices", lambda: game.set_prices(game.zones.price.copy()), False),
+        ("prices", lambda: game.set_prices(game.zones.price_max), True),
+        ("same strategy", lambda: game.strategies.update({"高峰溢价": game.strategies["高峰溢价"]}), False),
+        ("strategy", toggle, True),
+        ("time", lambda: setattr(game, "current_time", (game.current_time + 1) % 4), True),
+        ("bikes", lambda: game.areas[name].__setitem__("bikes", game.areas[name]["bikes"] + 5), True),
+        ("optimal", lambda: game.areas[name].__setitem__("optimal", game.areas[name]["optimal"] + 1), True),
+        ("weather", lambda: setattr(game, "weather", "rain" if game.weather != "rain" else "heat"), True),
+        ("day", next_day, True),
+    ]
+    for label, change, invalidates in changes:
+        game.evaluate()
+        misses = game.cache_misses
+        change()
+        result = game.evaluate()
+        assert (game.cache_misses > misses) == invalidates, label
+        assert result == fresh(), label
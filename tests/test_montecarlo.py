@@ -0,0 +1,16 @@
+import pytest
+
+from sbbike.montecarlo import run_seasons
+
+
+@pytest.mark.parametrize("zones, rebalancing", [(None, False), (20, True)])
+def test_results_do_not_depend_on_workers_or_chunks(zones, rebalancing):
+    def run(workers, chunk_size):
+        stats, _ = run_seasons(13, 3, workers=workers, seed=42, chunk_size=chunk_size,
+                               zones=zones, city_seed=1, rebalancing=rebalancing)
+        return stats
+
+    reference = run(1, 13)
+    assert reference["seed"] == 42
+    for workers, chunk_size in ((1, 1), (1, 5), (2, 1), (3, 4), (2, None)):
+        assert run(workers, chunk_size) == reference, (workers, chunk_size)
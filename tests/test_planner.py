@@ -0,0 +1,45 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from sbbike.headless import run_days
+from sbbike.model import GameState
+from sbbike.montecarlo import season_seed
+from sbbike.params import OPTIMAL_DRIFT, OPTIMAL_MAX, OPTIMAL_MIN, WEATHERS
+from sbbike.planner import Plan, weather_probabilities
+from sbbike.zones import ZoneStore
+
+
+def net(game):
+    return game.total_revenue - game.total_cost - game.total_penalty
+
+
+def test_two_day_expectation_matches_enumeration():
+    """第二天的天气和理想数量漂移全部枚举（3 × 7³ 种），按概率加权求精确期望"""
+    plan = Plan.solve(GameState(0), 2)
+    start = GameState(0).zones.optimal
+    # 第一天结束时已抽过第二天的天气和漂移，下面逐一改成枚举的值
+    first, _ = run_days(1, GameState(0), plan.policy)
+    steps = range(-OPTIMAL_DRIFT, OPTIMAL_DRIFT + 1)
+    expected = 0.0
+    for w, p in zip(WEATHERS, weather_probabilities()):
+        for drift in itertools.product(steps, repeat=len(first.zones)):
+            game = first.fork()
+            game.weather = w
+            for name, o, d in zip(game.zones.names, start, drift):
+                game.areas[name]["optimal"] = min(max(int(o) + d, OPTIMAL_MIN), OPTIMAL_MAX)
+            run_days(1, game, plan.policy)
+            expected += p / len(steps) ** len(drift) * net(game)
+    assert plan.expected() == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize("zones", [None, 30])
+def test_expected_value_agrees_with_seeded_monte_carlo(zones):
+    city = ZoneStore.generate(zones, 1) if zones else None
+    days, seasons = 5, 200
+    plan = Plan.solve(GameState(zones=city.copy() if city else None), days)
+    nets = np.array([net(run_days(days, GameState(season_seed(7, i), zones=city.copy() if city else None),
+                                  plan.policy)[0]) for i in range(seasons)])
+    # 种子固定，结果确定；允许 4 个标准误
+    assert abs(nets.mean() - plan.expected()) < 4 * nets.std() / np.sqrt(seasons)
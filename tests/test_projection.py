@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from sbbike import engine
+from sbbike.model import GameState
+from sbbike.projection import Projection
+from sbbike.timeline import TimeAxis
+from sbbike.zones import ZoneStore
+
+
+@pytest.mark.parametrize("slots", [None, 12, 96])
+def test_totals_match_evaluate_on_any_time_axis(slots):
+    game = GameState(2, zones=ZoneStore.generate(40, 1), time_axis=TimeAxis.uniform(slots) if slots else None)
+    rng = np.random.default_rng(0)
+    for _ in range(5):
+        game.advance_time()
+    game.set_prices(rng.uniform(game.zones.price_min, game.zones.price_max))
+    game.strategies.update(engine.mask_to_strategies(5))
+    projection = Projection(game)
+    assert projection.totals() == pytest.approx(game.evaluate(), rel=1e-12)
+
+    # 曲线上与待执行价格最接近的点即当前预计结果
+    curve = projection.curve(3)
+    prices = np.linspace(game.zones.price_min[3], game.zones.price_max[3], projection.samples)
+    game.set_prices(np.where(np.arange(len(game.zones)) == 3, prices[17], game.zones.price))
+    assert (curve.revenue[17], curve.cost[17], curve.penalty[17], curve.net[17]) == \
+           pytest.approx(game.evaluate(), rel=1e-12)
+
+
+def test_dragging_does_not_accumulate_rounding_error():
+    game = GameState(1, zones=ZoneStore.generate(500, 3))
+    rng = np.random.default_rng(1)
+    projection = Projection(game)
+    projection.totals()
+    zones = game.zones
+    for _ in range(5000):
+        zone = int(rng.integers(len(zones)))
+        projection.set_price(zone, float(rng.uniform(zones.price_min[zone], zones.price_max[zone])))
+        if rng.random() < 0.1:
+            projection.curve(zone)
+    fresh = Projection(game)
+    fresh.reset(projection.prices, projection.mask)
+    assert projection.totals() == fresh.totals()
@@ -0,0 +1,74 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from sbbike import rebalance
+from sbbike.params import HANDLING_COST, MAX_UNIT_COST, TRUCK_CAPACITY, TRUCK_COST_PER_KM, TRUCK_TRIPS
+from sbbike.zones import ZoneStore
+
+
+def line_city(positions, surplus, y=None):
+    n = len(positions)
+    optimal = np.full(n, 30)
+    return ZoneStore([f"z{i}" for i in range(n)], np.full(n, 3.0), optimal + np.array(surplus), np.full(n, 2.0),
+                     optimal, np.full(n, 1.0), np.full(n, 4.0), positions, np.zeros(n) if y is None else y)
+
+
+def brute_force(zones, capacity, trips, max_unit_cost):
+    """小例子：枚举每对供需点之间的全部运量，先比运走的车数（越多越好），再比成本"""
+    surplus = zones.bikes - zones.optimal
+    src, dst = np.flatnonzero(surplus > 0), np.flatnonzero(surplus < 0)
+    pairs = [(s, d) for s in src for d in dst]
+    unit = {(s, d): np.hypot(zones.x[s] - zones.x[d], zones.y[s] - zones.y[d]) * TRUCK_COST_PER_KM / capacity
+            + HANDLING_COST for s, d in pairs}
+    best = (0, 0.0)
+    for flow in itertools.product(*(range(min(surplus[s], -surplus[d]) + 1) for s, d in pairs)):
+        moved = sum(flow)
+        if moved == 0 or moved > trips * capacity or any(f and unit[p] > max_unit_cost for f, p in zip(flow, pairs)):
+            continue
+        sent, received = np.zeros(len(zones), int), np.zeros(len(zones), int)
+        for f, (s, d) in zip(flow, pairs):
+            sent[s] += f
+            received[d] += f
+        if np.any(sent > np.maximum(surplus, 0)) or np.any(received > np.maximum(-surplus, 0)):
+            continue
+        cost = sum(f * unit[p] for f, p in zip(flow, pairs))
+        if moved > best[0] or (moved == best[0] and cost < best[1]):
+            best = (moved, cost)
+    return best
+
+
+def test_moves_bikes_towards_optimal():
+    zones = ZoneStore.generate(2000, 1)
+    before = np.abs(zones.bikes - zones.optimal).sum()
+    plan = rebalance.solve(zones)
+    assert plan.moved > 0
+    rebalance.apply(zones, plan)
+    assert np.abs(zones.bikes - zones.optimal).sum() == before - 2 * plan.moved
+    assert np.all(plan.cost <= plan.bikes * rebalance.MAX_UNIT_COST + 1e-9)
+    assert plan.trips.sum() <= rebalance.TRUCK_TRIPS
+
+
+def test_beats_nearest_first_matching():
+    # 直线上依次为 需求 D、供给 A、需求 C、供给 B：先配最近的 A→C 会让 B 去远处的 D
+    zones = line_city([0.0, 2.0, 3.0, 5.0], [-5, 5, -5, 5])
+    plan = rebalance.solve(zones)
+    assert plan.moved == 10
+    assert sorted(zip(plan.source, plan.target)) == [(1, 0), (3, 2)]
+    assert plan.total_cost == pytest.approx(brute_force(zones, TRUCK_CAPACITY, TRUCK_TRIPS, MAX_UNIT_COST)[1])
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = 5
+    surplus = rng.integers(-3, 4, n)
+    zones = line_city(rng.uniform(0, 30, n), surplus, rng.uniform(0, 30, n))
+    capacity, trips = int(rng.integers(1, 4)), int(rng.integers(1, 4))
+    max_unit_cost = float(rng.uniform(1.0, 6.0))
+    plan = rebalance.solve(zones, capacity=capacity, trips=trips, max_unit_cost=max_unit_cost, neighbors=n)
+    moved, cost = brute_force(zones, capacity, trips, max_unit_cost)
+    assert plan.moved == moved
+    assert plan.total_cost == pytest.approx(cost)
+    assert np.all(plan.cost <= plan.bikes * max_unit_cost + 1e-9)
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import math
+
+from sbbike.server import GameServer
+
+
+async def http(port, method, path, body=None, raw=None):
+    """发一个 HTTP 请求，返回 (状态码, JSON)；连接被直接断开时状态码为 None"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = raw if raw is not None else (json.dumps(body).encode() if body is not None else b"")
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nContent-Length: {len(data)}\r\n"
+                 f"Connection: close\r\n\r\n".encode() + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    if not response:
+        return None, None
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def serve(test):
+    async def main():
+        server = GameServer()
+        listener = await server.start("127.0.0.1", 0)
+        try:
+            await test(server, listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            server._evictor.cancel()
+    asyncio.run(main())
+
+
+def test_malformed_create():
+    async def test(server, port):
+        for body in ({"seed": "x"}, {"seed": [1]}, {"seed": 1.5}, {"city_seed": "x", "zones": 10},
+                     {"city_seed": -1, "zones": 10}, {"zones": "10"}, {"zones": True}, {"name": [1]}):
+            status, reply = await http(port, "POST", "/sessions", body)
+            assert status == 400, body
+            assert "error" in reply
+        assert not server.sessions
+        status, reply = await http(port, "POST", "/sessions", {"seed": 1, "zones": 10, "city_seed": 2})
+        assert status == 201 and len(reply["zones"]) == 10
+    serve(test)
+
+
+def test_malformed_decide_leaves_session_unchanged():
+    async def test(server, port):
+        _, state = await http(port, "POST", "/sessions", {"seed": 1})
+        path = f"/sessions/{state['session']}/decide"
+        low = [z["price_min"] for z in state["zones"]]
+        for body in ({"prices": [math.nan] * 3}, {"prices": [low[0], math.nan, low[2]]},
+                     {"prices": low, "strategies": ["高峰溢价"]},
+                     {"prices": low, "strategies": {"高峰溢价": True}, "mask": "1"},
+                     {"prices": low, "mask": 99}, {"prices": {"商业区": "x"}}, {"prices": [1, 2]},
+                     {"prices": low, "strategies": {"nope": True}},
+                     {"prices": low, "strategies": {"高峰溢价": "false"}}, {"strategies": {"高峰溢价": 1}}):
+            status, reply = await http(port, "POST", path, raw=json.dumps(body).encode())
+            assert status == 400, body
+        _, after = await http(port, "GET", f"/sessions/{state['session']}")
+        assert after["zones"] == state["zones"]
+        assert after["strategies"] == state["strategies"]
+        status, reply = await http(port, "POST", path, {"prices": low, "mask": 1})
+        assert status == 200
+    serve(test)
+
+
+def test_bad_arguments_and_unexpected_errors_get_a_reply():
+    async def test(server, port):
+        status, _ = await http(port, "POST", "/sessions", raw=b"[1, 2]")
+        assert status == 400
+
+        async def broken(**_):
+            raise TypeError("bug inside an op")
+        server.op_leaderboard = broken
+        status, reply = await http(port, "GET", "/leaderboard")
+        assert status == 500 and reply == {"error": "internal error"}
+
+        reply = await server.handle_message(json.dumps({"op": "state"}).encode())
+        assert reply["ok"] is False and reply["status"] == 400
+    serve(test)
+
+
+def test_concurrent_close():
+    async def test(server, port):
+        _, state = await http(port, "POST", "/sessions", {"seed": 1})
+        session = server.sessions[state["session"]]
+        # 有操作在进行时两个 close 都在等锁，锁释放后第二个不应出错
+        async with session.lock:
+            closing = [asyncio.ensure_future(server.op_close(session.id)) for _ in range(2)]
+            await asyncio.sleep(0)
+        replies = await asyncio.gather(*closing)
+        assert all(reply["closed"] for reply in replies)
+        assert session.id not in server.sessions and session.id in server.scores
+        status, _ = await http(port, "DELETE", f"/sessions/{session.id}")
+        assert status == 404
+    serve(test)
+
+
+def test_leaderboard_keeps_at_most_max_scores():
+    async def main():
+        server = GameServer(max_sessions=2, max_scores=3)
+        for score in range(6):
+            state = await server.op_create(seed=score)
+            server.sessions[state["session"]].score = score
+            server.scores[state["session"]] = (float(score), 1, state["session"])
+            if score < 5:
+                await server.op_close(state["session"])
+        # 进行中的会话总是保留，已关闭会话中只留下成绩最高的
+        assert set(server.sessions) <= set(server.scores)
+        assert sorted(score for score, _, _ in server.scores.values()) == [3.0, 4.0, 5.0]
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+import time
+
+import numpy as np
+
+from sbbike.spatial import GridIndex
+
+
+def brute(x, y, px, py, k):
+    d = np.sqrt((x[None, :] - px[:, None]) ** 2 + (y[None, :] - py[:, None]) ** 2)
+    return np.sort(d, axis=1)[:, :k]
+
+
+def test_uniform_matches_brute_force():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 20, (2, 3000))
+    px, py = rng.uniform(-5, 25, (2, 5000))
+    index = GridIndex(x, y)
+    near, dist = index.query(px, py, 8)
+    np.testing.assert_allclose(dist, brute(x, y, px, py, 8))
+    np.testing.assert_allclose(np.hypot(x[near] - px[:, None], y[near] - py[:, None]), dist)
+
+
+def test_collinear_points():
+    x = np.linspace(0, 10, 2000)
+    y = np.zeros(2000)
+    rng = np.random.default_rng(1)
+    px, py = rng.uniform(0, 10, 10000), rng.uniform(-1, 1, 10000)
+    start = time.perf_counter()
+    index = GridIndex(x, y)
+    near = index.assign(px, py)
+    assert time.perf_counter() - start < 5
+    np.testing.assert_allclose(np.abs(y[near] - py) ** 2 + (x[near] - px) ** 2, brute(x, y, px, py, 1)[:, 0] ** 2)
+
+
+def test_query_far_from_thin_strip():
+    rng = np.random.default_rng(2)
+    x, y = rng.uniform(0, 10, 2000), rng.uniform(0, 0.05, 2000)
+    px, py = rng.uniform(0, 10, 1000), np.full(1000, 5.0)
+    start = time.perf_counter()
+    _, dist = GridIndex(x, y).query(px, py, 3)
+    assert time.perf_counter() - start < 2
+    np.testing.assert_allclose(dist, brute(x, y, px, py, 3))
+
+
+def test_duplicate_points_and_k_larger_than_zones():
+    x = np.array([1.0, 1.0, 1.0, 2.0])
+    y = np.array([0.0, 0.0, 0.0, 0.0])
+    near, dist = GridIndex(x, y).query([0.0], [0.0], 10)
+    assert near.shape == (1, 4)
+    np.testing.assert_allclose(dist[0], [1, 1, 1, 2])
+
+
+def test_fuzz_clustered_layouts():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n = int(rng.integers(2, 40))
+        centers = rng.uniform(0, 100, (int(rng.integers(1, 4)), 2))
+        points = centers[rng.integers(len(centers), size=n)] + rng.normal(0, rng.choice([0.01, 0.5, 2.0]), (n, 2))
+        x, y = points[:, 0], points[:, 1]
+        k = int(rng.integers(1, n + 1))
+        px, py = rng.uniform(-10, 110, (2, 50))
+        near, dist = GridIndex(x, y).query(px, py, k)
+        np.testing.assert_allclose(dist, brute(x, y, px, py, k))
+        np.testing.assert_allclose(np.hypot(x[near] - px[:, None], y[near] - py[:, None]), dist)
+        assert all(len(set(row)) == k for row in near.tolist())
+
+
+def test_two_clusters_with_k_larger_than_the_neighbourhood():
+    x = np.array([0.0, 0.1, 0.2, 0.05, 100.0, 100.1, 99.9, 100.05])
+    y = np.array([0.0, 0.1, -0.1, 0.05, 0.0, 0.1, -0.1, 0.05])
+    near, dist = GridIndex(x, y).query([92.6], [7.8], 5)
+    np.testing.assert_allclose(dist, brute(x, y, np.array([92.6]), np.array([7.8]), 5))
+    assert len(set(near[0].tolist())) == 5
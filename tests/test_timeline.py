@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from sbbike.model import GameState
+from sbbike import engine
+from sbbike.timeline import TimeAxis, coarse_slots
+from sbbike.zones import ZoneStore
+
+AXES = [None, 4, 12, 96, 1440]
+
+
+def axis(slots):
+    return None if slots is None else TimeAxis.uniform(slots)
+
+
+def state(game):
+    return (game.total_revenue, game.total_cost, game.total_penalty, game.last_results, game.day, game.weather,
+            game.zones.bikes.tolist(), game.zones.optimal.tolist(), [dict(row) for row in game.day_history])
+
+
+@pytest.mark.parametrize("slots", AXES)
+@pytest.mark.parametrize("zones", [None, 50])
+def test_advance_day_matches_per_slot_loop(slots, zones):
+    store = (lambda: ZoneStore.generate(zones, 1)) if zones else (lambda: None)
+    by_day = GameState(7, zones=store(), time_axis=axis(slots))
+    by_slot = GameState(7, zones=store(), time_axis=axis(slots))
+    for _ in range(5):
+        day_totals = by_day.advance_day()
+        slot_totals = np.zeros(4)
+        for _ in range(by_slot.time_axis.slots):
+            slot_totals += by_slot.advance_time()
+        assert day_totals == tuple(slot_totals.tolist())
+        assert state(by_day) == state(by_slot)
+
+
+def test_advance_day_from_the_middle_of_a_day():
+    by_day = GameState(3, time_axis=TimeAxis.uniform(96))
+    by_slot = GameState(3, time_axis=TimeAxis.uniform(96))
+    for game in (by_day, by_slot):
+        for _ in range(40):
+            game.advance_time()
+    by_day.advance_day()
+    for _ in range(56):
+        by_slot.advance_time()
+    assert state(by_day) == state(by_slot)
+
+
+@pytest.mark.parametrize("slots", AXES)
+def test_rebalancing_runs_four_times_a_day(slots, monkeypatch):
+    game = GameState(1, zones=ZoneStore.generate(200, 1), rebalancing=True, time_axis=axis(slots))
+    calls = []
+    rebalance = game.rebalance
+    monkeypatch.setattr(game, "rebalance", lambda: calls.append(game.current_time) or rebalance())
+    for _ in range(3):
+        game.advance_day()
+    expected = int(game.time_axis.rebalance_before.sum())
+    assert len(calls) == 3 * expected
+    assert expected == 4
+
+
+def test_four_uniform_slots_are_the_original_slots():
+    assert coarse_slots(4).tolist() == [0, 1, 2, 3]
+    axis = TimeAxis.uniform(4)
+    assert np.array_equal(axis.tables[2], engine.WEATHER_FACTOR)
+    assert np.array_equal(axis.tables[3], engine.STRATEGY_FACTOR)
+    assert axis.names == ["05:00-11:00", "11:00-17:00", "17:00-23:00", "23:00-05:00"]
+
+
+@pytest.mark.parametrize("slots", [5, 6, 8, 12, 48, 96, 1440])
+def test_coarse_slots_follow_the_boundaries(slots):
+    coarse = coarse_slots(slots)
+    # 依次为早高峰、日间、晚高峰、夜间，每个至少一个时段
+    assert coarse[0] == 0 and np.all(np.diff(coarse) >= 0) and set(coarse.tolist()) == {0, 1, 2, 3}
+    if slots % 48 == 0:
+        # 分界都在半点上，时段够细时与 SLOT_BOUNDARIES_HOURS 完全一致：5:00、9:30、16:30、19:30
+        per_hour = slots // 24
+        assert np.flatnonzero(np.diff(coarse)).tolist() == [int(4.5 * per_hour) - 1, int(11.5 * per_hour) - 1,
+                                                            int(14.5 * per_hour) - 1]
@@ -0,0 +1,62 @@
+import numpy as np
+
+from sbbike.model import GameState
+from sbbike.trips import TripRecords, TripSimulator
+from sbbike.zones import ZoneStore
+
+
+def make_game(seed=1, scale=3.0):
+    zones = ZoneStore.generate(300, 2)
+    return GameState(5, zones=zones, trips=TripSimulator(zones, seed=seed, scale=scale))
+
+
+def play_day(game):
+    results, bikes = [], []
+    for _ in range(game.time_axis.slots):
+        results.append(game.advance_time())
+        bikes.append(game.zones.bikes.copy())
+    return results, bikes
+
+
+def test_bikes_are_conserved_over_a_day():
+    game = make_game()
+    total = int(game.zones.bikes.sum())
+    n = len(game.zones)
+    for _ in range(game.time_axis.slots):
+        before = game.zones.bikes.copy()
+        game.advance_time()
+        trips, after = game.trips.last_trips, game.zones.bikes
+        # 每个区域：借出的车离开起点，时段结束前全部到达终点
+        served = trips.served
+        assert np.array_equal(after, before - np.bincount(trips.origin[served], minlength=n) +
+                              np.bincount(trips.dest[served], minlength=n))
+        assert int(after.sum()) == total and np.all(after >= 0)
+        assert served.any() and not served.all()
+        assert np.array_equal(game.trips.last_lost, np.bincount(trips.origin[~served], minlength=n))
+
+
+def test_event_order():
+    # 区域 0 有一辆车：骑行 0 借走后在第 5 分钟到区域 1；骑行 1 在区域 0 借不到车；
+    # 骑行 2 与到达同一时刻从区域 1 出发，先处理到达，借到车
+    trips = TripRecords(np.array([0, 0, 1], np.int32), np.array([1, 1, 0], np.int32),
+                        np.array([0.0, 1.0, 5.0], np.float32), np.array([5.0, 6.0, 9.0], np.float32),
+                        np.zeros(3, bool))
+    bikes = TripSimulator.run(trips, [1, 0])
+    assert trips.served.tolist() == [True, False, True]
+    assert bikes == [1, 0]
+
+
+def test_seeded_runs_are_reproducible():
+    first, second = make_game(), make_game()
+    for _ in range(3):
+        assert play_day(first)[0] == play_day(second)[0]
+        assert np.array_equal(first.zones.bikes, second.zones.bikes)
+    assert first.trips.total_trips == second.trips.total_trips
+
+    # 分支与原状态共享随机数状态，之后各自推进结果相同
+    branch = first.fork()
+    a, b = play_day(first), play_day(branch)
+    assert a[0] == b[0] and all(np.array_equal(x, y) for x, y in zip(a[1], b[1]))
+
+    other = make_game(seed=2)
+    assert play_day(other)[0] != play_day(make_game())[0]